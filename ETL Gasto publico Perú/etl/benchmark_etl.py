@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark reproducible de transformación + carga con datos sintéticos (generar_sintetico.py).
+
+Genera los CSV en una carpeta temporal, corre transformar_mensual.py y cargar_postgres.py como
+subprocesos con métricas (metricas.py) y guarda en benchmarks/resultados.jsonl segundos, filas/s y
+RSS pico por etapa. Cada resultado se compara con el último del mismo escenario (mismos parámetros
+y misma máquina): lo que empeora más que --umbral se marca como regresión.
+
+La carga va a una base descartable mef_bench_<pid> creada en el servidor de .env (PG_HOST/PG_USER…)
+o, con --docker, en un contenedor postgres que se borra al terminar.
+
+Con --raw-compress zstd|gzip los CSV generados se comprimen como los guarda selenium_download.py y el
+transform los lee descomprimiendo al vuelo.
+
+Con --engines solo se mide el transform: el mismo CSV pasa por transformar_mensual.py con cada
+--engine (pandas, arrow) y se verifica que todos generen las mismas filas y montos; no usa PostgreSQL.
+
+Uso:
+  python etl/benchmark_etl.py
+  python etl/benchmark_etl.py --filas 1000000 --anios 2022 2023 --escenario 1M
+  python etl/benchmark_etl.py --load-args "--fact-mode copy --copy-format binary" --escenario copy-bin
+  python etl/benchmark_etl.py --docker --repeticiones 3 --fail-on-regression
+  python etl/benchmark_etl.py --engines pandas arrow --filas 5000000 --escenario engines-5M
+  python etl/benchmark_etl.py --engines pandas arrow --raw-compress zstd --escenario engines-zstd
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager, ExitStack
+from pathlib import Path
+
+import psycopg2
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from compresion import comprimir, FORMATOS as FORMATOS_COMPRESION
+from generar_sintetico import generar_csv, nombre_archivo, CARDINALIDADES
+
+DIR_ETL = Path(__file__).resolve().parent
+DIR_BASE = DIR_ETL.parent
+DDL_DW = DIR_BASE / "sql" / "CreacionDeDataWareHouse.sql"
+RESULTADOS_POR_DEFECTO = DIR_BASE / "benchmarks" / "resultados.jsonl"
+IMAGEN_DOCKER = "postgres:16"
+SCRIPTS = {"transform": "transformar_mensual.py", "carga": "cargar_postgres.py"}
+
+load_dotenv()
+
+# Parámetros de conexión PG_* del entorno (.env).
+def pg_entorno() -> dict:
+    return {k: os.getenv(k, "") for k in ("PG_HOST", "PG_PORT", "PG_USER", "PG_PASS", "PG_DB")}
+
+# Conexión psycopg2; los PG_* vacíos se omiten (libpq usa sus valores por defecto).
+def conectar(pg: dict, db: str | None = None):
+    dsn = {"host": pg["PG_HOST"], "port": pg["PG_PORT"], "user": pg["PG_USER"],
+           "password": pg["PG_PASS"], "dbname": db or pg["PG_DB"] or "postgres"}
+    return psycopg2.connect(**{k: v for k, v in dsn.items() if v})
+
+# Reintenta conectar hasta `espera` segundos (contenedor recién creado).
+def esperar_conexion(pg: dict, espera: int = 90):
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            conectar(pg).close()
+            return
+        except psycopg2.OperationalError:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(1)
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Contenedor postgres descartable (--docker); se borra al salir salvo --conservar.
+@contextmanager
+def contenedor_postgres(conservar: bool):
+    if shutil.which("docker") is None:
+        raise SystemExit("[error] --docker requiere el comando docker en el PATH")
+    nombre = f"mef_bench_{os.getpid()}"
+    puerto = puerto_libre()
+    subprocess.run(["docker", "run", "-d", "--name", nombre, "-e", "POSTGRES_PASSWORD=bench",
+                    "-p", f"127.0.0.1:{puerto}:5432", IMAGEN_DOCKER], check=True, capture_output=True)
+    print(f"[bench] contenedor {nombre} ({IMAGEN_DOCKER}) en el puerto {puerto}")
+    pg = {"PG_HOST": "127.0.0.1", "PG_PORT": str(puerto), "PG_USER": "postgres", "PG_PASS": "bench", "PG_DB": "postgres"}
+    try:
+        esperar_conexion(pg)
+        yield pg
+    finally:
+        if not conservar:
+            subprocess.run(["docker", "rm", "-f", nombre], capture_output=True)
+
+# Base mef_bench_<pid> con el DDL del DW; se borra al salir salvo --conservar.
+@contextmanager
+def base_descartable(pg: dict, conservar: bool):
+    nombre = f"mef_bench_{os.getpid()}"
+    admin = conectar(pg)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{nombre}"')
+            cur.execute(f'CREATE DATABASE "{nombre}"')
+        con = conectar(pg, nombre)
+        try:
+            with con.cursor() as cur:
+                cur.execute(DDL_DW.read_text(encoding="utf-8"))
+            con.commit()
+        finally:
+            con.close()
+        yield {**pg, "PG_DB": nombre}
+    finally:
+        if not conservar:
+            with admin.cursor() as cur:
+                cur.execute(f'DROP DATABASE IF EXISTS "{nombre}" WITH (FORCE)')
+        admin.close()
+
+# Corre un script del ETL como subproceso (salida al log) y devuelve los segundos de pared.
+def correr(script: str, argumentos: list, env: dict, log: Path) -> float:
+    t0 = time.perf_counter()
+    with open(log, "ab") as fh:
+        r = subprocess.run([sys.executable, str(DIR_ETL / script), *argumentos], env=env,
+                           stdout=fh, stderr=subprocess.STDOUT, cwd=str(DIR_BASE))
+    if r.returncode != 0:
+        raise RuntimeError(f"{script} terminó con código {r.returncode}; revisa {log}")
+    return time.perf_counter() - t0
+
+# Etapas de una corrida del archivo de métricas: {etapa: {veces, seg, filas, filas_s}} y RSS pico (MB)
+# entre todos sus procesos.
+def resumir_metricas(ruta: Path, corrida: str) -> tuple:
+    etapas, rss = {}, None
+    if not ruta.exists():
+        return etapas, rss
+    with open(ruta, encoding="utf-8") as fh:
+        for linea in fh:
+            r = json.loads(linea)
+            if r.get("corrida") != corrida:
+                continue
+            if r.get("rss_pico_mb") is not None:
+                rss = max(rss or 0, r["rss_pico_mb"])
+            if r.get("tipo") != "etapa":
+                continue
+            e = etapas.setdefault(r["etapa"], {"veces": 0, "seg": 0.0, "filas": 0})
+            e["veces"] += 1
+            e["seg"] += r.get("seg") or 0
+            e["filas"] += r.get("filas") or 0
+    for e in etapas.values():
+        e["seg"] = round(e["seg"], 4)
+        e["filas_s"] = round(e["filas"] / e["seg"]) if e["filas"] and e["seg"] > 0 else None
+    return etapas, rss
+
+# Totales de la fact cargada frente a los Parquet generados (la carga no debe perder ni duplicar montos).
+def verificar_carga(pg: dict, dir_datos: Path) -> dict:
+    devengado_parquet = 0.0
+    for ruta in sorted((dir_datos / "processed").rglob("*.parquet")):  # file o hive (--layout)
+        devengado_parquet += pc.sum(pq.read_table(ruta, columns=["MONTO_DEVENGADO"])["MONTO_DEVENGADO"]).as_py() or 0
+    con = conectar(pg, pg["PG_DB"])
+    try:
+        with con.cursor() as cur:
+            cur.execute("SELECT count(*), COALESCE(sum(monto_devengado), 0) FROM mef.fact_gasto_mensual")
+            filas, devengado = cur.fetchone()
+    finally:
+        con.close()
+    return {"filas_fact": filas, "devengado_parquet": round(devengado_parquet, 2),
+            "devengado_fact": round(float(devengado), 2),
+            "ok": abs(float(devengado) - devengado_parquet) < 0.01 * max(1, filas)}
+
+# Comprime los CSV generados como los deja selenium_download.py --compress (sin cambios con "none").
+def comprimir_generados(generados: list, carpeta: Path, formato: str) -> list:
+    if formato != "none":
+        for g in generados:
+            g["archivo"] = comprimir(carpeta / g["archivo"], formato).name
+    return generados
+
+# Una corrida completa: CSV sintéticos -> transform -> carga en una base nueva.
+def una_corrida(args, pg: dict, dir_trabajo: Path, n: int) -> dict:
+    dir_datos = dir_trabajo / f"corrida{n}" / "data"
+    carpeta_raw = dir_datos / "raw"
+    carpeta_raw.mkdir(parents=True, exist_ok=True)
+    cards = {c: getattr(args, c) for c in CARDINALIDADES}
+    generados = [
+        generar_csv(carpeta_raw / nombre_archivo(anio), anio, args.filas, args.semilla, cards,
+                    args.sesgo, args.nulos, args.encoding, args.filas_latin1, args.filas_malas)
+        for anio in args.anios
+    ]
+    print(f"[bench] corrida {n}: {len(generados)} CSV ({sum(g['bytes'] for g in generados) / 2**20:,.0f} MB)")
+    comprimir_generados(generados, carpeta_raw, args.raw_compress)
+
+    metricas = dir_trabajo / f"metricas{n}.jsonl"
+    log = dir_trabajo / f"corrida{n}.log"
+    anios = [str(a) for a in args.anios]
+    resultado = {"scripts": {}}
+    with base_descartable(pg, args.conservar) as pg_bench:
+        env = {**os.environ, **pg_bench, "ETL_DATA_DIR": str(dir_datos), "ETL_METRICAS": str(metricas),
+               "PYTHONUNBUFFERED": "1"}
+        pasos = [("transform", anios + ["--overwrite"] + shlex.split(args.transform_args)),
+                 ("carga", anios + shlex.split(args.load_args))]
+        for paso, argumentos in pasos:
+            corrida = f"bench{os.getpid()}-{n}-{paso}"
+            seg = correr(SCRIPTS[paso], argumentos, {**env, "ETL_CORRIDA": corrida}, log)
+            etapas, rss = resumir_metricas(metricas, corrida)
+            resultado["scripts"][paso] = {"seg": round(seg, 3), "rss_pico_mb": rss, "etapas": etapas}
+            print(f"[bench]   {paso:<9} {seg:8.2f} s  RSS pico {rss or 0:,.0f} MB")
+        resultado["verificacion"] = verificar_carga(pg_bench, dir_datos)
+    if not args.conservar:
+        shutil.rmtree(dir_datos, ignore_errors=True)
+    return resultado
+
+# Totales por año de los Parquet generados (filas y devengado), para comparar engines entre sí.
+def totales_parquet(dir_datos: Path) -> dict:
+    totales = {}
+    for ruta in sorted((dir_datos / "processed").rglob("*.parquet")):  # file o hive (--layout)
+        devengado = pc.sum(pq.read_table(ruta, columns=["MONTO_DEVENGADO"])["MONTO_DEVENGADO"]).as_py() or 0
+        totales[ruta.relative_to(dir_datos / "processed").with_suffix("").as_posix()] = {"filas": pq.read_metadata(ruta).num_rows, "devengado": round(devengado, 2)}
+    return totales
+
+# Una corrida de --engines: los CSV sintéticos se generan una vez y cada engine transforma su copia
+# (en su propia carpeta data/). Mismo formato que una_corrida, con un script por engine.
+def corrida_engines(args, dir_trabajo: Path, n: int) -> dict:
+    fuente = dir_trabajo / f"corrida{n}" / "fuente"
+    cards = {c: getattr(args, c) for c in CARDINALIDADES}
+    generados = [
+        generar_csv(fuente / nombre_archivo(anio), anio, args.filas, args.semilla, cards,
+                    args.sesgo, args.nulos, args.encoding, args.filas_latin1, args.filas_malas)
+        for anio in args.anios
+    ]
+    print(f"[bench] corrida {n}: {len(generados)} CSV ({sum(g['bytes'] for g in generados) / 2**20:,.0f} MB)")
+    comprimir_generados(generados, fuente, args.raw_compress)
+
+    metricas = dir_trabajo / f"metricas{n}.jsonl"
+    log = dir_trabajo / f"corrida{n}.log"
+    resultado, totales = {"scripts": {}}, {}
+    for motor in args.engines:
+        dir_datos = dir_trabajo / f"corrida{n}" / motor / "data"
+        (dir_datos / "raw").mkdir(parents=True, exist_ok=True)
+        for g in generados:
+            shutil.copyfile(fuente / g["archivo"], dir_datos / "raw" / g["archivo"])
+        paso = f"transform[{motor}]"
+        corrida = f"bench{os.getpid()}-{n}-{motor}"
+        env = {**os.environ, "ETL_DATA_DIR": str(dir_datos), "ETL_METRICAS": str(metricas),
+               "ETL_CORRIDA": corrida, "PYTHONUNBUFFERED": "1"}
+        argumentos = [str(a) for a in args.anios] + ["--overwrite", "--engine", motor] + shlex.split(args.transform_args)
+        seg = correr(SCRIPTS["transform"], argumentos, env, log)
+        etapas, rss = resumir_metricas(metricas, corrida)
+        resultado["scripts"][paso] = {"seg": round(seg, 3), "rss_pico_mb": rss, "etapas": etapas}
+        totales[motor] = totales_parquet(dir_datos)
+        print(f"[bench]   {paso:<17} {seg:8.2f} s  RSS pico {rss or 0:,.0f} MB")
+        if not args.conservar:
+            shutil.rmtree(dir_datos.parent, ignore_errors=True)
+    referencia = totales[args.engines[0]]
+    resultado["verificacion"] = {"totales": totales, "ok": all(t == referencia for t in totales.values())}
+    if not args.conservar:
+        shutil.rmtree(fuente, ignore_errors=True)
+    return resultado
+
+# Tabla de --engines: segundos, lectura+limpieza, RSS y aceleración frente al primer engine.
+def imprimir_engines(resultado: dict):
+    scripts = resultado["scripts"]
+    base = next(iter(scripts.values()))["seg"]
+    print(f"  {'engine':<19}{'seg':>9}{'leer_csv':>10}{'limpiar':>9}{'RSS MB':>9}{'vs 1º':>8}")
+    for paso, r in scripts.items():
+        e = r["etapas"]
+        print(f"  {paso:<19}{r['seg']:>9.2f}{e.get('leer_csv', {}).get('seg', 0):>10.2f}"
+              f"{e.get('limpiar', {}).get('seg', 0):>9.2f}{r['rss_pico_mb'] or 0:>9,.0f}{base / r['seg']:>7.2f}x")
+
+# Identidad del escenario: parámetros que cambian el trabajo más la máquina. Solo se comparan
+# resultados con la misma clave.
+def clave_escenario(parametros: dict) -> str:
+    return hashlib.sha1(json.dumps(parametros, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+def commit_actual() -> str | None:
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(DIR_BASE), capture_output=True, text=True)
+        return r.stdout.strip() or None
+    except OSError:
+        return None
+
+def ultimo_resultado(ruta: Path, clave: str) -> dict | None:
+    if not ruta.exists():
+        return None
+    anterior = None
+    with open(ruta, encoding="utf-8") as fh:
+        for linea in fh:
+            r = json.loads(linea)
+            if r.get("clave") == clave:
+                anterior = r
+    return anterior
+
+# Compara segundos (total y etapas con al menos `min_seg`) y RSS pico contra el resultado anterior.
+# Devuelve filas (script, medida, anterior, nuevo, cambio, marca).
+def comparar(nuevo: dict, anterior: dict, umbral: float, min_seg: float) -> list:
+    filas = []
+    for paso, res in nuevo["scripts"].items():
+        previo = anterior["scripts"].get(paso)
+        if previo is None:
+            continue
+        medidas = [("total seg", previo["seg"], res["seg"]), ("RSS pico MB", previo["rss_pico_mb"], res["rss_pico_mb"])]
+        medidas += [(f"{etapa} seg", previo["etapas"].get(etapa, {}).get("seg"), e["seg"])
+                    for etapa, e in res["etapas"].items()]
+        for medida, antes, ahora in medidas:
+            if not antes or ahora is None:
+                continue
+            if medida.endswith(" seg") and max(antes, ahora) < min_seg:
+                continue
+            cambio = ahora / antes - 1
+            marca = "REGRESIÓN" if cambio > umbral else ("mejora" if cambio < -umbral else "")
+            filas.append((paso, medida, antes, ahora, cambio, marca))
+    return filas
+
+def principal():
+    parser = argparse.ArgumentParser(description="Benchmark transform + carga con datos sintéticos.")
+    parser.add_argument("--escenario", default="base", help="Nombre del escenario (default base)")
+    parser.add_argument("--anios", nargs="+", type=int, default=[2022], help="Años a generar (default 2022)")
+    parser.add_argument("--filas", type=int, default=200_000, help="Filas por CSV (default 200k)")
+    parser.add_argument("--semilla", type=int, default=7, help="Semilla del generador (default 7)")
+    for clave, valor in CARDINALIDADES.items():
+        parser.add_argument(f"--{clave}", type=int, default=valor, help=f"Cardinalidad del catálogo (default {valor:,})")
+    parser.add_argument("--sesgo", type=float, default=2.0, help="Concentración de filas (default 2)")
+    parser.add_argument("--nulos", type=float, default=0.01, help="Fracción de montos vacíos (default 0.01)")
+    parser.add_argument("--encoding", choices=["utf-8", "utf-8-sig", "latin-1"], default="utf-8")
+    parser.add_argument("--filas-latin1", type=float, default=0.0, help="Fracción de líneas latin-1 en UTF-8")
+    parser.add_argument("--filas-malas", type=float, default=0.0, help="Fracción de líneas malformadas")
+    parser.add_argument("--transform-args", default="", help="Argumentos extra para transformar_mensual.py")
+    parser.add_argument("--load-args", default="", help="Argumentos extra para cargar_postgres.py")
+    parser.add_argument("--engines", nargs="+", choices=["pandas", "arrow"], default=None,
+                        help="Solo transform: compara estos --engine de transformar_mensual.py sobre el mismo CSV")
+    parser.add_argument("--raw-compress", choices=FORMATOS_COMPRESION, default="none",
+                        help="Comprime los CSV generados antes del transform (default none)")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas; se guarda la de menor tiempo total")
+    parser.add_argument("--docker", action="store_true", help=f"Carga en un contenedor {IMAGEN_DOCKER} descartable")
+    parser.add_argument("--resultados", type=Path, default=RESULTADOS_POR_DEFECTO,
+                        help="Archivo JSON lines con el historial (default benchmarks/resultados.jsonl)")
+    parser.add_argument("--umbral", type=float, default=0.15, help="Empeoramiento que cuenta como regresión (default 0.15)")
+    parser.add_argument("--min-seg", type=float, default=0.5, help="Etapas más cortas no se comparan (default 0.5 s)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Termina con código 1 si hay regresiones")
+    parser.add_argument("--conservar", action="store_true", help="No borra carpeta de trabajo, base ni contenedor")
+    args = parser.parse_args()
+
+    parametros = {
+        "anios": args.anios, "filas": args.filas, "semilla": args.semilla,
+        "cardinalidades": {c: getattr(args, c) for c in CARDINALIDADES},
+        "sesgo": args.sesgo, "nulos": args.nulos, "encoding": args.encoding,
+        "filas_latin1": args.filas_latin1, "filas_malas": args.filas_malas,
+        "transform_args": args.transform_args, "load_args": args.load_args, "engines": args.engines,
+        "docker": args.docker, "maquina": platform.node(), "cpus": os.cpu_count(),
+    }
+    if args.raw_compress != "none":  # sin compresión la clave queda como la de los escenarios anteriores
+        parametros["raw_compress"] = args.raw_compress
+    clave = clave_escenario({"escenario": args.escenario, **parametros})
+    dir_trabajo = Path(tempfile.mkdtemp(prefix="mef_bench_"))
+    print(f"[bench] escenario {args.escenario} ({clave}) en {dir_trabajo}")
+
+    try:
+        if args.engines:
+            corridas = [corrida_engines(args, dir_trabajo, n) for n in range(1, args.repeticiones + 1)]
+        else:
+            with ExitStack() as pila:
+                pg = pila.enter_context(contenedor_postgres(args.conservar)) if args.docker else pg_entorno()
+                corridas = [una_corrida(args, pg, dir_trabajo, n) for n in range(1, args.repeticiones + 1)]
+    finally:
+        if not args.conservar:
+            shutil.rmtree(dir_trabajo, ignore_errors=True)
+
+    mejor = min(corridas, key=lambda r: sum(s["seg"] for s in r["scripts"].values()))
+    registro = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "escenario": args.escenario, "clave": clave,
+                "commit": commit_actual(), "parametros": parametros, "repeticiones": args.repeticiones, **mejor}
+    if args.engines:
+        imprimir_engines(mejor)
+        if not mejor["verificacion"]["ok"]:
+            print(f"[warn] los engines no generan los mismos Parquet: {mejor['verificacion']['totales']}")
+    elif not mejor["verificacion"]["ok"]:
+        print(f"[warn] la fact no cuadra con los Parquet: {mejor['verificacion']}")
+
+    anterior = ultimo_resultado(args.resultados, clave)
+    regresiones = []
+    if anterior is None:
+        print("[bench] primer resultado de este escenario; queda como referencia")
+    else:
+        print(f"[bench] comparación con {anterior['ts']} (commit {anterior.get('commit')}):")
+        print(f"  {'script':<10}{'medida':<30}{'antes':>10}{'ahora':>10}{'cambio':>9}")
+        for paso, medida, antes, ahora, cambio, marca in comparar(registro, anterior, args.umbral, args.min_seg):
+            print(f"  {paso:<10}{medida:<30}{antes:>10.2f}{ahora:>10.2f}{cambio:>+9.0%}  {marca}")
+            if marca == "REGRESIÓN":
+                regresiones.append(f"{paso}/{medida}")
+    registro["regresiones"] = regresiones
+
+    args.resultados.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.resultados, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    print(f"[bench] resultado guardado en {args.resultados}")
+    if regresiones:
+        print(f"[warn] {len(regresiones)} regresión(es): {', '.join(regresiones)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    principal()
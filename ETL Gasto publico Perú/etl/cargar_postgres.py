@@ -1,436 +1,2348 @@
-# -*- coding: utf-8 -*-
-"""
-Carga (L de ETL) a PostgreSQL: robusto, vectorizado, tolerante a cortes,
-con consolidación por grano, logs claros y reanudación por batch.
-
-Uso:
-  python etl/cargar_postgres.py
-  python etl/cargar_postgres.py 2017 2018
-  python etl/cargar_postgres.py 2017 --batch 150000 --start-batch 36
-  python etl/cargar_postgres.py 2017 --batch 150000 --start-batch 36 --end-batch 50
-"""
-
-import os
-import sys
-import argparse
-import time
-from pathlib import Path
-from typing import List, Dict
-
-import pandas as pd
-import pyarrow.parquet as pq
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.exc import SQLAlchemyError, OperationalError, DBAPIError
-from psycopg2.extras import execute_values
-from dotenv import load_dotenv
-
-# Parámetros ajustables
-FILAS_BATCH_POR_DEFECTO = int(os.getenv("BATCH_ROWS", "250000"))
-FILAS_SUBLOTE_POR_DEFECTO = int(os.getenv("SUBBATCH_ROWS", "50000"))
-ESPERA_REINTENTO_SEG = 3
-MAX_REINTENTOS_BD = 3
-
-# Rutas
-DIR_BASE = Path(__file__).resolve().parents[1]
-DIR_PROCESADOS = DIR_BASE / "data" / "processed"
-
-# Conexión a BD
-load_dotenv()
-PG_DSN_CADENA = (
-    f"postgresql+psycopg2://{os.getenv('PG_USER')}:{os.getenv('PG_PASS')}"
-    f"@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DB')}"
-)
-
-# Columnas esperadas en Parquet (salida de transformar_mensual.py)
-COLUMNAS = [
-    "ANO_EJE", "MES_EJE", "FECHA",
-    "NIVEL_GOBIERNO", "NIVEL_GOBIERNO_NOMBRE",
-    "SEC_EJEC", "EJECUTORA", "EJECUTORA_NOMBRE",
-    "SECTOR", "SECTOR_NOMBRE", "PLIEGO", "PLIEGO_NOMBRE",
-    "DEPARTAMENTO_EJECUTORA", "DEPARTAMENTO_EJECUTORA_NOMBRE",
-    "PROVINCIA_EJECUTORA", "PROVINCIA_EJECUTORA_NOMBRE",
-    "DISTRITO_EJECUTORA", "DISTRITO_EJECUTORA_NOMBRE",
-    "PROGRAMA_PPTO", "PROGRAMA_PPTO_NOMBRE",
-    "TIPO_ACT_PROY", "TIPO_ACT_PROY_NOMBRE",
-    "PRODUCTO_PROYECTO", "PRODUCTO_PROYECTO_NOMBRE",
-    "ACTIVIDAD_ACCION_OBRA", "ACTIVIDAD_ACCION_OBRA_NOMBRE",
-    "SEC_FUNC",
-    "FUNCION", "FUNCION_NOMBRE",
-    "DIVISION_FUNCIONAL", "DIVISION_FUNCIONAL_NOMBRE",
-    "GRUPO_FUNCIONAL", "GRUPO_FUNCIONAL_NOMBRE",
-    "META", "FINALIDAD", "META_NOMBRE",
-    "DEPARTAMENTO_META", "DEPARTAMENTO_META_NOMBRE", "FINALIDAD_NOMBRE",
-    "FUENTE_FINANCIAMIENTO", "FUENTE_FINANCIAMIENTO_NOMBRE",
-    "RUBRO", "RUBRO_NOMBRE", "TIPO_RECURSO", "TIPO_RECURSO_NOMBRE",
-    "CATEGORIA_GASTO", "CATEGORIA_GASTO_NOMBRE",
-    "TIPO_TRANSACCION",
-    "GENERICA", "GENERICA_NOMBRE",
-    "SUBGENERICA", "SUBGENERICA_NOMBRE",
-    "SUBGENERICA_DET", "SUBGENERICA_DET_NOMBRE",
-    "ESPECIFICA", "ESPECIFICA_NOMBRE",
-    "ESPECIFICA_DET", "ESPECIFICA_DET_NOMBRE",
-    "MONTO_PIA", "MONTO_PIM", "MONTO_CERTIFICADO", "MONTO_COMPROMETIDO_ANUAL",
-    "MONTO_COMPROMETIDO", "MONTO_DEVENGADO", "MONTO_GIRADO",
-]
-
-# Claves y métricas en la tabla de hechos
-FKS_FACT = [
-    "tiempo_id","nivel_gobierno_id","ejecutora_id",
-    "programatica_id","funcional_id","meta_id",
-    "financiera_id","clasif_gasto_id"
-]
-METRICAS_FACT = [
-    "monto_pia","monto_pim","monto_certificado",
-    "monto_comprometido_anual","monto_comprometido",
-    "monto_devengado","monto_girado"
-]
-
-# Crea un motor SQLAlchemy y fija el search_path a mef.
-def nuevo_motor() -> Engine:
-    motor = create_engine(
-        PG_DSN_CADENA, future=True,
-        pool_pre_ping=True, pool_recycle=1800,
-        pool_size=5, max_overflow=0,
-    )
-    with motor.begin() as con:
-        con.execute(text("SET search_path TO mef, public;"))
-    return motor
-
-# Asegura índices únicos en dimensiones para evitar duplicados lógicos.
-def asegurar_indices_unicos(motor: Engine):
-    ddls = [
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_nivel_gobierno ON mef.dim_nivel_gobierno (nivel_gobierno_codigo);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_ejecutora ON mef.dim_ejecutora (sec_ejec, ejecutora_codigo);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_programatica ON mef.dim_programatica (programa_ppto, tipo_act_proy, producto_proyecto, actividad_accion_obra, sec_func);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_funcional ON mef.dim_funcional (funcion, division_funcional, grupo_funcional);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_meta ON mef.dim_meta (meta, finalidad, dep_meta_codigo);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_financiera ON mef.dim_financiera (fuente_financiamiento, rubro, tipo_recurso, categoria_gasto);",
-        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_clasificador_gasto ON mef.dim_clasificador_gasto (tipo_transaccion, generica, subgenerica, subgenerica_det, especifica, especifica_det);",
-    ]
-    with motor.begin() as con:
-        for ddl in ddls:
-            con.execute(text(ddl))
-
-# Lee una dimensión (id + columnas clave) para tener un mapa local.
-def leer_mapa_dim(motor: Engine, tabla: str, col_id: str, cols_clave: List[str]) -> pd.DataFrame:
-    cols = ", ".join([col_id] + cols_clave)
-    df = pd.read_sql(f"SELECT {cols} FROM mef.{tabla};", motor)
-    for c in cols_clave:
-        if c == "tipo_transaccion":
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        else:
-            df[c] = df[c].astype("string").str.strip()
-    return df
-
-# Inserta claves nuevas en una dimensión (upsert NO CONFLICT), con reintentos.
-def insertar_claves_nuevas(motor: Engine, tabla: str, todas_las_columnas: List[str], df_nuevas: pd.DataFrame):
-    if df_nuevas.empty:
-        return
-    registros = [
-        tuple(None if pd.isna(v) else v for v in fila[todas_las_columnas])
-        for _, fila in df_nuevas.iterrows()
-    ]
-    plantilla = "(" + ",".join(["%s"] * len(todas_las_columnas)) + ")"
-    sql = f"INSERT INTO mef.{tabla} ({', '.join(todas_las_columnas)}) VALUES %s ON CONFLICT DO NOTHING"
-    for intento in range(1, MAX_REINTENTOS_BD + 1):
-        cruda = motor.raw_connection()
-        try:
-            cur = cruda.cursor()
-            try:
-                execute_values(cur, sql, registros, template=plantilla, page_size=10000)
-                cruda.commit()
-                return
-            finally:
-                cur.close()
-        except Exception:
-            try: cruda.close()
-            except: pass
-            if intento == MAX_REINTENTOS_BD:
-                raise
-            print(f"    [retry] upsert {tabla} intento {intento} falló. Reintentando…")
-            time.sleep(ESPERA_REINTENTO_SEG)
-
-# Convierte a string “limpio” (strip) respetando pandas NA.
-def a_cadena(s: pd.Series) -> pd.Series:
-    return s.astype("string").str.strip()
-
-# Toma el batch fuente y arma un DataFrame normalizado con nombres de columnas de dimensiones/medidas.
-def construir_df_normalizado(df: pd.DataFrame) -> pd.DataFrame:
-    return pd.DataFrame({
-        "ano_eje": pd.to_numeric(df["ANO_EJE"], errors="coerce"),
-        "mes_eje": pd.to_numeric(df["MES_EJE"], errors="coerce"),
-        # nivel
-        "nivel_gobierno_codigo": a_cadena(df["NIVEL_GOBIERNO"]),
-        "nivel_gobierno_nombre": a_cadena(df["NIVEL_GOBIERNO_NOMBRE"]),
-        # ejecutora
-        "sec_ejec": a_cadena(df["SEC_EJEC"]),
-        "ejecutora_codigo": a_cadena(df["EJECUTORA"]),
-        "ejecutora_nombre": a_cadena(df["EJECUTORA_NOMBRE"]),
-        "sector": a_cadena(df["SECTOR"]),
-        "sector_nombre": a_cadena(df["SECTOR_NOMBRE"]),
-        "pliego": a_cadena(df["PLIEGO"]),
-        "pliego_nombre": a_cadena(df["PLIEGO_NOMBRE"]),
-        "dep_ejecutora_codigo": a_cadena(df["DEPARTAMENTO_EJECUTORA"]),
-        "dep_ejecutora_nombre": a_cadena(df["DEPARTAMENTO_EJECUTORA_NOMBRE"]),
-        "prov_ejecutora_codigo": a_cadena(df["PROVINCIA_EJECUTORA"]),
-        "prov_ejecutora_nombre": a_cadena(df["PROVINCIA_EJECUTORA_NOMBRE"]),
-        "dist_ejecutora_codigo": a_cadena(df["DISTRITO_EJECUTORA"]),
-        "dist_ejecutora_nombre": a_cadena(df["DISTRITO_EJECUTORA_NOMBRE"]),
-        # programática
-        "programa_ppto": a_cadena(df["PROGRAMA_PPTO"]),
-        "programa_ppto_nombre": a_cadena(df["PROGRAMA_PPTO_NOMBRE"]),
-        "tipo_act_proy": a_cadena(df["TIPO_ACT_PROY"]),
-        "tipo_act_proy_nombre": a_cadena(df["TIPO_ACT_PROY_NOMBRE"]),
-        "producto_proyecto": a_cadena(df["PRODUCTO_PROYECTO"]),
-        "producto_proyecto_nombre": a_cadena(df["PRODUCTO_PROYECTO_NOMBRE"]),
-        "actividad_accion_obra": a_cadena(df["ACTIVIDAD_ACCION_OBRA"]),
-        "actividad_accion_obra_nombre": a_cadena(df["ACTIVIDAD_ACCION_OBRA_NOMBRE"]),
-        "sec_func": a_cadena(df["SEC_FUNC"]),
-        # funcional
-        "funcion": a_cadena(df["FUNCION"]),
-        "funcion_nombre": a_cadena(df["FUNCION_NOMBRE"]),
-        "division_funcional": a_cadena(df["DIVISION_FUNCIONAL"]),
-        "division_funcional_nombre": a_cadena(df["DIVISION_FUNCIONAL_NOMBRE"]),
-        "grupo_funcional": a_cadena(df["GRUPO_FUNCIONAL"]),
-        "grupo_funcional_nombre": a_cadena(df["GRUPO_FUNCIONAL_NOMBRE"]),
-        # meta
-        "meta": a_cadena(df["META"]),
-        "finalidad": a_cadena(df["FINALIDAD"]),
-        "finalidad_nombre": a_cadena(df["FINALIDAD_NOMBRE"]),
-        "meta_nombre": a_cadena(df["META_NOMBRE"]),
-        "dep_meta_codigo": a_cadena(df["DEPARTAMENTO_META"]),
-        "dep_meta_nombre": a_cadena(df["DEPARTAMENTO_META_NOMBRE"]),
-        # financiera
-        "fuente_financiamiento": a_cadena(df["FUENTE_FINANCIAMIENTO"]),
-        "fuente_financiamiento_nombre": a_cadena(df["FUENTE_FINANCIAMIENTO_NOMBRE"]),
-        "rubro": a_cadena(df["RUBRO"]),
-        "rubro_nombre": a_cadena(df["RUBRO_NOMBRE"]),
-        "tipo_recurso": a_cadena(df["TIPO_RECURSO"]),
-        "tipo_recurso_nombre": a_cadena(df["TIPO_RECURSO_NOMBRE"]),
-        "categoria_gasto": a_cadena(df["CATEGORIA_GASTO"]),
-        "categoria_gasto_nombre": a_cadena(df["CATEGORIA_GASTO_NOMBRE"]),
-        # clasificador
-        "tipo_transaccion": pd.to_numeric(df["TIPO_TRANSACCION"], errors="coerce"),
-        "generica": a_cadena(df["GENERICA"]),
-        "generica_nombre": a_cadena(df["GENERICA_NOMBRE"]),
-        "subgenerica": a_cadena(df["SUBGENERICA"]),
-        "subgenerica_nombre": a_cadena(df["SUBGENERICA_NOMBRE"]),
-        "subgenerica_det": a_cadena(df["SUBGENERICA_DET"]),
-        "subgenerica_det_nombre": a_cadena(df["SUBGENERICA_DET_NOMBRE"]),
-        "especifica": a_cadena(df["ESPECIFICA"]),
-        "especifica_nombre": a_cadena(df["ESPECIFICA_NOMBRE"]),
-        "especifica_det": a_cadena(df["ESPECIFICA_DET"]),
-        "especifica_det_nombre": a_cadena(df["ESPECIFICA_DET_NOMBRE"]),
-        # métricas
-        "monto_pia": pd.to_numeric(df["MONTO_PIA"], errors="coerce"),
-        "monto_pim": pd.to_numeric(df["MONTO_PIM"], errors="coerce"),
-        "monto_certificado": pd.to_numeric(df["MONTO_CERTIFICADO"], errors="coerce"),
-        "monto_comprometido_anual": pd.to_numeric(df["MONTO_COMPROMETIDO_ANUAL"], errors="coerce"),
-        "monto_comprometido": pd.to_numeric(df["MONTO_COMPROMETIDO"], errors="coerce"),
-        "monto_devengado": pd.to_numeric(df["MONTO_DEVENGADO"], errors="coerce"),
-        "monto_girado": pd.to_numeric(df["MONTO_GIRADO"], errors="coerce"),
-    })
-
-# Inserta la tabla de hechos en sublotes para no saturar la conexión.
-def insertar_sublotes_fact(motor: Engine, df_fact: pd.DataFrame, filas_sublote: int):
-    cols_sql = ", ".join(df_fact.columns)
-    plantilla = "(" + ",".join(["%s"] * len(df_fact.columns)) + ")"
-    total = len(df_fact)
-    offset = 0
-    while offset < total:
-        trozo = df_fact.iloc[offset: offset + filas_sublote]
-        valores = [tuple(None if pd.isna(v) else v for v in fila)
-                   for fila in trozo.itertuples(index=False, name=None)]
-        sql = f"""
-            INSERT INTO mef.fact_gasto_mensual ({cols_sql})
-            VALUES %s
-            ON CONFLICT DO NOTHING
-        """
-        for intento in range(1, MAX_REINTENTOS_BD + 1):
-            cruda = motor.raw_connection()
-            try:
-                cur = cruda.cursor()
-                try:
-                    execute_values(cur, sql, valores, template=plantilla, page_size=20000)
-                    cruda.commit()
-                    break
-                finally:
-                    cur.close()
-            except Exception:
-                try: cruda.close()
-                except: pass
-                if intento == MAX_REINTENTOS_BD:
-                    raise
-                print(f"    [retry] insert fact intento {intento} falló. Reintentando…")
-                time.sleep(ESPERA_REINTENTO_SEG)
-        offset += filas_sublote
-
-# Carga un Parquet por batches Arrow, garantiza dimensiones, resuelve FKs y inserta hechos consolidados.
-def cargar_parquet(motor: Engine, ruta_parquet: Path, filas_batch: int, filas_sublote: int,
-                   batch_inicio: int = 1, batch_fin: int | None = None):
-    print(f"[proc] {ruta_parquet.name}")
-
-    try:
-        pf = pq.ParquetFile(str(ruta_parquet))
-    except Exception as e:
-        print(f"  [error] no pude abrir {ruta_parquet.name} como Parquet: {type(e).__name__}: {e}")
-        return
-
-    batches = pf.iter_batches(batch_size=filas_batch, columns=COLUMNAS)
-
-    # cache dim_tiempo por (anio,mes)
-    dt = pd.read_sql("SELECT tiempo_id, anio, mes FROM mef.dim_tiempo;", motor)
-    dt["anio"] = pd.to_numeric(dt["anio"], errors="coerce")
-    dt["mes"]  = pd.to_numeric(dt["mes"], errors="coerce")
-
-    dim_cfg = {
-        "nivel": {"table":"dim_nivel_gobierno","id":"nivel_gobierno_id","keys":["nivel_gobierno_codigo"],
-                  "all_cols":["nivel_gobierno_codigo","nivel_gobierno_nombre"]},
-        "ejec":  {"table":"dim_ejecutora","id":"ejecutora_id","keys":["sec_ejec","ejecutora_codigo"],
-                  "all_cols":["sec_ejec","ejecutora_codigo","ejecutora_nombre","sector","sector_nombre",
-                              "pliego","pliego_nombre","dep_ejecutora_codigo","dep_ejecutora_nombre",
-                              "prov_ejecutora_codigo","prov_ejecutora_nombre","dist_ejecutora_codigo",
-                              "dist_ejecutora_nombre"]},
-        "prog":  {"table":"dim_programatica","id":"programatica_id",
-                  "keys":["programa_ppto","tipo_act_proy","producto_proyecto","actividad_accion_obra","sec_func"],
-                  "all_cols":["programa_ppto","programa_ppto_nombre","tipo_act_proy","tipo_act_proy_nombre",
-                              "producto_proyecto","producto_proyecto_nombre","actividad_accion_obra",
-                              "actividad_accion_obra_nombre","sec_func"]},
-        "func":  {"table":"dim_funcional","id":"funcional_id",
-                  "keys":["funcion","division_funcional","grupo_funcional"],
-                  "all_cols":["funcion","funcion_nombre","division_funcional","division_funcional_nombre",
-                              "grupo_funcional","grupo_funcional_nombre"]},
-        "meta":  {"table":"dim_meta","id":"meta_id",
-                  "keys":["meta","finalidad","dep_meta_codigo"],
-                  "all_cols":["meta","finalidad","finalidad_nombre","meta_nombre","dep_meta_codigo","dep_meta_nombre"]},
-        "fin":   {"table":"dim_financiera","id":"financiera_id",
-                  "keys":["fuente_financiamiento","rubro","tipo_recurso","categoria_gasto"],
-                  "all_cols":["fuente_financiamiento","fuente_financiamiento_nombre","rubro","rubro_nombre",
-                              "tipo_recurso","tipo_recurso_nombre","categoria_gasto","categoria_gasto_nombre"]},
-        "clas":  {"table":"dim_clasificador_gasto","id":"clasif_gasto_id",
-                  "keys":["tipo_transaccion","generica","subgenerica","subgenerica_det","especifica","especifica_det"],
-                  "all_cols":["tipo_transaccion","generica","generica_nombre","subgenerica","subgenerica_nombre",
-                              "subgenerica_det","subgenerica_det_nombre","especifica","especifica_nombre",
-                              "especifica_det","especifica_det_nombre"]},
-    }
-
-    dim_df: Dict[str, pd.DataFrame] = {}
-    for tag, cfg in dim_cfg.items():
-        dim_df[tag] = leer_mapa_dim(motor, cfg["table"], cfg["id"], cfg["keys"])
-
-    # Reanudación: saltar batches iniciales
-    idx = 0
-    for batch in batches:
-        idx += 1
-        if idx < batch_inicio:
-            continue
-        if batch_fin is not None and idx > batch_fin:
-            print(f"  [info] end_batch={batch_fin} alcanzado. Detengo archivo.")
-            break
-
-        try:
-            src = batch.to_pandas()
-        except Exception as e:
-            print(f"  [warn] batch {idx} no convertible a pandas: {type(e).__name__}. salto el batch.")
-            continue
-
-        for c in COLUMNAS:
-            if c not in src.columns:
-                src[c] = pd.NA
-
-        df = construir_df_normalizado(src)
-        filas_fuente = len(df)
-
-        # (anio, mes) -> tiempo_id
-        df_time = df[["ano_eje","mes_eje"]].rename(columns={"ano_eje":"anio","mes_eje":"mes"})
-        df = pd.concat([df, df_time], axis=1)
-        df = df.merge(dt, how="left", on=["anio","mes"])
-        df.rename(columns={"tiempo_id":"tiempo_id"}, inplace=True)
-        df.drop(columns=["anio","mes"], inplace=True)
-
-        # upsert/merge dims
-        for tag in ["nivel","ejec","prog","func","meta","fin","clas"]:
-            cfg = dim_cfg[tag]; keys = cfg["keys"]; idcol = cfg["id"]; all_cols = cfg["all_cols"]
-            new_keys = df[keys].drop_duplicates()
-            merged = new_keys.merge(dim_df[tag][keys], on=keys, how="left", indicator=True)
-            to_insert = merged[merged["_merge"] == "left_only"][keys]
-            if not to_insert.empty:
-                insert_df = to_insert.merge(df[all_cols].drop_duplicates(), on=keys, how="left")
-                insert_df = insert_df[all_cols].drop_duplicates()
-                insertar_claves_nuevas(motor, cfg["table"], all_cols, insert_df)
-                dim_df[tag] = leer_mapa_dim(motor, cfg["table"], idcol, keys)
-            df = df.merge(dim_df[tag][keys + [idcol]], on=keys, how="left")
-
-        ok_mask = df[FKS_FACT].notna().all(axis=1)
-        filas_fk_ok = int(ok_mask.sum())
-        print(f"    [ok] batch {idx}: FKs completas {filas_fk_ok:,}/{filas_fuente:,}")
-
-        if filas_fk_ok == 0:
-            nulos = {c: int(df[c].isna().sum()) for c in FKS_FACT}
-            print(f"  [warn] lote sin filas insertables. Nulos por FK: {nulos}")
-            continue
-
-        fact_df = df.loc[ok_mask, FKS_FACT + METRICAS_FACT].copy()
-        fact_df = fact_df.groupby(FKS_FACT, as_index=False)[METRICAS_FACT].sum()
-        consolidadas = len(fact_df)
-        print(f"  [info] batch {idx}: fuente={filas_fuente:,} | fk_ok={filas_fk_ok:,} | consolidadas={consolidadas:,}")
-
-        try:
-            insertar_sublotes_fact(motor, fact_df, filas_sublote)
-            print(f"  [ok] batch {idx} insertado (consolidadas={consolidadas:,})")
-        except (DBAPIError, OperationalError, SQLAlchemyError):
-            print(f"  [warn] fallo insert batch {idx}. intento reconexión…")
-            try: motor.dispose()
-            except Exception: pass
-            motor = nuevo_motor()
-            insertar_sublotes_fact(motor, fact_df, filas_sublote)
-            print(f"  [ok] batch {idx} insertado tras reconexión")
-
-# CLI: prepara motor, índices únicos, selecciona archivos y ejecuta carga con opciones de reanudación.
-def principal():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("anios", nargs="*", type=int, help="Años a cargar (opcional). Ej: 2017 2018")
-    parser.add_argument("--batch", type=int, default=FILAS_BATCH_POR_DEFECTO, help="Filas por batch Arrow (default 250k)")
-    parser.add_argument("--subbatch", type=int, default=FILAS_SUBLOTE_POR_DEFECTO, help="Filas por sublote INSERT (default 50k)")
-    parser.add_argument("--start-batch", type=int, default=1, help="Batch inicial (1-based) para reanudar dentro del archivo")
-    parser.add_argument("--end-batch", type=int, default=None, help="Batch final (inclusive) dentro del archivo")
-    args = parser.parse_args()
-
-    motor = nuevo_motor()
-    asegurar_indices_unicos(motor)
-
-    archivos = sorted(DIR_PROCESADOS.glob("gasto_mensual_normalizado_*.parquet"))
-    if args.anios:
-        mantener = {str(a) for a in args.anios}
-        archivos = [f for f in archivos if any(k in f.name for k in mantener)]
-
-    if not archivos:
-        print("[error] No hay archivos Parquet para cargar.")
-        sys.exit(1)
-
-    print(f"[info] {len(archivos)} archivo(s) a cargar en PostgreSQL")
-    for f in archivos:
-        try:
-            cargar_parquet(
-                motor, f,
-                filas_batch=args.batch,
-                filas_sublote=args.subbatch,
-                batch_inicio=args.start_batch,
-                batch_fin=args.end_batch
-            )
-        except KeyboardInterrupt:
-            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
-            break
-        except Exception as e:
-            print(f"  [error] {f.name}: {type(e).__name__}: {e}. Continúo con el siguiente…")
-        finally:
-            try: motor.dispose()
-            except Exception: pass
-            motor = nuevo_motor()
-
-    print("[OK] Carga completada.")
-
-if __name__ == "__main__":
-    os.environ["PYTHONUNBUFFERED"] = "1"
-    principal()
+# -*- coding: utf-8 -*-
+"""
+Carga (L de ETL) a PostgreSQL: robusto, vectorizado, tolerante a cortes,
+con consolidación por grano, logs claros y reanudación por batch.
+
+Uso:
+  python etl/cargar_postgres.py
+  python etl/cargar_postgres.py 2017 2018
+  python etl/cargar_postgres.py 2017 --batch 150000 --start-batch 36
+  python etl/cargar_postgres.py 2017 --batch 150000 --start-batch 36 --end-batch 50
+  python etl/cargar_postgres.py 2017 --fact-mode copy --copy-format binary
+  python etl/cargar_postgres.py 2017 2018 2019 --workers 6
+  python etl/cargar_postgres.py 2025 --incremental
+  python etl/cargar_postgres.py 2019 --metrics logs/metricas.jsonl --profile
+  python etl/cargar_postgres.py --sink parquet --sink-dir data/warehouse
+  python etl/cargar_postgres.py 2017 --memory-budget 4G
+
+Cada año se lee de data/processed/gasto_mensual_normalizado_<anio>.parquet o, si el transform corrió
+con --layout hive, de data/processed/gasto_mensual_normalizado/ano_eje=<anio>/mes_eje=<m>/.
+
+Con el ledger (mef.etl_load_ledger) un archivo ya cargado se salta y uno que quedó a medias
+retoma desde la primera unidad no confirmada; --start-batch/--end-batch quedan como override manual.
+"""
+
+import os
+import io
+import sys
+import json
+import argparse
+import time
+import queue
+import hashlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+import psycopg2
+from dotenv import load_dotenv
+
+from contrato_esquema import (
+    leer_contrato, limpiar_categorias, huellas_mes, leer_huellas_mes, COLS_DICCIONARIO,
+)
+from metricas import METRICAS, rss_actual_mb, rss_pico_mb, parsear_tamano
+
+# Parámetros ajustables
+FILAS_BATCH_POR_DEFECTO = int(os.getenv("BATCH_ROWS", "250000"))
+FILAS_SUBLOTE_POR_DEFECTO = int(os.getenv("SUBBATCH_ROWS", "50000"))
+ESPERA_REINTENTO_SEG = 3
+MAX_REINTENTOS_BD = 3
+ERRORES_TRANSITORIOS = {"40001", "40P01", "55P03"}  # serialización, deadlock, lock_not_available
+PROFUNDIDAD_COLA_POR_DEFECTO = int(os.getenv("PIPELINE_DEPTH", "2"))  # batches preparados en espera
+FILAS_AGREGACION_POR_DEFECTO = int(os.getenv("AGG_MAX_ROWS", "2000000"))  # filas en memoria antes del spill
+PARTICIONES_AGREGACION = 32
+SEG_PUNTO_AGREGACION = int(os.getenv("AGG_CHECKPOINT_SEC", "60"))  # volcado mínimo con ledger (reanudación)
+MODO_FACT_POR_DEFECTO = os.getenv("FACT_MODE", "values")   # values | copy
+FORMATO_COPY_POR_DEFECTO = os.getenv("COPY_FORMAT", "text")  # text | binary
+MODO_CLAVES_POR_DEFECTO = os.getenv("KEY_MODE", "auto")      # auto | serial | hash
+PRESUPUESTO_MEMORIA_POR_DEFECTO = os.getenv("MEMORY_BUDGET")  # p. ej. 4G; sin valor = tamaños fijos
+
+# Ajuste de tamaños con --memory-budget
+FILAS_SONDEO = 50_000              # primer batch de cada archivo, antes de medir bytes por fila
+GRANO_LECTURA = 8_192              # filas por lectura Parquet; los batches se arman juntando granos
+FILAS_BATCH_MIN, FILAS_BATCH_MAX = 10_000, 2_000_000
+FILAS_SUBLOTE_MIN, FILAS_SUBLOTE_MAX = 2_000, 500_000
+FACTOR_PICO_PANDAS = 3.0           # copias del DataFrame durante merges/groupby del batch en curso
+BYTES_FILA_AGREGADA = 160          # 14 columnas de 8 bytes + listas de trozos por partición
+BYTES_FILA_SUBLOTE_INICIAL = 700   # objetos Python + literal ARRAY del sublote, hasta medirlo
+FRACCION_AGREGACION = 0.25         # tope del presupuesto para la agregación en memoria
+FRACCION_SUBLOTE = 0.15            # tope del presupuesto para el sublote que se está enviando
+UMBRAL_RSS = 0.9                   # RSS sobre este tanto del presupuesto => se achica el batch ya
+LATENCIA_MAX_SUBLOTE_SEG = 5.0     # sentencias más largas que esto se parten (reintentos más baratos)
+
+# Rutas (ETL_DATA_DIR reemplaza la carpeta data/, p. ej. en benchmark_etl.py)
+DIR_BASE = Path(__file__).resolve().parents[1]
+DIR_PROCESADOS = Path(os.getenv("ETL_DATA_DIR") or DIR_BASE / "data") / "processed"
+DIR_DATASET = DIR_PROCESADOS / "gasto_mensual_normalizado"  # layout hive: ano_eje=<YYYY>/mes_eje=<M>/part-*.parquet
+DIR_AGREGACION = DIR_PROCESADOS.parent / "agregacion"  # spill de --consolidate file que sobrevive a un corte
+
+# Conexión a BD
+load_dotenv()
+PG_DSN_CADENA = (
+    f"postgresql+psycopg2://{os.getenv('PG_USER')}:{os.getenv('PG_PASS')}"
+    f"@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DB')}"
+)
+
+# Columnas esperadas en Parquet (salida de transformar_mensual.py)
+COLUMNAS = [
+    "ANO_EJE", "MES_EJE", "FECHA",
+    "NIVEL_GOBIERNO", "NIVEL_GOBIERNO_NOMBRE",
+    "SEC_EJEC", "EJECUTORA", "EJECUTORA_NOMBRE",
+    "SECTOR", "SECTOR_NOMBRE", "PLIEGO", "PLIEGO_NOMBRE",
+    "DEPARTAMENTO_EJECUTORA", "DEPARTAMENTO_EJECUTORA_NOMBRE",
+    "PROVINCIA_EJECUTORA", "PROVINCIA_EJECUTORA_NOMBRE",
+    "DISTRITO_EJECUTORA", "DISTRITO_EJECUTORA_NOMBRE",
+    "PROGRAMA_PPTO", "PROGRAMA_PPTO_NOMBRE",
+    "TIPO_ACT_PROY", "TIPO_ACT_PROY_NOMBRE",
+    "PRODUCTO_PROYECTO", "PRODUCTO_PROYECTO_NOMBRE",
+    "ACTIVIDAD_ACCION_OBRA", "ACTIVIDAD_ACCION_OBRA_NOMBRE",
+    "SEC_FUNC",
+    "FUNCION", "FUNCION_NOMBRE",
+    "DIVISION_FUNCIONAL", "DIVISION_FUNCIONAL_NOMBRE",
+    "GRUPO_FUNCIONAL", "GRUPO_FUNCIONAL_NOMBRE",
+    "META", "FINALIDAD", "META_NOMBRE",
+    "DEPARTAMENTO_META", "DEPARTAMENTO_META_NOMBRE", "FINALIDAD_NOMBRE",
+    "FUENTE_FINANCIAMIENTO", "FUENTE_FINANCIAMIENTO_NOMBRE",
+    "RUBRO", "RUBRO_NOMBRE", "TIPO_RECURSO", "TIPO_RECURSO_NOMBRE",
+    "CATEGORIA_GASTO", "CATEGORIA_GASTO_NOMBRE",
+    "TIPO_TRANSACCION",
+    "GENERICA", "GENERICA_NOMBRE",
+    "SUBGENERICA", "SUBGENERICA_NOMBRE",
+    "SUBGENERICA_DET", "SUBGENERICA_DET_NOMBRE",
+    "ESPECIFICA", "ESPECIFICA_NOMBRE",
+    "ESPECIFICA_DET", "ESPECIFICA_DET_NOMBRE",
+    "MONTO_PIA", "MONTO_PIM", "MONTO_CERTIFICADO", "MONTO_COMPROMETIDO_ANUAL",
+    "MONTO_COMPROMETIDO", "MONTO_DEVENGADO", "MONTO_GIRADO",
+]
+
+# Claves y métricas en la tabla de hechos
+FKS_FACT = [
+    "tiempo_id","nivel_gobierno_id","ejecutora_id",
+    "programatica_id","funcional_id","meta_id",
+    "financiera_id","clasif_gasto_id"
+]
+# Las FKs quedan float64 en un batch donde algún merge dejó NaN (p. ej. un mes que no está en
+# dim_tiempo); se pasan a int64 tras filtrar esas filas: el hash de partición depende del dtype.
+TIPOS_FKS = dict.fromkeys(FKS_FACT, "int64")
+METRICAS_FACT = [
+    "monto_pia","monto_pim","monto_certificado",
+    "monto_comprometido_anual","monto_comprometido",
+    "monto_devengado","monto_girado"
+]
+
+# Dimensiones: tabla, id surrogate, llave natural (keys) y columnas a insertar (all_cols).
+DIM_CFG = {
+    "nivel": {"table":"dim_nivel_gobierno","id":"nivel_gobierno_id","keys":["nivel_gobierno_codigo"],
+              "all_cols":["nivel_gobierno_codigo","nivel_gobierno_nombre"]},
+    "ejec":  {"table":"dim_ejecutora","id":"ejecutora_id","keys":["sec_ejec","ejecutora_codigo"],
+              "all_cols":["sec_ejec","ejecutora_codigo","ejecutora_nombre","sector","sector_nombre",
+                          "pliego","pliego_nombre","dep_ejecutora_codigo","dep_ejecutora_nombre",
+                          "prov_ejecutora_codigo","prov_ejecutora_nombre","dist_ejecutora_codigo",
+                          "dist_ejecutora_nombre"]},
+    "prog":  {"table":"dim_programatica","id":"programatica_id",
+              "keys":["programa_ppto","tipo_act_proy","producto_proyecto","actividad_accion_obra","sec_func"],
+              "all_cols":["programa_ppto","programa_ppto_nombre","tipo_act_proy","tipo_act_proy_nombre",
+                          "producto_proyecto","producto_proyecto_nombre","actividad_accion_obra",
+                          "actividad_accion_obra_nombre","sec_func"]},
+    "func":  {"table":"dim_funcional","id":"funcional_id",
+              "keys":["funcion","division_funcional","grupo_funcional"],
+              "all_cols":["funcion","funcion_nombre","division_funcional","division_funcional_nombre",
+                          "grupo_funcional","grupo_funcional_nombre"]},
+    "meta":  {"table":"dim_meta","id":"meta_id",
+              "keys":["meta","finalidad","dep_meta_codigo"],
+              "all_cols":["meta","finalidad","finalidad_nombre","meta_nombre","dep_meta_codigo","dep_meta_nombre"]},
+    "fin":   {"table":"dim_financiera","id":"financiera_id",
+              "keys":["fuente_financiamiento","rubro","tipo_recurso","categoria_gasto"],
+              "all_cols":["fuente_financiamiento","fuente_financiamiento_nombre","rubro","rubro_nombre",
+                          "tipo_recurso","tipo_recurso_nombre","categoria_gasto","categoria_gasto_nombre"]},
+    "clas":  {"table":"dim_clasificador_gasto","id":"clasif_gasto_id",
+              "keys":["tipo_transaccion","generica","subgenerica","subgenerica_det","especifica","especifica_det"],
+              "all_cols":["tipo_transaccion","generica","generica_nombre","subgenerica","subgenerica_nombre",
+                          "subgenerica_det","subgenerica_det_nombre","especifica","especifica_nombre",
+                          "especifica_det","especifica_det_nombre"]},
+}
+ORDEN_DIMS = ["nivel","ejec","prog","func","meta","fin","clas"]
+
+# Tabla temporal de staging para COPY. En binario las métricas viajan como float8
+# (8 bytes fijos por celda) y se convierten a NUMERIC en el merge.
+TABLA_STAGING_FACT = {"text": "stg_fact_gasto_mensual_txt", "binary": "stg_fact_gasto_mensual_bin"}
+TIPO_METRICA_STAGING = {"text": "NUMERIC", "binary": "FLOAT8"}
+CABECERA_PGCOPY = b"PGCOPY\n\xff\r\n\x00" + np.array([0, 0], dtype=">i4").tobytes()
+COLA_PGCOPY = np.array([-1], dtype=">i2").tobytes()
+
+# Crea un motor SQLAlchemy y fija el search_path a mef.
+def nuevo_motor() -> Engine:
+    motor = create_engine(
+        PG_DSN_CADENA, future=True,
+        pool_pre_ping=True, pool_recycle=1800,
+        pool_size=5, max_overflow=0,
+    )
+    with motor.begin() as con:
+        con.execute(text("SET search_path TO mef, public;"))
+    return motor
+
+# Sesión de carga: una conexión que vive toda la corrida del proceso (o del worker), con el
+# search_path fijado una vez y sentencias preparadas en el servidor (PREPARE ... unnest de arrays,
+# una por texto SQL). Cada batch es una transacción (lote): hechos y ledger se confirman juntos o no
+# quedan. Cada sentencia corre bajo un SAVEPOINT (paso) y se reintenta ahí mismo ante
+# deadlocks/serialización; si se cae la conexión se reconecta, se deshacen las claves que el índice
+# aprendió dentro de la transacción y se repite el lote completo. Las claves SERIAL nuevas se asignan
+# en transacciones cortas de una sesión aparte (ver insertar_claves_nuevas).
+class SesionCarga:
+    def __init__(self, motor: Engine):
+        self.motor = motor
+        self.cruda = None
+        self.preparadas: set = set()
+        self.sesion_aparte: "SesionCarga | None" = None
+        self.conectar()
+
+    def conectar(self):
+        self.cruda = self.motor.raw_connection()
+        self.preparadas = set()
+        with self.cruda.cursor() as cur:
+            cur.execute("SET search_path TO mef, public")
+        self.cruda.commit()
+
+    def perdida(self) -> bool:
+        try:
+            return bool(self.cruda.closed)
+        except Exception:
+            return True
+
+    def reconectar(self):
+        try: self.cruda.invalidate()
+        except Exception: pass
+        self.conectar()
+
+    # Deja la sesión lista tras un error fuera de un lote (transacción abortada o conexión caída).
+    def reiniciar(self):
+        if self.perdida():
+            self.reconectar()
+            return
+        try:
+            self.cruda.rollback()
+        except Exception:
+            self.reconectar()
+
+    def cerrar(self):
+        if self.sesion_aparte is not None:
+            self.sesion_aparte.cerrar()
+        try: self.cruda.close()
+        except Exception: pass
+
+    # Otra sesión (otra conexión, creada al primer uso) para transacciones cortas que se confirman
+    # sin esperar al lote en curso de esta.
+    def aparte(self) -> "SesionCarga":
+        if self.sesion_aparte is None:
+            self.sesion_aparte = SesionCarga(self.motor)
+        return self.sesion_aparte
+
+    # Ejecuta una sentencia preparada (la prepara la primera vez en esta conexión). `tipos` son los
+    # tipos de $1..$n; los parámetros van con cast explícito (un array todo NULL no tiene tipo propio).
+    def ejecutar_preparada(self, cur, sql: str, tipos: List[str], params: list, fetch: bool = False):
+        nombre = "p_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:16]
+        if nombre not in self.preparadas:
+            cur.execute(f"PREPARE {nombre}" + (f" ({', '.join(tipos)})" if tipos else "") + f" AS {sql}")
+            self.preparadas.add(nombre)
+        cur.execute(f"EXECUTE {nombre}" + (f" ({', '.join('%s::' + t for t in tipos)})" if tipos else ""),
+                    params or None)
+        return cur.fetchall() if fetch else None
+
+    # Corre fn(cursor) bajo un SAVEPOINT: un error transitorio vuelve al savepoint y reintenta sin
+    # perder lo anterior de la transacción; cualquier otro error sube al lote.
+    def paso(self, etiqueta: str, fn):
+        for intento in range(1, MAX_REINTENTOS_BD + 1):
+            with self.cruda.cursor() as cur:
+                cur.execute("SAVEPOINT paso")
+                try:
+                    resultado = fn(cur)
+                except psycopg2.Error as e:
+                    if self.perdida() or e.pgcode not in ERRORES_TRANSITORIOS or intento == MAX_REINTENTOS_BD:
+                        raise
+                    cur.execute("ROLLBACK TO SAVEPOINT paso")
+                    print(f"    [retry] {etiqueta} intento {intento} falló ({e.pgcode}). Reintentando…")
+                    time.sleep(ESPERA_REINTENTO_SEG)
+                    continue
+                cur.execute("RELEASE SAVEPOINT paso")
+                return resultado
+
+    # Una sentencia suelta como paso.
+    def ejecutar(self, sql: str, params: tuple | None = None):
+        self.paso("sql", lambda cur: cur.execute(sql, params))
+
+    # Corre fn() como una transacción y la confirma. Si falla se deshace (también las claves que
+    # `indice` aprendió dentro); si además se cayó la conexión, reconecta y repite fn().
+    def lote(self, etiqueta: str, fn, indice: "IndiceClavesDim | None" = None):
+        for intento in range(1, MAX_REINTENTOS_BD + 1):
+            try:
+                resultado = fn()
+                with METRICAS.etapa("commit"):
+                    self.cruda.commit()
+            except BaseException:
+                if indice is not None:
+                    indice.deshacer()
+                perdida = self.perdida()
+                if not perdida:
+                    try: self.cruda.rollback()
+                    except Exception: perdida = True
+                if not perdida or intento == MAX_REINTENTOS_BD:
+                    if perdida:
+                        self.reconectar()
+                    raise
+                print(f"  [warn] conexión perdida en {etiqueta} (intento {intento}). Reconecto y repito…")
+                time.sleep(ESPERA_REINTENTO_SEG)
+                self.reconectar()
+                continue
+            if indice is not None:
+                indice.confirmar()
+            return resultado
+
+# Corre fn() como un lote de la sesión; sin sesión (--sink parquet) lo corre tal cual.
+def en_lote(sesion: SesionCarga | None, etiqueta: str, fn, indice: "IndiceClavesDim | None" = None):
+    if sesion is not None:
+        return sesion.lote(etiqueta, fn, indice)
+    resultado = fn()
+    if indice is not None:
+        indice.confirmar()
+    return resultado
+
+# Asegura índices únicos en dimensiones para evitar duplicados lógicos.
+def asegurar_indices_unicos(motor: Engine):
+    ddls = [
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_nivel_gobierno ON mef.dim_nivel_gobierno (nivel_gobierno_codigo);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_ejecutora ON mef.dim_ejecutora (sec_ejec, ejecutora_codigo);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_programatica ON mef.dim_programatica (programa_ppto, tipo_act_proy, producto_proyecto, actividad_accion_obra, sec_func);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_funcional ON mef.dim_funcional (funcion, division_funcional, grupo_funcional);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_meta ON mef.dim_meta (meta, finalidad, dep_meta_codigo);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_financiera ON mef.dim_financiera (fuente_financiamiento, rubro, tipo_recurso, categoria_gasto);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_dim_clasificador_gasto ON mef.dim_clasificador_gasto (tipo_transaccion, generica, subgenerica, subgenerica_det, especifica, especifica_det);",
+    ]
+    with motor.begin() as con:
+        for ddl in ddls:
+            con.execute(text(ddl))
+
+# Ledger de carga: por archivo Parquet y huella de contenido, qué unidades ya se confirmaron.
+# unidad: "plan:<rangos>" (reparto de row groups), "rg:a-b/batch<N>:<idx>" o "rg:a-b/part<P>:<p>"
+# (se confirman en la misma transacción que sus hechos), "rg:a-b/part<P>:lectura@<filas>" (punto de
+# reanudación del spill de --consolidate file), "rg:a-b:*" (rango completo) y "*" (archivo).
+DDL_LEDGER = """
+CREATE TABLE IF NOT EXISTS mef.etl_load_ledger (
+  archivo         TEXT        NOT NULL,
+  huella          TEXT        NOT NULL,
+  unidad          TEXT        NOT NULL,
+  filas_fuente    BIGINT,
+  filas_cargadas  BIGINT,
+  cargado_en      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (archivo, huella, unidad)
+);
+"""
+
+def asegurar_ledger(motor: Engine):
+    with motor.begin() as con:
+        con.execute(text(DDL_LEDGER))
+
+# Archivos Parquet de un año: el archivo mismo o, en una carpeta hive ano_eje=<anio>, sus partes en
+# orden de mes.
+def partes_parquet(ruta: Path) -> List[Path]:
+    if not ruta.is_dir():
+        return [ruta]
+    return sorted(ruta.glob("mes_eje=*/*.parquet"), key=lambda p: (int(p.parent.name.split("=", 1)[1]), p.name))
+
+# Huella del contenido de un Parquet: tamaño + bytes del footer (esquema, row groups, offsets y
+# estadísticas de cada columna). Cambia si cambia el contenido y se calcula sin leer los datos.
+# En una carpeta hive se encadenan ruta relativa, tamaño y footer de cada parte.
+def huella_parquet(ruta: Path) -> str:
+    h = hashlib.sha256()
+    for parte in partes_parquet(ruta):
+        tam = parte.stat().st_size
+        with open(parte, "rb") as fh:
+            fh.seek(-8, os.SEEK_END)
+            largo_pie = int.from_bytes(fh.read(4), "little")
+            fh.seek(-(8 + largo_pie), os.SEEK_END)
+            pie = fh.read(largo_pie)
+        if parte != ruta:
+            h.update(parte.relative_to(ruta).as_posix().encode())
+        h.update(str(tam).encode() + pie)
+    return h.hexdigest()[:32]
+
+# Nombre con el que un año queda en el ledger y en las huellas por mes. Una carpeta hive usa el del
+# archivo del mismo año: cambiar de layout no hace cargar el año dos veces (el ledger ve otra huella).
+def nombre_ledger(ruta: Path) -> str:
+    return f"gasto_mensual_normalizado_{anio_de_archivo(ruta)}.parquet" if ruta.is_dir() else ruta.name
+
+# Parquet de un año del transform: un archivo o una carpeta hive con una parte por mes. Los row groups
+# de todas las partes se numeran seguidos en orden de mes, así el reparto por row groups, el ledger y
+# la reanudación no distinguen el formato. row_groups_de_meses poda con las estadísticas min/max.
+class ParquetAnio:
+    def __init__(self, ruta: Path, read_dictionary: List[str] | None = None):
+        self.ruta = ruta
+        self.partes = partes_parquet(ruta)
+        if not self.partes:
+            raise FileNotFoundError(f"{ruta} no tiene partes Parquet")
+        if read_dictionary is not None:
+            nombres = set(pq.read_schema(str(self.partes[0])).names)
+            read_dictionary = [c for c in read_dictionary if c in nombres]
+        self.archivos = [pq.ParquetFile(str(p), read_dictionary=read_dictionary) for p in self.partes]
+        self.indices = [(k, i) for k, pf in enumerate(self.archivos) for i in range(pf.metadata.num_row_groups)]
+        self.schema_arrow = self.archivos[0].schema_arrow
+        self.num_row_groups = len(self.indices)
+        self.num_rows = sum(pf.metadata.num_rows for pf in self.archivos)
+        self.bytes = sum(p.stat().st_size for p in self.partes)
+
+    def filas(self, row_groups: List[int] | None = None) -> int:
+        if row_groups is None:
+            return self.num_rows
+        return sum(self.archivos[k].metadata.row_group(i).num_rows for k, i in (self.indices[j] for j in row_groups))
+
+    def iter_batches(self, batch_size: int, columns: List[str] | None = None, row_groups: List[int] | None = None):
+        elegidos = self.indices if row_groups is None else [self.indices[j] for j in row_groups]
+        for k, pf in enumerate(self.archivos):
+            locales = [i for kk, i in elegidos if kk == k]
+            if locales:
+                yield from pf.iter_batches(batch_size=batch_size, columns=columns, row_groups=locales)
+
+    # Row groups que pueden tener filas de `meses` ({(anio, mes)}) según min/max de ANO_EJE y MES_EJE;
+    # un row group sin estadísticas se lee siempre.
+    def row_groups_de_meses(self, meses: set) -> List[int]:
+        elegidos = []
+        for j, (k, i) in enumerate(self.indices):
+            meta = self.archivos[k].metadata
+            rg = meta.row_group(i)
+            rangos = {}
+            for nombre in ("ANO_EJE", "MES_EJE"):
+                idx = meta.schema.names.index(nombre) if nombre in meta.schema.names else -1
+                col = rg.column(idx) if idx >= 0 else None
+                if col is not None and col.is_stats_set and col.statistics.has_min_max:
+                    rangos[nombre] = (col.statistics.min, col.statistics.max)
+            a0, a1 = rangos.get("ANO_EJE", (-np.inf, np.inf))
+            m0, m1 = rangos.get("MES_EJE", (-np.inf, np.inf))
+            if any(a0 <= a <= a1 and m0 <= m <= m1 for a, m in meses):
+                elegidos.append(j)
+        return elegidos
+
+def nombre_rango(row_groups: List[int]) -> str:
+    return f"rg:{row_groups[0]}-{row_groups[-1]}"
+
+# Carpeta del spill persistente de un archivo/rango (ver AgregadorFact). Las que dejó otra huella del
+# mismo archivo ya no sirven y se borran.
+def dir_agregacion(ledger: "LedgerCarga", rango: str) -> Path:
+    base = f"{Path(ledger.archivo).stem}_{rango.replace(':', '')}"
+    propia = DIR_AGREGACION / f"{base}_{ledger.huella[:16]}"
+    for vieja in DIR_AGREGACION.glob(f"{base}_*"):
+        if vieja != propia:
+            shutil.rmtree(vieja, ignore_errors=True)
+    return propia
+
+# Reparte n row groups en hasta `tramos` rangos contiguos.
+def repartir_row_groups(n_rg: int, tramos: int) -> List[List[int]]:
+    if n_rg == 0:
+        return []
+    return [r.tolist() for r in np.array_split(np.arange(n_rg), max(1, min(tramos, n_rg)))]
+
+# Vista en memoria del ledger de un archivo+huella (se lee una vez al empezar el archivo).
+class LedgerCarga:
+    def __init__(self, motor: Engine, archivo: str, huella: str):
+        self.archivo = archivo
+        self.huella = huella
+        with motor.connect() as con:
+            filas = con.execute(
+                text("SELECT unidad FROM mef.etl_load_ledger WHERE archivo = :a AND huella = :h"),
+                {"a": archivo, "h": huella},
+            ).all()
+        self.hechas = {f[0] for f in filas}
+
+    def hecho(self, unidad: str) -> bool:
+        return unidad in self.hechas
+
+    # (sql, params) para ejecutar en el mismo cursor/transacción que los hechos de la unidad.
+    def entrada(self, unidad: str, filas_fuente: int | None = None, filas_cargadas: int | None = None) -> tuple:
+        sql = ("INSERT INTO mef.etl_load_ledger (archivo, huella, unidad, filas_fuente, filas_cargadas) "
+               "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (archivo, huella, unidad) DO NOTHING")
+        return sql, (self.archivo, self.huella, unidad, filas_fuente, filas_cargadas)
+
+    def registrar(self, motor: Engine, unidad: str, filas_fuente: int | None = None, filas_cargadas: int | None = None):
+        sql, params = self.entrada(unidad, filas_fuente, filas_cargadas)
+        cruda = motor.raw_connection()
+        try:
+            cur = cruda.cursor()
+            cur.execute(sql, params)
+            cruda.commit()
+            cur.close()
+        finally:
+            cruda.close()
+        self.hechas.add(unidad)
+
+    # Reparto de row groups usado en la primera corrida (para reanudar con las mismas unidades).
+    def plan(self) -> List[List[int]] | None:
+        for u in self.hechas:
+            if u.startswith("plan:"):
+                rangos = []
+                for tramo in u[len("plan:"):].split(","):
+                    a, b = (int(x) for x in tramo.split("-"))
+                    rangos.append(list(range(a, b + 1)))
+                return rangos
+        return None
+
+    # Tipos de unidad ya confirmados en un rango ("batch250000", "part32"...).
+    def tipos(self, rango: str) -> set:
+        prefijo = rango + "/"
+        return {u[len(prefijo):].split(":")[0] for u in self.hechas if u.startswith(prefijo)}
+
+# Huella por mes (ANO_EJE, MES_EJE) de lo último cargado en la fact; la usa el modo --incremental.
+DDL_HUELLA_MES = """
+CREATE TABLE IF NOT EXISTS mef.etl_huella_mes (
+  tiempo_id       INT         PRIMARY KEY REFERENCES mef.dim_tiempo(tiempo_id),
+  archivo         TEXT        NOT NULL,
+  filas           BIGINT      NOT NULL,
+  huella          TEXT        NOT NULL,
+  actualizado_en  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+def asegurar_huella_mes(motor: Engine):
+    with motor.begin() as con:
+        con.execute(text(DDL_HUELLA_MES))
+
+# Huellas con las que ya se cargó (al menos en parte) un archivo.
+def huellas_registradas(motor: Engine, archivo: str) -> set:
+    with motor.connect() as con:
+        filas = con.execute(text("SELECT DISTINCT huella FROM mef.etl_load_ledger WHERE archivo = :a"),
+                            {"a": archivo}).all()
+    return {f[0] for f in filas}
+
+# Lee una dimensión (id + columnas clave) para tener un mapa local.
+def leer_mapa_dim(motor: Engine, tabla: str, col_id: str, cols_clave: List[str]) -> pd.DataFrame:
+    cols = ", ".join([col_id] + cols_clave)
+    df = pd.read_sql(f"SELECT {cols} FROM mef.{tabla};", motor)
+    for c in cols_clave:
+        if c == "tipo_transaccion":
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        else:
+            df[c] = df[c].astype("string").str.strip()
+    return df
+
+# Convierte las filas de un DataFrame en tuplas Python con NA -> None (claves hashables y aptas para psycopg2).
+def tuplas_sin_na(df: pd.DataFrame, columnas: List[str]) -> List[tuple]:
+    return list(zip(*[df[c].to_numpy(dtype=object, na_value=None) for c in columnas]))
+
+# Tipos de los arrays de unnest para columnas de dimensión (texto salvo tipo_transaccion y los ids).
+def tipos_arrays(columnas: List[str]) -> List[str]:
+    return ["int[]" if c == "tipo_transaccion" else "bigint[]" if c.endswith("_id") else "text[]" for c in columnas]
+
+# Placeholders $1..$n de una sentencia preparada.
+def parametros(n: int) -> str:
+    return ", ".join(f"${i}" for i in range(1, n + 1))
+
+# Tuplas de filas -> una lista por columna (parámetros array de unnest).
+def por_columna(filas: List[tuple], n: int) -> List[list]:
+    return [list(c) for c in zip(*filas)] if filas else [[] for _ in range(n)]
+
+# Busca los ids de claves concretas. Las claves sin NULL usan igualdad (índice único); las que
+# traen NULL, IS NOT DISTINCT FROM (son pocas y el índice no las cubre).
+def buscar_ids(sesion: SesionCarga, cur, tabla: str, col_id: str, cols_clave: List[str],
+               claves: List[tuple]) -> Dict[tuple, int]:
+    encontrados: Dict[tuple, int] = {}
+    cols_v = ", ".join(cols_clave)
+    cols_d = ", ".join("d." + c for c in cols_clave)
+    for con_nulos in (False, True):
+        grupo = [k for k in claves if (None in k) == con_nulos]
+        if not grupo:
+            continue
+        op = "IS NOT DISTINCT FROM" if con_nulos else "="
+        cond = " AND ".join(f"d.{c} {op} v.{c}" for c in cols_clave)
+        sql = (f"SELECT d.{col_id}, {cols_d} FROM mef.{tabla} d "
+               f"JOIN unnest({parametros(len(cols_clave))}) AS v ({cols_v}) ON {cond}")
+        filas = sesion.ejecutar_preparada(cur, sql, tipos_arrays(cols_clave), por_columna(grupo, len(cols_clave)),
+                                          fetch=True)
+        encontrados.update({tuple(f[1:]): f[0] for f in filas})
+    return encontrados
+
+# Inserta claves nuevas en una dimensión (upsert ON CONFLICT) en una transacción corta de la sesión
+# aparte, confirmada antes de seguir con el batch: los hechos del lote (otra conexión) ya ven las
+# claves y un worker no espera al commit de los hechos de otro. Un advisory lock por tabla serializa
+# solo esa transacción entre procesos (--workers): bajo el lock se buscan primero las claves que otro
+# worker ya confirmó y se insertan las que faltan. Cada transacción toma un único lock.
+# Devuelve [(llave_natural, id)] desde la búsqueda + RETURNING, sin releer la dimensión.
+def insertar_claves_nuevas(sesion: SesionCarga, tabla: str, col_id: str, cols_clave: List[str],
+                           todas_las_columnas: List[str], df_nuevas: pd.DataFrame) -> List[tuple]:
+    if df_nuevas.empty:
+        return []
+    registros = tuplas_sin_na(df_nuevas, todas_las_columnas)
+    claves = tuplas_sin_na(df_nuevas, cols_clave)
+    sql = (f"INSERT INTO mef.{tabla} ({', '.join(todas_las_columnas)}) "
+           f"SELECT * FROM unnest({parametros(len(todas_las_columnas))}) "
+           f"ON CONFLICT DO NOTHING RETURNING {col_id}, {', '.join(cols_clave)}")
+
+    aparte = sesion.aparte()
+
+    def upsert(cur) -> List[tuple]:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"mef.{tabla}",))
+        asignadas = buscar_ids(aparte, cur, tabla, col_id, cols_clave, claves)
+        faltan = [r for r, k in zip(registros, claves) if k not in asignadas]
+        if faltan:
+            filas = aparte.ejecutar_preparada(cur, sql, tipos_arrays(todas_las_columnas),
+                                              por_columna(faltan, len(todas_las_columnas)), fetch=True)
+            asignadas.update({tuple(f[1:]): f[0] for f in filas})
+        return list(asignadas.items())
+
+    return aparte.lote(f"claves {tabla}", lambda: aparte.paso(f"upsert {tabla}", upsert))
+
+# Claves hash (sql/MigracionClavesHash.sql): el id de una dimensión es el entero con signo de los
+# primeros 8 bytes del md5 de su llave natural como texto (valores unidos con chr(31), NULL como
+# chr(30)); mef.clave_hash calcula lo mismo en SQL.
+SEPARADOR_CLAVE = "\x1f"
+NULO_CLAVE = "\x1e"
+
+def texto_clave(valores: tuple) -> str:
+    partes = []
+    for v in valores:
+        if v is None:
+            partes.append(NULO_CLAVE)
+        elif isinstance(v, float):
+            partes.append(str(int(v)))  # tipo_transaccion llega como float si el batch trae nulos
+        else:
+            partes.append(str(v))
+    return SEPARADOR_CLAVE.join(partes)
+
+def clave_hash(valores: tuple) -> int:
+    return int.from_bytes(hashlib.md5(texto_clave(valores).encode("utf-8")).digest()[:8], "big", signed=True)
+
+# Modo de claves de la BD: "hash" si los ids de dimensiones (y sus FKs en la fact) ya son BIGINT,
+# "serial" si siguen siendo INT. Verifica además que mef.clave_hash coincida con clave_hash.
+def modo_claves_bd(motor: Engine) -> str:
+    tablas = [cfg["table"] for cfg in DIM_CFG.values()] + ["fact_gasto_mensual"]
+    ids = [cfg["id"] for cfg in DIM_CFG.values()]
+    with motor.connect() as con:
+        tipos = {f[0] for f in con.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = 'mef' AND table_name = ANY(:t) AND column_name = ANY(:c)
+        """), {"t": tablas, "c": ids}).all()}
+        if tipos != {"bigint"}:
+            if "bigint" in tipos:
+                raise ValueError(f"ids de dimensiones con tipos mezclados {sorted(tipos)}; "
+                                 f"revisa sql/MigracionClavesHash.sql")
+            return "serial"
+        prueba = ("ABC", None, "5")
+        en_bd = con.execute(text("SELECT mef.clave_hash(CAST(:v AS text[]))"), {"v": list(prueba)}).scalar()
+    if en_bd != clave_hash(prueba):
+        raise ValueError("mef.clave_hash no coincide con clave_hash de cargar_postgres.py")
+    return "hash"
+
+# Filas de dim_programatica con sec_func "5" (del camino del contrato antes de a_codigo_entero). No
+# impiden cargar: las cargas usan "5.0" y sql/NormalizacionSecFunc.sql (opcional) las une a esa forma.
+def sec_func_sin_forma_historica(motor: Engine) -> int:
+    with motor.connect() as con:
+        return con.execute(text("SELECT count(*) FROM mef.dim_programatica WHERE sec_func ~ :p"),
+                           {"p": PATRON_ENTERO}).scalar()
+
+# Inserta en segundo plano claves nuevas con su id hash (ON CONFLICT DO NOTHING, sin locks: dos
+# workers que insertan la misma llave calculan el mismo id). Las que ya estaban se releen por id
+# para detectar colisiones (otra llave con el mismo hash) o llaves cargadas con id SERIAL.
+# Usa la conexión de la sesión desde el hilo de fondo: el hilo principal no toca la BD hasta esperar().
+def insertar_claves_hash(sesion: SesionCarga, tabla: str, col_id: str, cols_clave: List[str],
+                         todas_las_columnas: List[str], df_nuevas: pd.DataFrame):
+    columnas = [col_id] + todas_las_columnas
+    registros = tuplas_sin_na(df_nuevas, columnas)
+    claves = dict(zip(df_nuevas[col_id].tolist(), tuplas_sin_na(df_nuevas, cols_clave)))
+    sql = (f"INSERT INTO mef.{tabla} ({', '.join(columnas)}) SELECT * FROM unnest({parametros(len(columnas))}) "
+           f"ON CONFLICT DO NOTHING RETURNING {col_id}")
+    sql_existentes = f"SELECT {col_id}, {', '.join(cols_clave)} FROM mef.{tabla} WHERE {col_id} = ANY($1)"
+
+    def upsert(cur) -> tuple:
+        insertados = {f[0] for f in sesion.ejecutar_preparada(cur, sql, tipos_arrays(columnas),
+                                                               por_columna(registros, len(columnas)), fetch=True)}
+        existentes = [i for i in claves if i not in insertados]
+        en_bd = {}
+        if existentes:
+            filas = sesion.ejecutar_preparada(cur, sql_existentes, ["bigint[]"], [existentes], fetch=True)
+            en_bd = {f[0]: tuple(f[1:]) for f in filas}
+        return existentes, en_bd
+
+    existentes, en_bd = sesion.paso(f"upsert {tabla}", upsert)
+    for id_ in existentes:
+        if id_ not in en_bd:
+            raise ValueError(f"{tabla}: la llave {claves[id_]} ya existe con un id no hash; "
+                             f"corre sql/MigracionClavesHash.sql")
+        if texto_clave(en_bd[id_]) != texto_clave(claves[id_]):
+            raise ValueError(f"colisión de clave hash en {tabla}: {en_bd[id_]} y {claves[id_]} -> {id_}")
+
+# Índice en memoria llave natural -> id surrogate por dimensión. Vive todo el proceso y se comparte
+# entre archivos: cada dimensión se lee una sola vez y luego solo crece con lo que devuelve RETURNING.
+# En modo "hash" los ids se calculan sin ir a la BD y las claves nuevas se insertan en un hilo de
+# fondo; antes de insertar hechos hay que llamar a esperar() (las FKs deben existir al confirmar).
+# Las claves aprendidas dentro de un lote se olvidan si el lote se deshace (deshacer/confirmar);
+# las SERIAL de la BD ya vienen confirmadas (claves_confirmadas) y se conservan.
+class IndiceClavesDim:
+    claves_confirmadas = True
+
+    def __init__(self, modo_claves: str = "serial"):
+        self.modo_claves = modo_claves
+        self.mapas: Dict[str, Dict[tuple, int]] = {}
+        self.tiempo: pd.DataFrame | None = None
+        self.ids_hash: Dict[str, Dict[int, tuple]] = {}
+        self.fondo = ThreadPoolExecutor(max_workers=1) if modo_claves == "hash" else None
+        self.pendientes = []
+        self.aprendidas: List[tuple] = []  # (tag, llave, id) del lote en curso
+
+    # Cache dim_tiempo por (anio, mes). Las lecturas de mapas van por el pool del motor.
+    def mapa_tiempo(self, sesion: SesionCarga) -> pd.DataFrame:
+        if self.tiempo is None:
+            dt = pd.read_sql("SELECT tiempo_id, anio, mes FROM mef.dim_tiempo;", sesion.motor)
+            dt["anio"] = pd.to_numeric(dt["anio"], errors="coerce")
+            dt["mes"] = pd.to_numeric(dt["mes"], errors="coerce")
+            self.tiempo = dt
+        return self.tiempo
+
+    # Mapa de una dimensión; se carga desde la BD solo la primera vez que se pide.
+    def mapa(self, sesion: SesionCarga, tag: str) -> Dict[tuple, int]:
+        if tag not in self.mapas:
+            cfg = DIM_CFG[tag]
+            df = leer_mapa_dim(sesion.motor, cfg["table"], cfg["id"], cfg["keys"])
+            self.mapas[tag] = dict(zip(tuplas_sin_na(df, cfg["keys"]), df[cfg["id"]].tolist()))
+        return self.mapas[tag]
+
+    # Agrega al batch la columna id de la dimensión. Solo se buscan/insertan las claves distintas
+    # del batch, así que el costo es O(claves del batch) y no O(tamaño de la dimensión).
+    def resolver(self, sesion: SesionCarga, tag: str, df: pd.DataFrame) -> pd.DataFrame:
+        if self.modo_claves == "hash":
+            return self.resolver_hash(sesion, tag, df)
+        cfg = DIM_CFG[tag]; keys = cfg["keys"]; idcol = cfg["id"]
+        mapa = self.mapa(sesion, tag)
+        unicas = df[keys].drop_duplicates()
+        tuplas = tuplas_sin_na(unicas, keys)
+        faltan = np.array([t not in mapa for t in tuplas], dtype=bool)
+        if faltan.any():
+            nuevas = unicas[faltan]
+            insert_df = nuevas.merge(df[cfg["all_cols"]].drop_duplicates(subset=keys), on=keys, how="left")
+            for clave, id_ in self.insertar_nuevas(sesion, cfg, insert_df[cfg["all_cols"]]):
+                mapa[clave] = id_
+                if not self.claves_confirmadas:
+                    self.aprendidas.append((tag, clave, id_))
+        unicas = unicas.assign(**{idcol: [mapa.get(t) for t in tuplas]})
+        return df.merge(unicas, on=keys, how="left")
+
+    # Modo hash: id = clave_hash(llave) para cada llave distinta del batch. Las llaves que este
+    # proceso no vio antes se mandan a insertar en segundo plano; dos llaves distintas con el mismo
+    # id (colisión) detienen la carga.
+    def resolver_hash(self, sesion: SesionCarga, tag: str, df: pd.DataFrame) -> pd.DataFrame:
+        cfg = DIM_CFG[tag]; keys = cfg["keys"]; idcol = cfg["id"]
+        mapa = self.mapas.setdefault(tag, {})
+        vistos = self.ids_hash.setdefault(tag, {})
+        unicas = df[keys].drop_duplicates()
+        tuplas = tuplas_sin_na(unicas, keys)
+        ids = []
+        faltan = np.zeros(len(tuplas), dtype=bool)
+        for i, t in enumerate(tuplas):
+            id_ = mapa.get(t)
+            if id_ is None:
+                id_ = clave_hash(t)
+                otra = vistos.get(id_)
+                if otra is not None and texto_clave(otra) != texto_clave(t):
+                    raise ValueError(f"colisión de clave hash en {cfg['table']}: {otra} y {t} -> {id_}")
+                vistos[id_] = t
+                mapa[t] = id_
+                self.aprendidas.append((tag, t, id_))
+                faltan[i] = True
+            ids.append(id_)
+        unicas = unicas.assign(**{idcol: np.array(ids, dtype="int64")})
+        if faltan.any():
+            insert_df = unicas[faltan].merge(df[cfg["all_cols"]].drop_duplicates(subset=keys), on=keys, how="left")
+            self.insertar_hash(sesion, cfg, insert_df[[idcol] + cfg["all_cols"]])
+        return df.merge(unicas, on=keys, how="left")
+
+    # Inserta claves nuevas (ids SERIAL de la BD) y devuelve [(llave_natural, id)].
+    def insertar_nuevas(self, sesion: SesionCarga, cfg: dict, df_nuevas: pd.DataFrame) -> List[tuple]:
+        return insertar_claves_nuevas(sesion, cfg["table"], cfg["id"], cfg["keys"], cfg["all_cols"], df_nuevas)
+
+    # Manda a insertar en segundo plano claves nuevas que ya traen su id hash.
+    def insertar_hash(self, sesion: SesionCarga, cfg: dict, df_nuevas: pd.DataFrame):
+        self.pendientes.append(self.fondo.submit(
+            insertar_claves_hash, sesion, cfg["table"], cfg["id"], cfg["keys"], cfg["all_cols"], df_nuevas,
+        ))
+
+    # Espera los inserts de dimensiones en segundo plano y re-lanza su error, si hubo.
+    def esperar(self):
+        pendientes, self.pendientes = self.pendientes, []
+        for fut in pendientes:
+            fut.result()
+
+    # El lote se confirmó: lo aprendido ya está en la BD.
+    def confirmar(self):
+        self.aprendidas = []
+
+    # El lote se deshizo: espera lo que quedó en segundo plano y olvida las claves aprendidas en él.
+    def deshacer(self):
+        pendientes, self.pendientes = self.pendientes, []
+        for fut in pendientes:
+            try: fut.result()
+            except Exception: pass
+        for tag, clave, id_ in reversed(self.aprendidas):
+            self.mapas.get(tag, {}).pop(clave, None)
+            if self.ids_hash.get(tag, {}).get(id_) == clave:
+                del self.ids_hash[tag][id_]
+        self.aprendidas = []
+
+# Convierte a string “limpio” (strip) respetando pandas NA. Las categóricas (columnas leídas como
+# diccionario) se limpian solo sobre sus categorías y siguen siendo categóricas.
+def a_cadena(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return limpiar_categorias(s, lambda c: c.astype("string").str.strip())
+    return s.astype("string").str.strip()
+
+# Código entero como texto en su forma histórica ("5.0"). SEC_FUNC llega float64 en los Parquet sin
+# contrato (el transform la pasa por to_numeric) y así están las llaves de dim_programatica; un "5"
+# (int64 del contrato, texto de otro origen) se lleva a "5.0" para no crear otra fila por programática.
+PATRON_ENTERO = r"^(-?\d+)$"
+
+def a_codigo_entero(s: pd.Series) -> pd.Series:
+    return s.astype("string").str.strip().str.replace(PATRON_ENTERO, r"\1.0", regex=True)
+
+# Toma el batch fuente y arma un DataFrame normalizado con nombres de columnas de dimensiones/medidas.
+def construir_df_normalizado(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "ano_eje": pd.to_numeric(df["ANO_EJE"], errors="coerce"),
+        "mes_eje": pd.to_numeric(df["MES_EJE"], errors="coerce"),
+        # nivel
+        "nivel_gobierno_codigo": a_cadena(df["NIVEL_GOBIERNO"]),
+        "nivel_gobierno_nombre": a_cadena(df["NIVEL_GOBIERNO_NOMBRE"]),
+        # ejecutora
+        "sec_ejec": a_cadena(df["SEC_EJEC"]),
+        "ejecutora_codigo": a_cadena(df["EJECUTORA"]),
+        "ejecutora_nombre": a_cadena(df["EJECUTORA_NOMBRE"]),
+        "sector": a_cadena(df["SECTOR"]),
+        "sector_nombre": a_cadena(df["SECTOR_NOMBRE"]),
+        "pliego": a_cadena(df["PLIEGO"]),
+        "pliego_nombre": a_cadena(df["PLIEGO_NOMBRE"]),
+        "dep_ejecutora_codigo": a_cadena(df["DEPARTAMENTO_EJECUTORA"]),
+        "dep_ejecutora_nombre": a_cadena(df["DEPARTAMENTO_EJECUTORA_NOMBRE"]),
+        "prov_ejecutora_codigo": a_cadena(df["PROVINCIA_EJECUTORA"]),
+        "prov_ejecutora_nombre": a_cadena(df["PROVINCIA_EJECUTORA_NOMBRE"]),
+        "dist_ejecutora_codigo": a_cadena(df["DISTRITO_EJECUTORA"]),
+        "dist_ejecutora_nombre": a_cadena(df["DISTRITO_EJECUTORA_NOMBRE"]),
+        # programática
+        "programa_ppto": a_cadena(df["PROGRAMA_PPTO"]),
+        "programa_ppto_nombre": a_cadena(df["PROGRAMA_PPTO_NOMBRE"]),
+        "tipo_act_proy": a_cadena(df["TIPO_ACT_PROY"]),
+        "tipo_act_proy_nombre": a_cadena(df["TIPO_ACT_PROY_NOMBRE"]),
+        "producto_proyecto": a_cadena(df["PRODUCTO_PROYECTO"]),
+        "producto_proyecto_nombre": a_cadena(df["PRODUCTO_PROYECTO_NOMBRE"]),
+        "actividad_accion_obra": a_cadena(df["ACTIVIDAD_ACCION_OBRA"]),
+        "actividad_accion_obra_nombre": a_cadena(df["ACTIVIDAD_ACCION_OBRA_NOMBRE"]),
+        "sec_func": a_codigo_entero(df["SEC_FUNC"]),
+        # funcional
+        "funcion": a_cadena(df["FUNCION"]),
+        "funcion_nombre": a_cadena(df["FUNCION_NOMBRE"]),
+        "division_funcional": a_cadena(df["DIVISION_FUNCIONAL"]),
+        "division_funcional_nombre": a_cadena(df["DIVISION_FUNCIONAL_NOMBRE"]),
+        "grupo_funcional": a_cadena(df["GRUPO_FUNCIONAL"]),
+        "grupo_funcional_nombre": a_cadena(df["GRUPO_FUNCIONAL_NOMBRE"]),
+        # meta
+        "meta": a_cadena(df["META"]),
+        "finalidad": a_cadena(df["FINALIDAD"]),
+        "finalidad_nombre": a_cadena(df["FINALIDAD_NOMBRE"]),
+        "meta_nombre": a_cadena(df["META_NOMBRE"]),
+        "dep_meta_codigo": a_cadena(df["DEPARTAMENTO_META"]),
+        "dep_meta_nombre": a_cadena(df["DEPARTAMENTO_META_NOMBRE"]),
+        # financiera
+        "fuente_financiamiento": a_cadena(df["FUENTE_FINANCIAMIENTO"]),
+        "fuente_financiamiento_nombre": a_cadena(df["FUENTE_FINANCIAMIENTO_NOMBRE"]),
+        "rubro": a_cadena(df["RUBRO"]),
+        "rubro_nombre": a_cadena(df["RUBRO_NOMBRE"]),
+        "tipo_recurso": a_cadena(df["TIPO_RECURSO"]),
+        "tipo_recurso_nombre": a_cadena(df["TIPO_RECURSO_NOMBRE"]),
+        "categoria_gasto": a_cadena(df["CATEGORIA_GASTO"]),
+        "categoria_gasto_nombre": a_cadena(df["CATEGORIA_GASTO_NOMBRE"]),
+        # clasificador
+        "tipo_transaccion": pd.to_numeric(df["TIPO_TRANSACCION"], errors="coerce"),
+        "generica": a_cadena(df["GENERICA"]),
+        "generica_nombre": a_cadena(df["GENERICA_NOMBRE"]),
+        "subgenerica": a_cadena(df["SUBGENERICA"]),
+        "subgenerica_nombre": a_cadena(df["SUBGENERICA_NOMBRE"]),
+        "subgenerica_det": a_cadena(df["SUBGENERICA_DET"]),
+        "subgenerica_det_nombre": a_cadena(df["SUBGENERICA_DET_NOMBRE"]),
+        "especifica": a_cadena(df["ESPECIFICA"]),
+        "especifica_nombre": a_cadena(df["ESPECIFICA_NOMBRE"]),
+        "especifica_det": a_cadena(df["ESPECIFICA_DET"]),
+        "especifica_det_nombre": a_cadena(df["ESPECIFICA_DET_NOMBRE"]),
+        # métricas
+        "monto_pia": pd.to_numeric(df["MONTO_PIA"], errors="coerce"),
+        "monto_pim": pd.to_numeric(df["MONTO_PIM"], errors="coerce"),
+        "monto_certificado": pd.to_numeric(df["MONTO_CERTIFICADO"], errors="coerce"),
+        "monto_comprometido_anual": pd.to_numeric(df["MONTO_COMPROMETIDO_ANUAL"], errors="coerce"),
+        "monto_comprometido": pd.to_numeric(df["MONTO_COMPROMETIDO"], errors="coerce"),
+        "monto_devengado": pd.to_numeric(df["MONTO_DEVENGADO"], errors="coerce"),
+        "monto_girado": pd.to_numeric(df["MONTO_GIRADO"], errors="coerce"),
+    })
+
+# Camino con contrato de esquema (contrato_esquema.py): el Parquet ya viene limpio y tipado, así
+# que solo se seleccionan y renombran columnas. sec_func pasa a texto en Arrow (llave de texto): el
+# int64 5 queda "5.0", la misma llave que a_codigo_entero da en el camino sin contrato.
+def df_por_contrato(batch: pa.RecordBatch, renombres: Dict[str, str]) -> pd.DataFrame:
+    tabla = pa.Table.from_batches([batch]).select(list(renombres)).rename_columns(list(renombres.values()))
+    i = tabla.schema.get_field_index("sec_func")
+    texto = pc.binary_join_element_wise(pc.cast(tabla.column(i), pa.string()), ".0", "")
+    tabla = tabla.set_column(i, "sec_func", texto)
+    return tabla.to_pandas()
+
+# Filas de la muestra con la que verificar_llaves_contrato compara los dos caminos.
+FILAS_VERIFICACION = 2_000
+
+# Las llaves naturales de las dimensiones no pueden depender de si el archivo trae contrato: pasa una
+# muestra del archivo por df_por_contrato y por construir_df_normalizado y falla si alguna llave difiere
+# (una llave distinta crea otra fila en la dimensión y parte los hechos entre dos ids).
+def verificar_llaves_contrato(muestra: pa.RecordBatch, renombres: Dict[str, str]):
+    por_contrato = df_por_contrato(muestra, renombres)
+    src = muestra.to_pandas()
+    for c in COLUMNAS:
+        if c not in src.columns:
+            src[c] = pd.NA
+    normalizado = construir_df_normalizado(src)
+    for cfg in DIM_CFG.values():
+        a = [texto_clave(t) for t in tuplas_sin_na(por_contrato, cfg["keys"])]
+        b = [texto_clave(t) for t in tuplas_sin_na(normalizado, cfg["keys"])]
+        if a != b:
+            i = next(k for k, (x, y) in enumerate(zip(a, b)) if x != y)
+            raise ValueError(f"llave de {cfg['table']} distinta según el camino en la fila {i}: "
+                             f"contrato {a[i]!r} vs normalizado {b[i]!r}")
+
+# Cláusula ON CONFLICT del grano: "sum" suma las métricas a la fila existente (los montos de un
+# grano repartido en varios batches/unidades no se pierden); "ignore" conserva el DO NOTHING histórico;
+# "none" es un INSERT directo para una tabla sin índices todavía (carga de partición, --swap-partition).
+def clausula_conflicto(conflicto: str) -> str:
+    if conflicto == "none":
+        return ""
+    if conflicto == "ignore":
+        return "ON CONFLICT DO NOTHING"
+    sets = ", ".join(f"{m} = COALESCE(f.{m}, 0) + COALESCE(EXCLUDED.{m}, 0)" for m in METRICAS_FACT)
+    return f"ON CONFLICT ({', '.join(FKS_FACT)}) DO UPDATE SET {sets}"
+
+# Inserta la tabla de hechos en sublotes con una sentencia preparada (INSERT ... SELECT FROM unnest
+# de un array por columna), cada sublote en su savepoint. Los sublotes y la entrada del ledger (si
+# viene) quedan en el lote del llamador: el batch queda completo o no queda.
+def insertar_sublotes_fact(sesion: SesionCarga, df_fact: pd.DataFrame, filas_sublote: int,
+                           tabla: str = "mef.fact_gasto_mensual", conflicto: str = "ignore",
+                           ledger: tuple | None = None, ajuste: "AjusteTamanos | None" = None):
+    columnas = list(df_fact.columns)
+    tipos = ["bigint[]" if c in FKS_FACT else "numeric[]" for c in columnas]
+    sql = f"""
+        INSERT INTO {tabla} AS f ({", ".join(columnas)})
+        SELECT * FROM unnest({parametros(len(columnas))})
+        {clausula_conflicto(conflicto)}
+    """
+    total = len(df_fact)
+    offset = 0
+    while offset < total:
+        trozo = df_fact.iloc[offset: offset + (ajuste.filas_sublote if ajuste else filas_sublote)]
+        t0 = time.perf_counter()
+        with METRICAS.etapa("insert_sublote", filas=len(trozo)):
+            arrays = [trozo[c].to_numpy(dtype=object, na_value=None).tolist() for c in columnas]
+            sesion.paso("insert fact", lambda cur: sesion.ejecutar_preparada(cur, sql, tipos, arrays))
+        if ajuste is not None:
+            # objetos de la primera fila más su texto en el literal ARRAY[...]
+            muestra = 2 * sum(8 + sys.getsizeof(a[0]) for a in arrays)
+            ajuste.observar_sublote(len(trozo), time.perf_counter() - t0, muestra)
+        offset += len(trozo)
+    if ledger is not None:
+        sesion.ejecutar(*ledger)
+
+# Pasa el batch consolidado a una tabla Arrow con FKs int64 (ids hash de 64 bits) y métricas
+# float64 (NaN -> NULL).
+def tabla_arrow_fact(df_fact: pd.DataFrame) -> pa.Table:
+    columnas = {c: pa.array(df_fact[c].to_numpy(dtype="int64")) for c in FKS_FACT}
+    for c in METRICAS_FACT:
+        columnas[c] = pa.array(df_fact[c].to_numpy(dtype="float64"), from_pandas=True)
+    return pa.table(columnas)
+
+# Serializa un trozo Arrow como CSV (formato COPY csv) sin construir objetos Python por fila.
+def bytes_copy_texto(trozo: pa.Table) -> bytes:
+    buf = io.BytesIO()
+    pacsv.write_csv(trozo, buf, write_options=pacsv.WriteOptions(include_header=False))
+    return buf.getvalue()
+
+# Serializa un trozo Arrow en formato PGCOPY binario con un array estructurado de NumPy:
+# cada fila es [n_campos][len][int8]...[len][float8]..., todo big-endian y de ancho fijo.
+def bytes_copy_binario(trozo: pa.Table) -> bytes:
+    campos = [("n", ">i2")]
+    campos += [x for c in FKS_FACT for x in ((f"l_{c}", ">i4"), (c, ">i8"))]
+    campos += [x for c in METRICAS_FACT for x in ((f"l_{c}", ">i4"), (c, ">f8"))]
+    filas = np.empty(trozo.num_rows, dtype=np.dtype(campos))
+    filas["n"] = len(FKS_FACT) + len(METRICAS_FACT)
+    for c in FKS_FACT:
+        filas[f"l_{c}"] = 8
+        filas[c] = trozo.column(c).to_numpy()
+    for c in METRICAS_FACT:
+        filas[f"l_{c}"] = 8
+        filas[c] = trozo.column(c).to_numpy()
+    return CABECERA_PGCOPY + filas.tobytes() + COLA_PGCOPY
+
+# Inserta la tabla de hechos vía COPY a una tabla temporal y un único INSERT ... SELECT al destino,
+# dentro del lote del llamador. El formato binario es de ancho fijo: si hay métricas nulas el batch
+# se envía en texto.
+def insertar_copy_fact(sesion: SesionCarga, df_fact: pd.DataFrame, filas_sublote: int,
+                       formato: str = "text", tabla: str = "mef.fact_gasto_mensual", conflicto: str = "ignore",
+                       ledger: tuple | None = None, ajuste: "AjusteTamanos | None" = None):
+    tabla_arrow = tabla_arrow_fact(df_fact)
+    if formato == "binary" and any(tabla_arrow.column(c).null_count for c in METRICAS_FACT):
+        print("    [info] métricas nulas en el batch: COPY binario no aplica, uso texto")
+        formato = "text"
+    staging = TABLA_STAGING_FACT[formato]
+    tipo_metrica = TIPO_METRICA_STAGING[formato]
+    cols_sql = ", ".join(FKS_FACT + METRICAS_FACT)
+    ddl = (
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ("
+        + ", ".join([f"{c} BIGINT" for c in FKS_FACT] + [f"{c} {tipo_metrica}" for c in METRICAS_FACT])
+        + ") ON COMMIT DELETE ROWS"
+    )
+    copy_sql = (f"COPY {staging} ({cols_sql}) FROM STDIN WITH (FORMAT binary)" if formato == "binary"
+                else f"COPY {staging} ({cols_sql}) FROM STDIN WITH (FORMAT csv)")
+    serializar = bytes_copy_binario if formato == "binary" else bytes_copy_texto
+    merge_sql = f"""
+        INSERT INTO {tabla} AS f ({cols_sql})
+        SELECT {cols_sql} FROM {staging}
+        {clausula_conflicto(conflicto)}
+    """
+    sesion.ejecutar(ddl)
+    offset = 0
+    while offset < tabla_arrow.num_rows:
+        trozo = tabla_arrow.slice(offset, ajuste.filas_sublote if ajuste else filas_sublote)
+        t0 = time.perf_counter()
+        with METRICAS.etapa("copy_sublote", filas=trozo.num_rows, formato=formato) as m:
+            datos = serializar(trozo)
+            m["bytes"] = len(datos)
+            sesion.paso("copy fact", lambda cur: cur.copy_expert(copy_sql, io.BytesIO(datos)))
+        if ajuste is not None:
+            # el buffer serializado y la copia de BytesIO
+            ajuste.observar_sublote(trozo.num_rows, time.perf_counter() - t0, 2 * len(datos) / trozo.num_rows)
+        offset += trozo.num_rows
+    with METRICAS.etapa("merge_copy", filas=tabla_arrow.num_rows):
+        sesion.paso("merge fact", lambda cur: sesion.ejecutar_preparada(cur, merge_sql, [], []))
+    if ledger is not None:
+        sesion.ejecutar(*ledger)
+
+# Inserta el batch consolidado con el modo elegido en la CLI (values | copy).
+def insertar_fact(sesion: SesionCarga, df_fact: pd.DataFrame, filas_sublote: int,
+                  modo: str = "values", formato_copy: str = "text", conflicto: str = "ignore",
+                  ledger: tuple | None = None, tabla: str = "mef.fact_gasto_mensual",
+                  ajuste: "AjusteTamanos | None" = None):
+    if modo == "copy":
+        insertar_copy_fact(sesion, df_fact, filas_sublote, formato=formato_copy, tabla=tabla,
+                           conflicto=conflicto, ledger=ledger, ajuste=ajuste)
+    else:
+        insertar_sublotes_fact(sesion, df_fact, filas_sublote, tabla=tabla, conflicto=conflicto, ledger=ledger,
+                               ajuste=ajuste)
+
+# Agregación hash por el grano de la fact (FKS_FACT) sobre todo el archivo, no solo por batch.
+# Las filas se reparten en particiones por hash de las FKs; si el total en memoria supera
+# `max_filas`, cada partición se consolida y se vuelca a Parquet en un directorio temporal.
+# Al final cada partición se consolida por separado, así un grano sale una sola vez.
+# Con `persistente` (carpeta fija por archivo/huella/rango) el spill sobrevive a un corte: cada
+# volcado es un punto de reanudación que guarda en `estado.json` cuántas filas de la fuente ya están
+# en disco (`posicion`); `al_volcar(posicion)` lo confirma en el ledger antes de escribir el estado.
+class AgregadorFact:
+    def __init__(self, particiones: int = PARTICIONES_AGREGACION, max_filas: int = FILAS_AGREGACION_POR_DEFECTO,
+                 dir_spill: str | None = None, persistente: Path | None = None, al_volcar=None):
+        self.n = particiones
+        self.max_filas = max_filas
+        self.dir_spill = dir_spill
+        self.dir_tmp: Path | None = persistente
+        self.persistente = persistente is not None
+        self.al_volcar = al_volcar
+        self.memoria: List[List[pd.DataFrame]] = [[] for _ in range(particiones)]
+        self.volcados: List[List[Path]] = [[] for _ in range(particiones)]
+        self.filas_memoria = 0
+        self.filas_entrada = 0
+        self.posicion = 0            # filas de la fuente cubiertas por lo agregado
+        self.lectura_completa = False
+        self.ultimo_volcado = time.monotonic()
+
+    # Retoma el spill de una corrida cortada si su último punto está confirmado (`confirmado(posicion)`,
+    # p. ej. la entrada del ledger: sin ella los ids del spill pueden no existir en la BD). Si no, lo
+    # descarta. Devuelve True si hay algo que retomar.
+    def retomar(self, confirmado) -> bool:
+        ruta = self.dir_tmp / "estado.json"
+        try:
+            estado = json.loads(ruta.read_text(encoding="utf-8"))
+            valido = estado["particiones"] == self.n and confirmado(estado["posicion"])
+        except (OSError, ValueError, KeyError):
+            valido = False
+        if not valido:
+            shutil.rmtree(self.dir_tmp, ignore_errors=True)
+            return False
+        self.volcados = [[self.dir_tmp / nombre for nombre in v] for v in estado["volcados"]]
+        self.posicion = estado["posicion"]
+        self.filas_entrada = estado["filas_entrada"]
+        self.lectura_completa = estado["lectura_completa"]
+        # lo volcado después del último punto no está en el estado: se vuelve a leer
+        listados = {r for v in self.volcados for r in v}
+        for r in self.dir_tmp.glob("p*.parquet"):
+            if r not in listados:
+                r.unlink(missing_ok=True)
+        return True
+
+    @staticmethod
+    def consolidar(partes: List[pd.DataFrame]) -> pd.DataFrame:
+        df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+        return df.groupby(FKS_FACT, as_index=False, sort=False)[METRICAS_FACT].sum()
+
+    # `posicion`: filas de la fuente leídas hasta el final de este batch (incluye las filtradas).
+    # Un grano va siempre a la misma partición aunque sus FKs lleguen como float64 (ver TIPOS_FKS).
+    def agregar(self, df_fact: pd.DataFrame, posicion: int | None = None):
+        if df_fact.empty:
+            return
+        df_fact = df_fact.astype(TIPOS_FKS, copy=False)
+        part = pd.util.hash_pandas_object(df_fact[FKS_FACT], index=False).to_numpy() % self.n
+        for p, trozo in df_fact.groupby(part, sort=False):
+            self.memoria[p].append(trozo)
+        self.filas_memoria += len(df_fact)
+        self.filas_entrada += len(df_fact)
+        if posicion is not None:
+            self.posicion = posicion
+        if self.filas_memoria > self.max_filas or (
+                self.persistente and time.monotonic() - self.ultimo_volcado > SEG_PUNTO_AGREGACION):
+            self._volcar()
+
+    # Fin del pase de lectura: con spill persistente todo pasa a disco, así una caída durante la
+    # inserción de particiones no obliga a leer el archivo otra vez.
+    def terminar_lectura(self):
+        self.lectura_completa = True
+        if self.persistente:
+            self._volcar()
+
+    def _volcar(self):
+        if self.dir_tmp is None:
+            self.dir_tmp = Path(tempfile.mkdtemp(prefix="mef_agg_", dir=self.dir_spill))
+        self.dir_tmp.mkdir(parents=True, exist_ok=True)
+        for p in range(self.n):
+            if not self.memoria[p]:
+                continue
+            ruta = self.dir_tmp / f"p{p:03d}_{len(self.volcados[p]):04d}.parquet"
+            self.consolidar(self.memoria[p]).to_parquet(ruta, index=False)
+            self.volcados[p].append(ruta)
+            self.memoria[p] = []
+        self.filas_memoria = 0
+        self.ultimo_volcado = time.monotonic()
+        if self.persistente:
+            if self.al_volcar is not None:
+                self.al_volcar(self.posicion)
+            estado = {"particiones": self.n, "posicion": self.posicion, "filas_entrada": self.filas_entrada,
+                      "lectura_completa": self.lectura_completa,
+                      "volcados": [[r.name for r in v] for v in self.volcados]}
+            tmp = self.dir_tmp / "estado.json.tmp"
+            tmp.write_text(json.dumps(estado), encoding="utf-8")
+            os.replace(tmp, self.dir_tmp / "estado.json")
+        print(f"    [spill] agregación volcada a {self.dir_tmp}"
+              + (f" (punto de reanudación: {self.posicion:,} filas)" if self.persistente else ""))
+
+    # Devuelve (partición, DataFrame consolidado) de a una, liberando memoria y disco por el camino.
+    # Las particiones con `saltar(p)` (ya cargadas según el ledger) no se leen.
+    def particiones(self, saltar=None):
+        for p in range(self.n):
+            if saltar is not None and saltar(p):
+                self.memoria[p] = []
+                continue
+            partes = [pd.read_parquet(r) for r in self.volcados[p]] + self.memoria[p]
+            self.memoria[p] = []
+            if not partes:
+                continue
+            yield p, self.consolidar(partes)
+            for r in self.volcados[p]:
+                r.unlink(missing_ok=True)
+
+    # `conservar`: deja el spill persistente para la próxima corrida (tras un error).
+    def cerrar(self, conservar: bool = False):
+        if self.dir_tmp is not None and not (conservar and self.persistente):
+            shutil.rmtree(self.dir_tmp, ignore_errors=True)
+
+# Tamaños de batch Arrow y de sublote INSERT/COPY ajustados en vivo a --memory-budget (uno por archivo:
+# cada año tiene su propio ancho de fila). El batch sale de los bytes por fila medidos en el DataFrame
+# normalizado y del RSS observado; el sublote crece mientras mejoran las filas/s medidas y se achica si
+# una sentencia tarda demasiado o no cabe en su parte del presupuesto.
+class AjusteTamanos:
+    def __init__(self, presupuesto: int, filas_batch: int, filas_sublote: int, profundidad_cola: int,
+                 batch_fijo: bool = False):
+        self.presupuesto = presupuesto
+        self.en_cola = max(profundidad_cola, 0)
+        self.batch_fijo = batch_fijo  # reanudación por número de batch: el tamaño no puede cambiar
+        self.filas_batch = filas_batch if batch_fijo else max(min(filas_batch, FILAS_SONDEO), FILAS_BATCH_MIN)
+        self.filas_sublote = filas_sublote
+        self.bytes_fila: float | None = None          # pico estimado por fila de batch
+        self.bytes_fila_sublote = float(BYTES_FILA_SUBLOTE_INICIAL)
+        self.reserva_agregacion = 0
+        self.mejor_sublote: tuple | None = None       # (filas, filas/s)
+        self.techo_sublote = FILAS_SUBLOTE_MAX
+        self.historial_batch = [self.filas_batch]
+        self.historial_sublote = [self.filas_sublote]
+        self.avisado = False
+        rss = rss_actual_mb()
+        # intérprete, librerías y mapas de dimensiones; se corrige con el RSS de cada batch
+        self.base = int(rss * 2**20) if rss is not None else 0
+
+    # Filas de la agregación por archivo que entran en su parte del presupuesto.
+    def filas_agregacion(self, max_filas: int) -> int:
+        filas = min(max_filas, int(self.presupuesto * FRACCION_AGREGACION / BYTES_FILA_AGREGADA))
+        self.reserva_agregacion = filas * BYTES_FILA_AGREGADA
+        return filas
+
+    # Mide el batch recién normalizado: lo que queda en cola, el pico del que se procesa y el Arrow.
+    def observar_batch(self, df: pd.DataFrame, bytes_arrow: int | None):
+        if self.batch_fijo or df.empty:
+            return
+        bytes_df = df.memory_usage(deep=True, index=False).sum() / len(df)
+        medido = bytes_df * (self.en_cola + FACTOR_PICO_PANDAS) + 2 * (bytes_arrow or 0) / len(df)
+        self.bytes_fila = medido if self.bytes_fila is None else 0.5 * self.bytes_fila + 0.5 * medido
+
+    # Tras cada batch: lo que el modelo no explica del RSS pasa a la base y se recalcula el tamaño.
+    def tras_batch(self):
+        if self.batch_fijo or self.bytes_fila is None:
+            return
+        rss_mb = rss_actual_mb()
+        rss = int(rss_mb * 2**20) if rss_mb is not None else None
+        if rss is not None:
+            self.base = max(self.base, rss - int(self.filas_batch * self.bytes_fila))
+        disponible = (self.presupuesto - self.base - self.reserva_agregacion
+                      - self.filas_sublote * self.bytes_fila_sublote)
+        objetivo = int(disponible / self.bytes_fila)
+        objetivo = min(objetivo, self.filas_batch * 2)  # crece de a poco; baja de una vez
+        if rss is not None and rss > UMBRAL_RSS * self.presupuesto:
+            objetivo = min(objetivo, self.filas_batch // 2)
+        if objetivo < FILAS_BATCH_MIN and not self.avisado:
+            print(f"    [warn] --memory-budget {self.presupuesto / 2**20:,.0f} MB no alcanza para "
+                  f"{FILAS_BATCH_MIN:,} filas por batch (~{self.bytes_fila:,.0f} B/fila); sigo con el mínimo")
+            self.avisado = True
+        objetivo = max(FILAS_BATCH_MIN, min(FILAS_BATCH_MAX, objetivo))
+        if abs(objetivo - self.filas_batch) > 0.2 * self.filas_batch:
+            print(f"    [ajuste] batch {self.filas_batch:,} -> {objetivo:,} filas (~{self.bytes_fila:,.0f} B/fila"
+                  + (f", RSS {rss_mb:,.0f} MB)" if rss_mb is not None else ")"))
+            self.filas_batch = objetivo
+            self.historial_batch.append(objetivo)
+
+    # Mide un sublote enviado (filas, segundos, bytes por fila del buffer) y elige el siguiente tamaño.
+    def observar_sublote(self, filas: int, seg: float, bytes_fila: float):
+        self.bytes_fila_sublote = 0.5 * self.bytes_fila_sublote + 0.5 * bytes_fila
+        actual = self.filas_sublote
+        if filas < actual or seg <= 0:
+            return  # cola del batch: no representa al tamaño actual
+        tasa = filas / seg
+        if seg > LATENCIA_MAX_SUBLOTE_SEG:
+            nuevo = actual // 2
+            self.techo_sublote = actual
+        elif self.mejor_sublote is None or tasa > self.mejor_sublote[1] * 1.05:
+            self.mejor_sublote = (actual, tasa)
+            nuevo = int(actual * 1.5)
+        elif tasa < self.mejor_sublote[1] * 0.9 and actual > self.mejor_sublote[0]:
+            self.techo_sublote = actual
+            nuevo = self.mejor_sublote[0]
+        else:
+            nuevo = actual
+        por_memoria = int(self.presupuesto * FRACCION_SUBLOTE / self.bytes_fila_sublote)
+        nuevo = max(FILAS_SUBLOTE_MIN, min(nuevo, self.techo_sublote, por_memoria, FILAS_SUBLOTE_MAX))
+        if nuevo != actual:
+            self.filas_sublote = nuevo
+            self.historial_sublote.append(nuevo)
+
+    # Tamaños usados en el archivo (consola y métricas).
+    def resumen(self, etiqueta: str):
+        b, sl = self.historial_batch, self.historial_sublote
+        bytes_fila = f"~{self.bytes_fila:,.0f} B/fila" if self.bytes_fila else "sin medir"
+        print(f"  [ajuste] {etiqueta}: batch {min(b):,}-{max(b):,} filas (final {b[-1]:,}, {bytes_fila}) | "
+              f"sublote {min(sl):,}-{max(sl):,} (final {sl[-1]:,}) | presupuesto "
+              f"{self.presupuesto / 2**20:,.0f} MB | RSS pico {rss_pico_mb()} MB")
+        METRICAS.registrar("ajuste", archivo=etiqueta, presupuesto_mb=round(self.presupuesto / 2**20),
+                           filas_batch=b, filas_sublote=sl, batch_fijo=self.batch_fijo,
+                           bytes_fila=round(self.bytes_fila) if self.bytes_fila else None,
+                           bytes_fila_sublote=round(self.bytes_fila_sublote), rss_pico_mb=rss_pico_mb())
+
+# Une granos leídos en un solo RecordBatch (diccionarios unificados entre granos).
+def unir_batches(granos: List[pa.RecordBatch]) -> pa.RecordBatch:
+    if len(granos) == 1:
+        return granos[0]
+    return pa.Table.from_batches(granos).unify_dictionaries().combine_chunks().to_batches()[0]
+
+# Batches Arrow del tamaño que pide `ajuste` en cada momento: se lee de a GRANO_LECTURA filas y se
+# junta hasta ajuste.filas_batch (lo lee el hilo productor mientras el consumidor lo va cambiando).
+def batches_adaptativos(pf: ParquetAnio, columnas: List[str], row_groups: List[int] | None,
+                        ajuste: AjusteTamanos):
+    granos, filas = [], 0
+    for grano in pf.iter_batches(batch_size=GRANO_LECTURA, columns=columnas, row_groups=row_groups):
+        granos.append(grano)
+        filas += grano.num_rows
+        if filas >= ajuste.filas_batch:
+            yield unir_batches(granos)
+            granos, filas = [], 0
+    if granos:
+        yield unir_batches(granos)
+
+# Etapa productora: decodifica cada batch Arrow, normaliza y resuelve tiempo_id (sin tocar la BD).
+# Aplica la reanudación por batch; los batches no convertibles salen como (idx, None).
+# Con `renombres` (contrato válido) no se re-normaliza: solo se renombran columnas.
+# La reanudación por filas (spill persistente) descarta las primeras `filas_saltar` filas; cada
+# DataFrame lleva en attrs["posicion"] las filas de la fuente leídas hasta su final, desde `posicion`.
+def preparar_batches(batches, dt: pd.DataFrame, batch_inicio: int = 1, batch_fin: int | None = None,
+                     saltar=None, tiempos: set | None = None, renombres: Dict[str, str] | None = None,
+                     filas_saltar: int = 0, posicion: int = 0):
+    idx = 0
+    # el tiempo de cada next() es la decodificación Parquet -> Arrow del batch
+    for batch in METRICAS.iterar("leer_parquet", batches, lambda b: {"filas": b.num_rows, "bytes": b.nbytes}):
+        idx += 1
+        posicion += batch.num_rows
+        if filas_saltar:
+            if batch.num_rows <= filas_saltar:
+                filas_saltar -= batch.num_rows
+                continue
+            batch = batch.slice(filas_saltar)
+            filas_saltar = 0
+        if idx < batch_inicio or (saltar is not None and saltar(idx)):
+            continue
+        if batch_fin is not None and idx > batch_fin:
+            print(f"  [info] end_batch={batch_fin} alcanzado. Detengo archivo.")
+            break
+
+        try:
+            with METRICAS.etapa("a_pandas", filas=batch.num_rows):
+                if renombres is not None:
+                    df = df_por_contrato(batch, renombres)
+                else:
+                    src = batch.to_pandas()
+        except Exception as e:
+            print(f"  [warn] batch {idx} no convertible a pandas: {type(e).__name__}. salto el batch.")
+            yield idx, None
+            continue
+
+        if renombres is None:
+            with METRICAS.etapa("construir_df_normalizado", filas=batch.num_rows):
+                for c in COLUMNAS:
+                    if c not in src.columns:
+                        src[c] = pd.NA
+                df = construir_df_normalizado(src)
+                del src
+
+        # (anio, mes) -> tiempo_id
+        with METRICAS.etapa("tiempo_id", filas=len(df)):
+            df_time = df[["ano_eje","mes_eje"]].rename(columns={"ano_eje":"anio","mes_eje":"mes"})
+            df = pd.concat([df, df_time], axis=1)
+            df = df.merge(dt, how="left", on=["anio","mes"])
+            df.drop(columns=["anio","mes"], inplace=True)
+        df.attrs["bytes_arrow"] = batch.nbytes
+        if tiempos is not None:
+            df = df[df["tiempo_id"].isin(tiempos)]
+            if df.empty:
+                continue
+        df.attrs["posicion"] = posicion
+        yield idx, df
+
+# Error del hilo productor, re-lanzado en el consumidor.
+class _ErrorProductor:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+# Consume un iterable en un hilo de fondo con una cola acotada: el productor se bloquea cuando hay
+# `profundidad` elementos listos (backpressure), así la memoria queda en ~profundidad + 2 batches.
+# profundidad <= 0 desactiva el pipeline (todo en el hilo actual).
+def en_segundo_plano(iterable, profundidad: int):
+    if profundidad <= 0:
+        yield from iterable
+        return
+    cola: queue.Queue = queue.Queue(maxsize=profundidad)
+    parar = threading.Event()
+    fin = object()
+
+    def encolar(item) -> bool:
+        while not parar.is_set():
+            try:
+                cola.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def productor():
+        try:
+            for item in iterable:
+                if not encolar(item):
+                    return
+            encolar(fin)
+        except BaseException as e:
+            encolar(_ErrorProductor(e))
+
+    hilo = threading.Thread(target=productor, name="pipeline-lectura", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is fin:
+                return
+            if isinstance(item, _ErrorProductor):
+                raise item.error
+            yield item
+    finally:
+        parar.set()
+        hilo.join(timeout=5)
+
+# Carga un Parquet (o un rango de sus row groups) registrando la etapa "archivo" en las métricas.
+# Con --profile la carga corre bajo cProfile y sin pipeline (cProfile solo ve el hilo actual).
+def cargar_parquet(sesion: SesionCarga | None, ruta_parquet: Path, *args, **kw) -> bool:
+    if METRICAS.perfil:
+        kw["profundidad_cola"] = 0
+    rgs = kw.get("row_groups")
+    with METRICAS.etapa("archivo", archivo=ruta_parquet.name, row_groups=rgs) as m:
+        try:
+            pf = ParquetAnio(ruta_parquet)
+            m["filas"] = pf.filas(rgs)
+            m["bytes"] = pf.bytes
+        except Exception:
+            pass  # _cargar_parquet reporta el error al abrirlo
+        with METRICAS.perfilar(ruta_parquet.name):
+            m["ok"] = _cargar_parquet(sesion, ruta_parquet, *args, **kw)
+    return m["ok"]
+
+# Carga un Parquet por batches Arrow, garantiza dimensiones, resuelve FKs y inserta hechos consolidados.
+# Cada batch es un lote de la sesión (dimensiones + hechos + ledger en una transacción); con
+# --consolidate file el lote del batch lleva sus dimensiones y cada partición consolidada el suyo.
+# Con `almacen` (--sink parquet) los hechos consolidados se escriben en el almacén Parquet y no en la BD.
+def _cargar_parquet(sesion: SesionCarga | None, ruta_parquet: Path, filas_batch: int, filas_sublote: int,
+                   batch_inicio: int = 1, batch_fin: int | None = None,
+                   modo_fact: str = "values", formato_copy: str = "text",
+                   indice: "IndiceClavesDim | None" = None, row_groups: List[int] | None = None,
+                   profundidad_cola: int = PROFUNDIDAD_COLA_POR_DEFECTO,
+                   consolidar: str = "file", conflicto: str = "ignore",
+                   max_filas_agregacion: int = FILAS_AGREGACION_POR_DEFECTO,
+                   ledger: LedgerCarga | None = None, tiempos: set | None = None,
+                   tabla_fact: str = "mef.fact_gasto_mensual",
+                   almacen: "AlmacenParquet | None" = None,
+                   presupuesto_memoria: int | None = None) -> bool:
+    etiqueta = ruta_parquet.name
+    if row_groups is not None:
+        etiqueta += f" [row groups {row_groups[0]}-{row_groups[-1]}]"
+    print(f"[proc] {etiqueta}")
+
+    try:
+        # texto de baja cardinalidad como diccionario (categóricas en pandas)
+        pf = ParquetAnio(ruta_parquet, read_dictionary=COLS_DICCIONARIO)
+    except Exception as e:
+        print(f"  [error] no pude abrir {ruta_parquet.name} como Parquet: {type(e).__name__}: {e}")
+        return False
+
+    # contrato de esquema: se valida una vez por archivo
+    renombres, motivo = leer_contrato(pf.schema_arrow)
+    if renombres is None:
+        print(f"  [info] {motivo}: se normaliza cada batch")
+    else:
+        muestra = next(pf.iter_batches(batch_size=FILAS_VERIFICACION, columns=list(renombres)), None)
+        if muestra is not None:
+            verificar_llaves_contrato(muestra, renombres)
+    columnas = COLUMNAS if renombres is None else list(renombres)
+
+    # --memory-budget: el tamaño del batch Arrow se decide en vivo salvo que la reanudación dependa
+    # del número de batch (--start-batch/--end-batch o unidades batchN del ledger)
+    ajuste = None
+    if presupuesto_memoria:
+        batch_fijo = batch_inicio != 1 or batch_fin is not None or (ledger is not None and consolidar != "file")
+        ajuste = AjusteTamanos(presupuesto_memoria, filas_batch, filas_sublote, profundidad_cola, batch_fijo)
+        if consolidar == "file":
+            max_filas_agregacion = ajuste.filas_agregacion(max_filas_agregacion)
+        print(f"  [ajuste] presupuesto {presupuesto_memoria / 2**20:,.0f} MB: batch inicial "
+              f"{ajuste.filas_batch:,}{' (fijo)' if batch_fijo else ''} | sublote {ajuste.filas_sublote:,} | "
+              f"agregación en memoria {max_filas_agregacion:,} filas")
+    # índice de claves compartido entre archivos (si no viene, uno local al archivo)
+    if indice is None:
+        indice = IndiceClavesDim()
+    dt = indice.mapa_tiempo(sesion)
+
+    # Solo algunos meses (--incremental, --swap-partition, --sink parquet): se leen solo los row groups
+    # cuyas estadísticas ANO_EJE/MES_EJE los pueden contener. En el layout hive cada row group es de un mes.
+    leer = row_groups
+    if tiempos is not None:
+        meses = {(int(a), int(m)) for t, a, m in dt[["tiempo_id", "anio", "mes"]].itertuples(index=False)
+                 if t in tiempos}
+        candidatos = pf.row_groups_de_meses(meses)
+        if row_groups is not None:
+            candidatos = [j for j in candidatos if j in set(row_groups)]
+        total = pf.num_row_groups if row_groups is None else len(row_groups)
+        if len(candidatos) < total:
+            print(f"  [poda] {len(candidatos)}/{total} row group(s) pueden tener los meses pedidos")
+            METRICAS.registrar("poda", archivo=ruta_parquet.name, row_groups=len(candidatos), total=total,
+                               filas=pf.filas(candidatos))
+        leer = candidatos
+
+    kw_insert = dict(modo=modo_fact, formato_copy=formato_copy, conflicto=conflicto, tabla=tabla_fact,
+                     ajuste=ajuste)
+
+    # Unidades del ledger: batches (consolidación por batch) o particiones hash (por archivo).
+    rango = nombre_rango(row_groups) if row_groups else "archivo"
+    tipo = f"part{PARTICIONES_AGREGACION}" if consolidar == "file" else f"batch{filas_batch}"
+    saltar = None
+    if ledger is not None:
+        previos = ledger.tipos(rango)
+        if previos and previos != {tipo}:
+            raise ValueError(f"{etiqueta} quedó a medias con unidades {sorted(previos)}; "
+                             f"reanuda con las mismas opciones (--batch/--consolidate)")
+        if consolidar != "file":
+            saltar = lambda i: ledger.hecho(f"{rango}/{tipo}:{i}")
+        hechas = sum(1 for u in ledger.hechas if u.startswith(f"{rango}/"))
+        if hechas:
+            print(f"  [ledger] {hechas} unidad(es) ya confirmadas en {rango}; se saltan")
+
+    # Con ledger el spill de --consolidate file es persistente: cada volcado queda confirmado en el
+    # ledger (unidad "lectura@<filas>") y una corrida cortada retoma la lectura desde ahí.
+    agregador = None
+    filas_saltar = posicion = 0
+    if consolidar == "file" and ledger is not None and batch_inicio == 1 and batch_fin is None:
+        def punto(filas: int):
+            unidad = f"{rango}/{tipo}:lectura@{filas}"
+            sesion.lote("ledger", lambda: sesion.ejecutar(*ledger.entrada(unidad, filas)))
+            ledger.hechas.add(unidad)
+        agregador = AgregadorFact(max_filas=max_filas_agregacion, persistente=dir_agregacion(ledger, rango),
+                                  al_volcar=punto)
+        if agregador.retomar(lambda filas: ledger.hecho(f"{rango}/{tipo}:lectura@{filas}")):
+            if agregador.lectura_completa:
+                print(f"  [reanudo] lectura completa en {agregador.dir_tmp}; solo faltan particiones")
+                leer = []
+            else:
+                print(f"  [reanudo] {agregador.posicion:,} filas ya agregadas en {agregador.dir_tmp}")
+                # los row groups ya leídos enteros no se abren; del siguiente se descarta el principio
+                leer = list(range(pf.num_row_groups)) if leer is None else list(leer)
+                filas_saltar = agregador.posicion
+                while leer and pf.filas(leer[:1]) <= filas_saltar:
+                    filas_saltar -= pf.filas(leer[:1])
+                    posicion += pf.filas(leer[:1])
+                    leer.pop(0)
+    elif consolidar == "file":
+        agregador = AgregadorFact(max_filas=max_filas_agregacion)
+
+    if ajuste is not None and not ajuste.batch_fijo:
+        batches = batches_adaptativos(pf, columnas, leer, ajuste)
+    else:
+        batches = pf.iter_batches(batch_size=filas_batch, columns=columnas, row_groups=leer)
+
+    # Lectura + normalización en un hilo de fondo; este hilo resuelve dimensiones e inserta.
+    preparados = en_segundo_plano(
+        preparar_batches(batches, dt, batch_inicio, batch_fin, saltar, tiempos, renombres,
+                         filas_saltar, posicion), profundidad_cola
+    )
+    # Dimensiones del batch y, si se consolida por batch, sus hechos y su entrada del ledger: todo
+    # corre dentro del lote, así que un reintento lo repite completo. Devuelve los hechos consolidados.
+    def procesar_batch(idx: int, df: pd.DataFrame) -> pd.DataFrame | None:
+        filas_fuente = len(df)
+        unidad = f"{rango}/{tipo}:{idx}"
+
+        # upsert/merge dims contra el índice en memoria
+        for tag in ORDEN_DIMS:
+            with METRICAS.etapa(f"dim:{tag}", filas=filas_fuente):
+                df = indice.resolver(sesion, tag, df)
+
+        ok_mask = df[FKS_FACT].notna().all(axis=1)
+        filas_fk_ok = int(ok_mask.sum())
+        print(f"    [ok] batch {idx}: FKs completas {filas_fk_ok:,}/{filas_fuente:,}")
+
+        with METRICAS.etapa("esperar_dims"):
+            indice.esperar()
+        if filas_fk_ok == 0:
+            nulos = {c: int(df[c].isna().sum()) for c in FKS_FACT}
+            print(f"  [warn] lote sin filas insertables. Nulos por FK: {nulos}")
+            if ledger is not None and agregador is None:
+                sesion.ejecutar(*ledger.entrada(unidad, filas_fuente, 0))
+            return None
+
+        with METRICAS.etapa("groupby", filas=filas_fk_ok):
+            fact_df = df.loc[ok_mask, FKS_FACT + METRICAS_FACT].astype(TIPOS_FKS)
+            fact_df = fact_df.groupby(FKS_FACT, as_index=False)[METRICAS_FACT].sum()
+        print(f"  [info] batch {idx}: fuente={filas_fuente:,} | fk_ok={filas_fk_ok:,} | consolidadas={len(fact_df):,}")
+
+        if agregador is None:
+            if almacen is not None:
+                almacen.escribir_fact(fact_df)
+            else:
+                entrada = ledger.entrada(unidad, filas_fuente, len(fact_df)) if ledger is not None else None
+                insertar_fact(sesion, fact_df, filas_sublote, ledger=entrada, **kw_insert)
+                print(f"  [ok] batch {idx} insertado (consolidadas={len(fact_df):,})")
+        return fact_df
+
+    completo = False
+    try:
+        for idx, df in preparados:
+            if df is None:
+                continue
+            t_batch = time.perf_counter()
+            filas_fuente = len(df)
+            bytes_arrow = df.attrs.get("bytes_arrow")
+            if ajuste is not None:
+                ajuste.observar_batch(df, bytes_arrow)
+
+            fact_df = en_lote(sesion, f"batch {idx}", lambda: procesar_batch(idx, df), indice)
+            consolidadas = 0 if fact_df is None else len(fact_df)
+            if agregador is not None and fact_df is not None:
+                # después del commit: un lote repetido no suma dos veces
+                with METRICAS.etapa("agregar_archivo", filas=consolidadas):
+                    agregador.agregar(fact_df, df.attrs.get("posicion"))
+            METRICAS.batch(filas_fuente, time.perf_counter() - t_batch, archivo=ruta_parquet.name, batch=idx,
+                           bytes=bytes_arrow, consolidadas=consolidadas)
+            if ajuste is not None:
+                ajuste.tras_batch()
+
+        if agregador is not None:
+            if not agregador.lectura_completa:
+                agregador.terminar_lectura()
+            # Consolidación global: cada grano sale una sola vez por archivo/unidad.
+            total = 0
+            hecha = (lambda p: ledger.hecho(f"{rango}/{tipo}:{p}")) if ledger is not None else None
+            for p, fact_df in METRICAS.iterar("consolidar_particion", agregador.particiones(hecha),
+                                              lambda x: {"filas": len(x[1])}):
+                unidad = f"{rango}/{tipo}:{p}"
+                total += len(fact_df)
+                entrada = ledger.entrada(unidad, None, len(fact_df)) if ledger is not None else None
+                if almacen is not None:
+                    almacen.escribir_fact(fact_df)
+                else:
+                    sesion.lote(f"partición {p}", lambda: insertar_fact(sesion, fact_df, filas_sublote,
+                                                                      ledger=entrada, **kw_insert))
+                    print(f"  [ok] partición {p} insertada (consolidadas={len(fact_df):,})")
+            print(f"  [info] {etiqueta}: filas por batch={agregador.filas_entrada:,} | consolidadas archivo={total:,}")
+        completo = True
+    finally:
+        if agregador is not None:
+            agregador.cerrar(conservar=not completo)
+    if ajuste is not None:
+        ajuste.resumen(etiqueta)
+
+    if ledger is not None:
+        filas = pf.filas(row_groups)
+        sesion.lote("ledger", lambda: sesion.ejecutar(*ledger.entrada(f"{rango}:*", filas)))
+        ledger.hechas.add(f"{rango}:*")
+    return True
+
+# Huella por mes del Parquet: {(anio, mes): (filas, checksum)} (ver contrato_esquema.huellas_mes).
+# En un año hive las partes que traen la huella en su metadata no se leen.
+def huellas_mes_parquet(ruta: Path, filas_batch: int) -> Dict[tuple, tuple]:
+    huellas: Dict[tuple, tuple] = {}
+    for pf in ParquetAnio(ruta).archivos:
+        guardadas = leer_huellas_mes(pf.schema_arrow)
+        if guardadas is None:
+            guardadas = huellas_mes(b.to_pandas() for b in pf.iter_batches(batch_size=filas_batch, columns=COLUMNAS))
+        for k, (filas, huella) in guardadas.items():  # el checksum es una suma: las partes se combinan sumando
+            f0, h0 = huellas.get(k, (0, "0"))
+            huellas[k] = (f0 + filas, f"{(int(h0, 16) + int(huella, 16)) % 2**64:016x}")
+    return huellas
+
+# Modo --incremental: compara la huella de cada mes del Parquet con la guardada en la BD y solo
+# reemplaza los tiempo_id que cambiaron. Los meses se cargan primero en una tabla suelta (como
+# --swap-partition) y una sola transacción corta borra los viejos de la fact, copia los nuevos y
+# actualiza las huellas: un corte o un error en la carga deja la fact con los meses anteriores.
+def cargar_incremental(sesion: SesionCarga, ruta: Path, indice: "IndiceClavesDim", opciones: dict) -> bool:
+    motor = sesion.motor
+    print(f"[delta] {ruta.name}: calculando huellas por mes…")
+    huellas = huellas_mes_parquet(ruta, opciones["filas_batch"])
+    dt = indice.mapa_tiempo(sesion)
+    a_tiempo = {(int(a), int(m)): int(t) for t, a, m in dt[["tiempo_id", "anio", "mes"]].itertuples(index=False)}
+    por_tiempo = {a_tiempo[k]: (k, v) for k, v in huellas.items() if k in a_tiempo}
+    if len(por_tiempo) < len(huellas):
+        print(f"  [warn] meses sin tiempo_id en dim_tiempo: {sorted(set(huellas) - set(a_tiempo))}")
+
+    with motor.connect() as con:
+        guardadas = {
+            t: (f, h) for t, f, h in con.execute(
+                text("SELECT tiempo_id, filas, huella FROM mef.etl_huella_mes WHERE tiempo_id = ANY(:t)"),
+                {"t": list(por_tiempo)},
+            ).all()
+        }
+    cambiados = sorted(t for t, (_, v) in por_tiempo.items() if guardadas.get(t) != v)
+    if not cambiados:
+        print(f"[skip] {ruta.name}: ningún mes cambió")
+        return True
+    meses = [f"{por_tiempo[t][0][0]}-{por_tiempo[t][0][1]:02d}" for t in cambiados]
+    print(f"[delta] {ruta.name}: {len(cambiados)} mes(es) a reemplazar: {', '.join(meses)}")
+
+    # consolidación por archivo: cada grano sale una vez y la tabla suelta no necesita ON CONFLICT
+    prefijo = f"fact_gasto_mensual_delta_{anio_de_archivo(ruta)}_c"
+    nueva = f"{prefijo}{int(time.time())}"
+    with motor.begin() as con:
+        # las que dejó una corrida del mismo año que terminó sin pasar por el except (kill)
+        for vieja in con.execute(text("SELECT tablename FROM pg_tables WHERE schemaname = 'mef' "
+                                      "AND starts_with(tablename, :p)"), {"p": prefijo}).scalars().all():
+            con.execute(text(f"DROP TABLE mef.{vieja};"))
+        con.execute(text(f"CREATE TABLE mef.{nueva} (LIKE mef.fact_gasto_mensual INCLUDING DEFAULTS);"))
+    try:
+        opciones = {**opciones, "consolidar": "file", "conflicto": "none"}
+        if not cargar_parquet(sesion, ruta, indice=indice, tiempos=set(cambiados), tabla_fact=f"mef.{nueva}",
+                              **opciones):
+            raise RuntimeError("no se pudo leer el Parquet")
+
+        columnas = ", ".join(FKS_FACT + METRICAS_FACT)
+        t0 = time.perf_counter()
+        with motor.begin() as con:
+            borradas = con.execute(text("DELETE FROM mef.fact_gasto_mensual WHERE tiempo_id = ANY(:t)"),
+                                   {"t": cambiados}).rowcount
+            copiadas = con.execute(text(f"INSERT INTO mef.fact_gasto_mensual ({columnas}) "
+                                        f"SELECT {columnas} FROM mef.{nueva}")).rowcount
+            for t in cambiados:
+                filas, huella = por_tiempo[t][1]
+                con.execute(text("""
+                    INSERT INTO mef.etl_huella_mes (tiempo_id, archivo, filas, huella)
+                    VALUES (:t, :a, :f, :h)
+                    ON CONFLICT (tiempo_id) DO UPDATE
+                    SET archivo = EXCLUDED.archivo, filas = EXCLUDED.filas,
+                        huella = EXCLUDED.huella, actualizado_en = now()
+                """), {"t": t, "a": nombre_ledger(ruta), "f": filas, "h": huella})
+            con.execute(text(f"DROP TABLE mef.{nueva};"))
+    except BaseException:
+        with motor.begin() as con:
+            con.execute(text(f"DROP TABLE IF EXISTS mef.{nueva};"))
+        raise
+    print(f"  [delta] fact: {borradas:,} filas borradas y {copiadas:,} copiadas en una transacción "
+          f"({time.perf_counter() - t0:.1f}s)")
+    print(f"[delta] {ruta.name}: huellas actualizadas")
+    return True
+
+# Fact particionada por año (sql/ParticionamientoFactGastoMensual.sql): la tabla padre es RANGE
+# sobre tiempo_id y cada año vive en la partición mef.fact_gasto_mensual_<anio>.
+INDICES_FACT = ["tiempo_id", "ejecutora_id", "programatica_id", "funcional_id", "clasif_gasto_id"]
+FKS_DIM_FACT = {"tiempo_id": "dim_tiempo", **{cfg["id"]: cfg["table"] for cfg in DIM_CFG.values()}}
+
+def fact_particionada(motor: Engine) -> bool:
+    with motor.connect() as con:
+        relkind = con.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = 'mef.fact_gasto_mensual'::regclass")
+        ).scalar()
+    return relkind == "p"
+
+# Año de gasto_mensual_normalizado_<anio>.parquet o de la carpeta hive ano_eje=<anio>.
+def anio_de_archivo(ruta: Path) -> int:
+    if ruta.is_dir():
+        return int(ruta.name.split("=", 1)[1])
+    return int(ruta.stem.rsplit("_", 1)[-1])
+
+# Crea la partición del año si todavía no existe (cargas normales sobre la fact particionada).
+def asegurar_particion(motor: Engine, anio: int) -> str:
+    with motor.begin() as con:
+        return con.execute(text("SELECT mef.crear_particion_fact(:a)"), {"a": anio}).scalar()
+
+# Modo --swap-partition: llena una tabla suelta con el año completo (sin índices ni ON CONFLICT),
+# después construye PK, UNIQUE del grano, índices y FKs, y en una transacción corta cambia la
+# partición vieja por la nueva (DETACH + DROP + RENAME + ATTACH). Reemplazar un año deja de ser un
+# DELETE y el costo de índices no crece con los años ya cargados. El CHECK del rango evita que el
+# ATTACH vuelva a recorrer la tabla para validar la partición.
+def cargar_anio_swap(sesion: SesionCarga, ruta: Path, indice: "IndiceClavesDim", opciones: dict) -> bool:
+    motor = sesion.motor
+    anio = anio_de_archivo(ruta)
+    with motor.connect() as con:
+        desde, hasta = con.execute(
+            text("SELECT desde, hasta FROM mef.rango_tiempo_anio(:a)"), {"a": anio}
+        ).one()
+    particion = f"fact_gasto_mensual_{anio}"
+    nueva = f"{particion}_c{int(time.time())}"
+    print(f"[swap] {ruta.name}: cargando en mef.{nueva} (tiempo_id {desde}-{hasta - 1})")
+    with motor.begin() as con:
+        con.execute(text(f"CREATE TABLE mef.{nueva} (LIKE mef.fact_gasto_mensual INCLUDING DEFAULTS);"))
+
+    try:
+        opciones = {**opciones, "consolidar": "file", "conflicto": "none"}
+        if not cargar_parquet(sesion, ruta, indice=indice, tiempos=set(range(desde, hasta)),
+                              tabla_fact=f"mef.{nueva}", **opciones):
+            raise RuntimeError("no se pudo leer el Parquet")
+
+        t0 = time.perf_counter()
+        with motor.begin() as con:
+            con.execute(text(f"ALTER TABLE mef.{nueva} ADD CONSTRAINT {nueva}_rango "
+                             f"CHECK (tiempo_id >= {desde} AND tiempo_id < {hasta});"))
+            con.execute(text(f"ALTER TABLE mef.{nueva} ADD CONSTRAINT {nueva}_pkey PRIMARY KEY (fact_id, tiempo_id);"))
+            con.execute(text(f"ALTER TABLE mef.{nueva} ADD CONSTRAINT {nueva}_grano UNIQUE ({', '.join(FKS_FACT)});"))
+            for col in INDICES_FACT:
+                con.execute(text(f"CREATE INDEX ON mef.{nueva} ({col});"))
+            for col, dim in FKS_DIM_FACT.items():
+                con.execute(text(f"ALTER TABLE mef.{nueva} ADD FOREIGN KEY ({col}) REFERENCES mef.{dim}({col});"))
+            con.execute(text(f"ANALYZE mef.{nueva};"))
+        print(f"  [swap] índices y FKs construidos en {time.perf_counter() - t0:.1f}s")
+
+        with motor.begin() as con:
+            if con.execute(text("SELECT to_regclass(:t)"), {"t": f"mef.{particion}"}).scalar() is not None:
+                con.execute(text(f"ALTER TABLE mef.fact_gasto_mensual DETACH PARTITION mef.{particion};"))
+                con.execute(text(f"DROP TABLE mef.{particion};"))
+            con.execute(text(f"ALTER TABLE mef.{nueva} RENAME TO {particion};"))
+            con.execute(text(f"ALTER TABLE mef.fact_gasto_mensual ATTACH PARTITION mef.{particion} "
+                             f"FOR VALUES FROM ({desde}) TO ({hasta});"))
+            con.execute(text(f"ALTER TABLE mef.{particion} DROP CONSTRAINT {nueva}_rango;"))
+            indices = con.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = 'mef' AND tablename = :t"),
+                                  {"t": particion}).scalars().all()
+            for nombre in indices:
+                if nombre.startswith(nueva):
+                    con.execute(text(f"ALTER INDEX mef.{nombre} RENAME TO {particion + nombre[len(nueva):]};"))
+            # las huellas por mes del año ya no describen lo cargado; --incremental las rehace
+            if con.execute(text("SELECT to_regclass('mef.etl_huella_mes')")).scalar() is not None:
+                con.execute(text("DELETE FROM mef.etl_huella_mes WHERE tiempo_id >= :d AND tiempo_id < :h"),
+                            {"d": desde, "h": hasta})
+    except BaseException:
+        with motor.begin() as con:
+            con.execute(text(f"DROP TABLE IF EXISTS mef.{nueva};"))
+        raise
+    print(f"[swap] {ruta.name}: partición {particion} reemplazada")
+    return True
+
+# Destino --sink parquet: el esquema estrella como archivos, sin PostgreSQL.
+#   <dir>/_almacen.json                                  modo de claves y huella de cada archivo cargado
+#   <dir>/dim_tiempo/part-0.parquet                      mismo rango e ids que CreacionDeDataWareHouse.sql
+#   <dir>/dim_<x>/part-<marca>.parquet                   una parte por archivo con las claves nuevas
+#   <dir>/fact_gasto_mensual/anio=<YYYY>/part-0.parquet  partición hive por año; recargar un año la reemplaza
+# Los ids siguen --key-mode: serial continúa desde el máximo id de cada dimensión, hash usa clave_hash
+# (los mismos ids que una BD migrada con sql/MigracionClavesHash.sql).
+DIR_ALMACEN_POR_DEFECTO = Path(os.getenv("ETL_DATA_DIR") or DIR_BASE / "data") / "warehouse"
+ESQUEMA_FACT_PARQUET = pa.schema(
+    [("tiempo_id", pa.int32())] + [(c, pa.int64()) for c in FKS_FACT[1:]] + [(c, pa.float64()) for c in METRICAS_FACT]
+)
+
+class AlmacenParquet:
+    def __init__(self, directorio: Path, modo_claves: str = "auto"):
+        self.dir = Path(directorio)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.ruta_estado = self.dir / "_almacen.json"
+        self.estado = json.loads(self.ruta_estado.read_text(encoding="utf-8")) if self.ruta_estado.exists() else {}
+        previo = self.estado.get("modo_claves")
+        if modo_claves == "auto":
+            modo_claves = previo or "serial"
+        elif previo is not None and previo != modo_claves:
+            raise ValueError(f"el almacén {self.dir} usa ids {previo}; no se puede cargar con --key-mode {modo_claves}")
+        self.modo_claves = modo_claves
+        self.estado["modo_claves"] = modo_claves
+        self.estado.setdefault("archivos", {})
+        self.tiempo_df: pd.DataFrame | None = None
+        self.escritor: pq.ParquetWriter | None = None
+        self.dir_tmp: Path | None = None
+        self.anio: int | None = None
+        self.filas_fact = 0
+        self.partes = 0
+
+    def guardar_estado(self):
+        tmp = self.ruta_estado.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.estado, indent=2), encoding="utf-8")
+        os.replace(tmp, self.ruta_estado)
+
+    # Escribe un archivo de forma atómica (temporal oculto + os.replace; los lectores ignoran ".*").
+    @staticmethod
+    def escribir(carpeta: Path, nombre: str, tabla: pa.Table):
+        carpeta.mkdir(parents=True, exist_ok=True)
+        tmp = carpeta / f".{nombre}.tmp"
+        pq.write_table(tabla, tmp)
+        os.replace(tmp, carpeta / nombre)
+
+    # dim_tiempo (tiempo_id, anio, mes); se genera la primera vez.
+    def tiempo(self) -> pd.DataFrame:
+        if self.tiempo_df is None:
+            carpeta = self.dir / "dim_tiempo"
+            if not carpeta.exists():
+                fechas = pd.date_range("2010-01-01", "2030-12-01", freq="MS")
+                dt = pd.DataFrame({
+                    "tiempo_id": np.arange(1, len(fechas) + 1, dtype="int32"),
+                    "fecha": fechas.date,
+                    "anio": fechas.year.astype("int32"),
+                    "mes": fechas.month.astype("int32"),
+                    "trimestre": fechas.quarter.astype("int32"),
+                })
+                self.escribir(carpeta, "part-0.parquet", pa.Table.from_pandas(dt, preserve_index=False))
+            self.tiempo_df = pq.read_table(carpeta, columns=["tiempo_id", "anio", "mes"]).to_pandas()
+        return self.tiempo_df
+
+    @staticmethod
+    def esquema_dim(cfg: dict) -> pa.Schema:
+        return pa.schema([(cfg["id"], pa.int64())] + [
+            (c, pa.int64() if c == "tipo_transaccion" else pa.string()) for c in cfg["all_cols"]
+        ])
+
+    # Dimensión completa (todas sus partes). Un sec_func "5" que escribió el camino del contrato
+    # antes de a_codigo_entero se lee como "5.0", así las cargas nuevas reusan su id en vez de crear otro.
+    def leer_dim(self, cfg: dict) -> pd.DataFrame:
+        carpeta = self.dir / cfg["table"]
+        if not carpeta.exists():
+            return self.esquema_dim(cfg).empty_table().to_pandas()
+        df = pq.read_table(carpeta, schema=self.esquema_dim(cfg)).to_pandas()
+        if "sec_func" in df.columns:
+            df["sec_func"] = a_codigo_entero(df["sec_func"])
+        return df
+
+    # Agrega una parte con filas nuevas a la dimensión.
+    def agregar_dim(self, cfg: dict, df_nuevas: pd.DataFrame):
+        df = df_nuevas[[cfg["id"]] + cfg["all_cols"]].copy()
+        for c in cfg["all_cols"]:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64") if c == "tipo_transaccion" \
+                else df[c].astype("string")
+        self.partes += 1
+        nombre = f"part-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self.partes:04d}.parquet"
+        self.escribir(self.dir / cfg["table"], nombre,
+                      pa.Table.from_pandas(df, schema=self.esquema_dim(cfg), preserve_index=False))
+
+    # Abre la partición temporal del año; escribir_fact le agrega hechos consolidados.
+    def abrir_anio(self, anio: int):
+        self.anio = anio
+        self.dir_tmp = self.dir / "fact_gasto_mensual" / f".tmp-anio={anio}-{os.getpid()}"
+        shutil.rmtree(self.dir_tmp, ignore_errors=True)
+        self.dir_tmp.mkdir(parents=True)
+        self.escritor = pq.ParquetWriter(str(self.dir_tmp / "part-0.parquet"), ESQUEMA_FACT_PARQUET)
+        self.filas_fact = 0
+
+    def escribir_fact(self, fact_df: pd.DataFrame):
+        self.escritor.write_table(pa.Table.from_pandas(fact_df[ESQUEMA_FACT_PARQUET.names],
+                                                       schema=ESQUEMA_FACT_PARQUET, preserve_index=False))
+        self.filas_fact += len(fact_df)
+
+    # Cambia la partición del año por la temporal (rename; la vieja se borra después).
+    def cerrar_anio(self):
+        self.escritor.close()
+        self.escritor = None
+        base = self.dir / "fact_gasto_mensual"
+        destino = base / f"anio={self.anio}"
+        viejo = base / f".old-anio={self.anio}-{os.getpid()}"
+        if destino.exists():
+            os.replace(destino, viejo)
+        os.replace(self.dir_tmp, destino)
+        shutil.rmtree(viejo, ignore_errors=True)
+        self.dir_tmp = None
+
+    def descartar_anio(self):
+        if self.escritor is not None:
+            self.escritor.close()
+            self.escritor = None
+        if self.dir_tmp is not None:
+            shutil.rmtree(self.dir_tmp, ignore_errors=True)
+            self.dir_tmp = None
+
+# Índice de claves del almacén Parquet: parte de las dimensiones ya escritas y asigna ids sin BD
+# (serial: máximo + 1, hash: clave_hash). Las claves nuevas quedan en memoria hasta guardar_nuevas().
+class IndiceClavesParquet(IndiceClavesDim):
+    claves_confirmadas = False
+
+    def __init__(self, almacen: AlmacenParquet):
+        super().__init__(almacen.modo_claves)
+        self.almacen = almacen
+        self.nuevas: Dict[str, List[pd.DataFrame]] = {cfg["table"]: [] for cfg in DIM_CFG.values()}
+        self.siguiente: Dict[str, int] = {}
+        for tag, cfg in DIM_CFG.items():
+            df = almacen.leer_dim(cfg)
+            claves = tuplas_sin_na(df, cfg["keys"])
+            ids = df[cfg["id"]].astype("int64").tolist()
+            self.mapas[tag] = dict(zip(claves, ids))
+            if self.modo_claves == "hash":
+                self.ids_hash[tag] = dict(zip(ids, claves))
+            self.siguiente[cfg["table"]] = max(ids, default=0) + 1
+
+    def mapa_tiempo(self, sesion: SesionCarga | None = None) -> pd.DataFrame:
+        return self.almacen.tiempo()
+
+    def insertar_nuevas(self, sesion: SesionCarga | None, cfg: dict, df_nuevas: pd.DataFrame) -> List[tuple]:
+        inicio = self.siguiente[cfg["table"]]
+        ids = np.arange(inicio, inicio + len(df_nuevas), dtype="int64")
+        self.siguiente[cfg["table"]] += len(df_nuevas)
+        self.nuevas[cfg["table"]].append(df_nuevas.assign(**{cfg["id"]: ids}))
+        return list(zip(tuplas_sin_na(df_nuevas, cfg["keys"]), ids.tolist()))
+
+    def insertar_hash(self, sesion: SesionCarga | None, cfg: dict, df_nuevas: pd.DataFrame):
+        self.nuevas[cfg["table"]].append(df_nuevas)
+
+    # Escribe las claves nuevas de cada dimensión como una parte más.
+    def guardar_nuevas(self):
+        for cfg in DIM_CFG.values():
+            partes, self.nuevas[cfg["table"]] = self.nuevas[cfg["table"]], []
+            if partes:
+                self.almacen.agregar_dim(cfg, pd.concat(partes, ignore_index=True))
+
+# Carga un año en el almacén Parquet con la misma resolución de dimensiones y consolidación por
+# archivo que la BD. Las dimensiones nuevas se guardan aunque el año falle (el índice en memoria ya
+# las usa) y la partición del año solo se reemplaza si el archivo se cargó completo.
+def cargar_anio_parquet(almacen: AlmacenParquet, ruta: Path, indice: IndiceClavesParquet, opciones: dict) -> bool:
+    anio = anio_de_archivo(ruta)
+    dt = almacen.tiempo()
+    tiempos = set(dt.loc[dt["anio"] == anio, "tiempo_id"].tolist())
+    if not tiempos:
+        raise ValueError(f"el año {anio} no está en dim_tiempo")
+    almacen.abrir_anio(anio)
+    try:
+        opciones = {**opciones, "consolidar": "file"}
+        ok = cargar_parquet(None, ruta, indice=indice, tiempos=tiempos, almacen=almacen, **opciones)
+        if not ok:
+            raise RuntimeError("no se pudo leer el Parquet")
+        indice.guardar_nuevas()
+        almacen.cerrar_anio()
+    except BaseException:
+        indice.guardar_nuevas()
+        almacen.descartar_anio()
+        raise
+    print(f"[parquet] {ruta.name}: fact_gasto_mensual/anio={anio} con {almacen.filas_fact:,} filas")
+    return True
+
+# Modo --sink parquet: carga los archivos de a uno en el almacén; los que no cambiaron desde la
+# última carga (misma huella) se saltan.
+def cargar_almacen_parquet(archivos: List[Path], directorio: Path, modo_claves: str, opciones: dict,
+                           saltar_cargados: bool = True):
+    almacen = AlmacenParquet(directorio, modo_claves)
+    indice = IndiceClavesParquet(almacen)
+    print(f"[info] destino Parquet {almacen.dir} (ids {almacen.modo_claves})")
+    for f in archivos:
+        try:
+            huella = huella_parquet(f)
+            if saltar_cargados and almacen.estado["archivos"].get(nombre_ledger(f)) == huella:
+                print(f"[skip] {f.name} ya está en el almacén (huella {huella[:12]}…)")
+                continue
+            cargar_anio_parquet(almacen, f, indice, opciones)
+            almacen.estado["archivos"][nombre_ledger(f)] = huella
+            almacen.guardar_estado()
+        except KeyboardInterrupt:
+            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+            break
+        except Exception as e:
+            print(f"  [error] {f.name}: {type(e).__name__}: {e}. Continúo con el siguiente…")
+    almacen.guardar_estado()
+
+# ¿La fact ya tiene hechos del año del archivo?
+def anio_con_hechos(motor: Engine, ruta: Path) -> bool:
+    with motor.connect() as con:
+        return con.execute(text("""
+            SELECT EXISTS (SELECT 1 FROM mef.fact_gasto_mensual
+                           WHERE tiempo_id IN (SELECT tiempo_id FROM mef.dim_tiempo WHERE anio = :a))
+        """), {"a": anio_de_archivo(ruta)}).scalar()
+
+# Cargar de cero (sin unidades del ledger que reanudar) un año que ya está en la fact con
+# --on-conflict sum suma los montos otra vez: se rechaza y se indica cómo reemplazarlo.
+def rechazar_doble_suma(motor: Engine, ruta: Path) -> bool:
+    if not anio_con_hechos(motor, ruta):
+        return False
+    print(f"[error] {ruta.name}: la fact ya tiene hechos del año {anio_de_archivo(ruta)} y --on-conflict sum "
+          f"los sumaría otra vez. Para recargarlo usa --incremental (borra y recarga los meses que cambiaron) "
+          f"o --swap-partition (reemplaza el año en una fact particionada).")
+    return True
+
+# Plan de carga de un archivo: (huella, rangos de row groups pendientes). Con ledger, un archivo ya
+# completo no deja rangos y una reanudación reutiliza el reparto de la primera corrida.
+# evitar_doble_suma: no empezar de cero un año que ya tiene hechos (ver rechazar_doble_suma).
+def planificar_archivo(motor: Engine, ruta: Path, workers: int, usar_ledger: bool,
+                       evitar_doble_suma: bool = False) -> tuple:
+    try:
+        n_rg = ParquetAnio(ruta).num_row_groups
+    except Exception:
+        return None, [None]  # cargar_parquet reporta el error al abrirlo
+    if not usar_ledger:
+        if evitar_doble_suma and rechazar_doble_suma(motor, ruta):
+            return None, []
+        return None, repartir_row_groups(n_rg, workers)
+
+    huella = huella_parquet(ruta)
+    ledger = LedgerCarga(motor, nombre_ledger(ruta), huella)
+    if ledger.hecho("*"):
+        print(f"[skip] {ruta.name} ya cargado (huella {huella[:12]}…)")
+        return huella, []
+    if not ledger.hechas and huellas_registradas(motor, nombre_ledger(ruta)):
+        print(f"[error] {ruta.name} ya se cargó con otro contenido. Para reemplazarlo usa --incremental "
+              f"(borra y recarga los meses que cambiaron) o --swap-partition (fact particionada).")
+        return huella, []
+    if not ledger.hechas and evitar_doble_suma and rechazar_doble_suma(motor, ruta):
+        return huella, []
+    rangos = ledger.plan()
+    if rangos is None:
+        rangos = repartir_row_groups(n_rg, workers)
+        plan = "plan:" + ",".join(f"{r[0]}-{r[-1]}" for r in rangos)
+        ledger.registrar(motor, plan, ParquetAnio(ruta).num_rows)
+    elif workers > 1 and len(rangos) != min(workers, n_rg):
+        print(f"  [ledger] {ruta.name}: reanudo con el reparto original de {len(rangos)} rango(s)")
+    return huella, [r for r in rangos if not ledger.hecho(f"{nombre_rango(r)}:*")]
+
+# Unidades de trabajo (archivo, huella, row groups). Cada archivo se parte en hasta `workers`
+# tramos contiguos de row groups para que un año grande también use varios procesos.
+def unidades_de_trabajo(motor: Engine, archivos: List[Path], workers: int, usar_ledger: bool,
+                        evitar_doble_suma: bool = False) -> List[tuple]:
+    unidades = []
+    for f in archivos:
+        huella, rangos = planificar_archivo(motor, f, workers, usar_ledger, evitar_doble_suma)
+        if usar_ledger and huella is not None and not rangos:
+            continue
+        unidades.extend((f, huella, rgs) for rgs in rangos)
+    return unidades
+
+# Marca el archivo como completo en el ledger.
+def cerrar_archivo_ledger(motor: Engine, ruta: Path, huella: str | None):
+    if huella is None:
+        return
+    ledger = LedgerCarga(motor, nombre_ledger(ruta), huella)
+    ledger.registrar(motor, "*", ParquetAnio(ruta).num_rows)
+    print(f"[ledger] {ruta.name} completo")
+
+# Estado por proceso worker: su sesión de carga (una conexión para todas sus unidades) e índice de claves.
+_SESION_WORKER: SesionCarga | None = None
+_INDICE_WORKER: "IndiceClavesDim | None" = None
+
+def _iniciar_worker(modo_claves: str = "serial"):
+    global _SESION_WORKER, _INDICE_WORKER
+    os.environ["PYTHONUNBUFFERED"] = "1"
+    _SESION_WORKER = SesionCarga(nuevo_motor())
+    _INDICE_WORKER = IndiceClavesDim(modo_claves)
+
+# Carga una unidad en el proceso worker. Devuelve None si fue bien o el texto del error.
+def _cargar_unidad(ruta: Path, huella: str | None, row_groups: List[int] | None, opciones: dict) -> str | None:
+    try:
+        ledger = LedgerCarga(_SESION_WORKER.motor, nombre_ledger(ruta), huella) if huella is not None else None
+        ok = cargar_parquet(_SESION_WORKER, ruta, indice=_INDICE_WORKER, row_groups=row_groups,
+                            ledger=ledger, **opciones)
+        return None if ok else "no se pudo abrir el Parquet"
+    except Exception as e:
+        _SESION_WORKER.reiniciar()
+        return f"{type(e).__name__}: {e}"
+
+# Modo --workers N: reparte años/row groups en un pool de procesos, cada uno con sus conexiones.
+def cargar_en_paralelo(motor: Engine, unidades: List[tuple], workers: int, opciones: dict,
+                       modo_claves: str = "serial"):
+    print(f"[info] {len(unidades)} unidad(es) de trabajo en {workers} proceso(s)")
+    pendientes: Dict[Path, int] = {}
+    huellas: Dict[Path, str | None] = {}
+    for f, huella, _ in unidades:
+        pendientes[f] = pendientes.get(f, 0) + 1
+        huellas[f] = huella
+    errores = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(modo_claves,)) as pool:
+        futuros = {pool.submit(_cargar_unidad, f, h, rgs, opciones): (f, rgs) for f, h, rgs in unidades}
+        try:
+            for fut in as_completed(futuros):
+                f, rgs = futuros[fut]
+                error = fut.result()
+                if error:
+                    errores.append((f.name, rgs, error))
+                    print(f"  [error] {f.name} row groups {rgs}: {error}")
+                    pendientes[f] = -1
+                elif pendientes[f] > 0:
+                    pendientes[f] -= 1
+                    if pendientes[f] == 0:
+                        cerrar_archivo_ledger(motor, f, huellas[f])
+        except KeyboardInterrupt:
+            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    if errores:
+        print(f"[warn] {len(errores)} unidad(es) con error; revisa los mensajes anteriores.")
+
+# CLI: prepara motor, índices únicos, selecciona archivos y ejecuta carga con opciones de reanudación.
+def principal():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("anios", nargs="*", type=int, help="Años a cargar (opcional). Ej: 2017 2018")
+    parser.add_argument("--batch", type=int, default=FILAS_BATCH_POR_DEFECTO, help="Filas por batch Arrow (default 250k)")
+    parser.add_argument("--subbatch", type=int, default=FILAS_SUBLOTE_POR_DEFECTO, help="Filas por sublote INSERT (default 50k)")
+    parser.add_argument("--start-batch", type=int, default=1, help="Batch inicial (1-based) para reanudar dentro del archivo")
+    parser.add_argument("--end-batch", type=int, default=None, help="Batch final (inclusive) dentro del archivo")
+    parser.add_argument("--fact-mode", choices=["values", "copy"], default=MODO_FACT_POR_DEFECTO,
+                        help="Inserción de hechos: INSERT preparado con arrays o COPY a staging + merge (default values)")
+    parser.add_argument("--copy-format", choices=["text", "binary"], default=FORMATO_COPY_POR_DEFECTO,
+                        help="Formato de COPY cuando --fact-mode copy (default text)")
+    parser.add_argument("--consolidate", choices=["file", "batch"], default="file",
+                        help="Consolidar por grano todo el archivo (hash aggregate con spill) o solo cada batch (default file)")
+    parser.add_argument("--agg-memory-rows", type=int, default=FILAS_AGREGACION_POR_DEFECTO,
+                        help="Filas de la agregación en memoria antes de volcar a disco (default 2M). Con ledger "
+                             "el spill queda en data/agregacion y cada volcado es un punto de reanudación")
+    parser.add_argument("--on-conflict", choices=["sum", "ignore"], default="ignore",
+                        help="Grano ya existente en la fact: ignorar la fila (default, el DO NOTHING histórico) o "
+                             "sumar métricas. Con sum no se carga de cero un año que ya tiene hechos: usa "
+                             "--incremental o --swap-partition")
+    parser.add_argument("--queue-depth", type=int, default=PROFUNDIDAD_COLA_POR_DEFECTO,
+                        help="Batches leídos/normalizados por adelantado mientras se inserta (0 = sin pipeline, default 2)")
+    parser.add_argument("--memory-budget", type=parsear_tamano, default=PRESUPUESTO_MEMORIA_POR_DEFECTO,
+                        metavar="TAMAÑO",
+                        help="Memoria para la carga (ej. 4G; se reparte entre --workers): ajusta --batch y "
+                             "--subbatch en vivo según bytes por fila, RSS y filas/s medidos; también MEMORY_BUDGET")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos en paralelo; reparte años y row groups Parquet (default 1)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reemplaza solo los meses (tiempo_id) cuyo contenido cambió desde la última carga")
+    parser.add_argument("--swap-partition", action="store_true",
+                        help="Carga cada año en una tabla nueva y la cambia por su partición (fact particionada)")
+    parser.add_argument("--key-mode", choices=["auto", "serial", "hash"], default=MODO_CLAVES_POR_DEFECTO,
+                        help="Ids de dimensiones: SERIAL asignados por la BD o hash de la llave natural "
+                             "(requiere sql/MigracionClavesHash.sql); auto lo detecta (default auto)")
+    parser.add_argument("--no-ledger", action="store_true",
+                        help="No consultar ni escribir mef.etl_load_ledger (sin salto/reanudación automática)")
+    parser.add_argument("--sink", choices=["postgres", "parquet"], default="postgres",
+                        help="Destino: la BD o el esquema estrella como Parquet particionado (default postgres)")
+    parser.add_argument("--sink-dir", type=Path, default=DIR_ALMACEN_POR_DEFECTO,
+                        help="Carpeta del almacén con --sink parquet (default data/warehouse)")
+    parser.add_argument("--metrics", default=None, metavar="ARCHIVO",
+                        help="Agrega métricas por etapa y por batch (JSON lines) a ARCHIVO; también ETL_METRICAS")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila la carga de cada archivo con cProfile (.prof + top por tiempo acumulado; "
+                             "desactiva el pipeline)")
+    args = parser.parse_args()
+    METRICAS.configurar(args.metrics, args.profile, "cargar_postgres")
+    try:
+        _principal(args)
+    finally:
+        METRICAS.resumen()
+
+# Parquet normalizados a cargar (todos o los de los años pedidos): un archivo o una carpeta hive por
+# año. Si un año está en los dos layouts se usa el más reciente.
+def archivos_a_cargar(anios: List[int]) -> List[Path]:
+    por_anio: Dict[int, Path] = {}
+    for ruta in sorted(DIR_PROCESADOS.glob("gasto_mensual_normalizado_*.parquet")) + \
+            sorted(p for p in DIR_DATASET.glob("ano_eje=*") if p.is_dir() and p.name[8:].isdigit()):
+        anio = anio_de_archivo(ruta)
+        previo = por_anio.get(anio)
+        if previo is not None:
+            reciente = max(previo, ruta, key=lambda p: p.stat().st_mtime)
+            print(f"[warn] {anio} está en {previo.name} y en {ruta.name}; uso el más reciente ({reciente.name})")
+            ruta = reciente
+        por_anio[anio] = ruta
+    return [por_anio[a] for a in sorted(por_anio) if not anios or a in anios]
+
+# Ejecuta la carga con los argumentos ya parseados.
+def _principal(args):
+    archivos = archivos_a_cargar(args.anios)
+    if not archivos:
+        print("[error] No hay archivos Parquet para cargar.")
+        sys.exit(1)
+    opciones = dict(filas_batch=args.batch, filas_sublote=args.subbatch,
+                    modo_fact=args.fact_mode, formato_copy=args.copy_format,
+                    profundidad_cola=args.queue_depth, consolidar=args.consolidate,
+                    conflicto=args.on_conflict, max_filas_agregacion=args.agg_memory_rows)
+    if args.memory_budget:
+        # cada worker es un proceso con su propia parte del presupuesto
+        paralelo = args.sink == "postgres" and not (args.incremental or args.swap_partition)
+        procesos = args.workers if args.workers > 1 and paralelo else 1
+        opciones["presupuesto_memoria"] = args.memory_budget // procesos
+
+    if args.sink == "parquet":
+        if args.incremental or args.swap_partition or args.workers > 1 or args.start_batch != 1 \
+                or args.end_batch is not None:
+            print("[info] --sink parquet reconstruye años completos en un proceso; "
+                  "--incremental/--swap-partition/--workers/--start-batch/--end-batch se ignoran.")
+        print(f"[info] {len(archivos)} archivo(s) a escribir como Parquet")
+        try:
+            cargar_almacen_parquet(archivos, args.sink_dir, args.key_mode, opciones,
+                                   saltar_cargados=not args.no_ledger)
+        except ValueError as e:
+            print(f"[error] {e}")
+            sys.exit(1)
+        print("[OK] Carga completada.")
+        return
+
+    motor = nuevo_motor()
+    asegurar_indices_unicos(motor)
+    modo_claves = modo_claves_bd(motor)
+    if args.key_mode not in ("auto", modo_claves):
+        print(f"[error] --key-mode {args.key_mode} pero la BD usa ids {modo_claves}"
+              + (" (corre sql/MigracionClavesHash.sql)" if args.key_mode == "hash" else "") + ".")
+        sys.exit(1)
+    print(f"[info] ids de dimensiones: {modo_claves}")
+    sueltas = sec_func_sin_forma_historica(motor)
+    if sueltas:
+        print(f"[warn] dim_programatica tiene {sueltas:,} fila(s) con sec_func sin '.0'; sus hechos quedan "
+              f"aparte de los de la llave \"N.0\" hasta correr sql/NormalizacionSecFunc.sql.")
+    manual = args.start_batch != 1 or args.end_batch is not None
+    usar_ledger = not args.no_ledger and not manual
+    if usar_ledger:
+        asegurar_ledger(motor)
+    elif manual and not args.no_ledger:
+        print("[info] --start-batch/--end-batch: reanudación manual, el ledger no se usa en esta corrida.")
+
+    print(f"[info] {len(archivos)} archivo(s) a cargar en PostgreSQL")
+    particionada = fact_particionada(motor)
+    if args.swap_partition:
+        if not particionada:
+            print("[error] --swap-partition requiere la fact particionada (sql/ParticionamientoFactGastoMensual.sql).")
+            sys.exit(1)
+        if args.incremental or args.workers > 1 or manual:
+            print("[info] --swap-partition reemplaza años completos de a uno; "
+                  "--incremental/--workers/--start-batch/--end-batch se ignoran.")
+        indice = IndiceClavesDim(modo_claves)
+        sesion = SesionCarga(motor)
+        for f in archivos:
+            try:
+                if cargar_anio_swap(sesion, f, indice, opciones) and usar_ledger:
+                    cerrar_archivo_ledger(motor, f, huella_parquet(f))
+            except KeyboardInterrupt:
+                print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+                break
+            except Exception as e:
+                print(f"  [error] {f.name}: {type(e).__name__}: {e}. Continúo con el siguiente…")
+                sesion.reiniciar()
+        sesion.cerrar()
+        motor.dispose()
+        print("[OK] Carga completada.")
+        return
+    if particionada:
+        for f in archivos:
+            asegurar_particion(motor, anio_de_archivo(f))
+
+    if args.incremental:
+        asegurar_huella_mes(motor)
+        if args.workers > 1:
+            print("[info] --incremental procesa los archivos de a uno; --workers se ignora.")
+        indice = IndiceClavesDim(modo_claves)
+        sesion = SesionCarga(motor)
+        for f in archivos:
+            try:
+                if cargar_incremental(sesion, f, indice, opciones) and usar_ledger:
+                    cerrar_archivo_ledger(motor, f, huella_parquet(f))
+            except KeyboardInterrupt:
+                print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+                break
+            except Exception as e:
+                print(f"  [error] {f.name}: {type(e).__name__}: {e}. Continúo con el siguiente…")
+                sesion.reiniciar()
+        sesion.cerrar()
+        motor.dispose()
+        print("[OK] Carga completada.")
+        return
+
+    # con --start-batch/--end-batch el año ya tiene los batches anteriores: es una reanudación manual
+    doble_suma = args.on_conflict == "sum"
+    # con ignore, un grano que llega en dos unidades (rangos de workers o batches) pierde los montos de la segunda
+    if not doble_suma and (args.workers > 1 or args.consolidate == "batch"):
+        causa, unidad = ("--workers > 1", "rangos") if args.workers > 1 else ("--consolidate batch", "batches")
+        print(f"[warn] --on-conflict ignore con {causa}: un grano repartido entre {unidad} conserva solo "
+              f"los montos del primero; usa --on-conflict sum para sumarlos.")
+    if args.workers > 1:
+        if manual:
+            print("[warn] --start-batch/--end-batch no aplican con --workers > 1; se ignoran.")
+        unidades = unidades_de_trabajo(motor, archivos, args.workers, usar_ledger, doble_suma)
+        try:
+            cargar_en_paralelo(motor, unidades, args.workers, opciones, modo_claves)
+        except KeyboardInterrupt:
+            return
+        finally:
+            motor.dispose()
+        print("[OK] Carga completada.")
+        return
+
+    # una sesión (conexión) para todos los archivos; el motor queda para lecturas y mantenimiento
+    indice = IndiceClavesDim(modo_claves)
+    sesion = SesionCarga(motor)
+    for f in archivos:
+        try:
+            huella, rangos = planificar_archivo(motor, f, 1, usar_ledger, doble_suma and not manual)
+            ledger = LedgerCarga(motor, nombre_ledger(f), huella) if huella is not None else None
+            completo = bool(rangos)
+            for rgs in rangos:
+                completo &= cargar_parquet(
+                    sesion, f,
+                    batch_inicio=args.start_batch,
+                    batch_fin=args.end_batch,
+                    indice=indice,
+                    row_groups=rgs,
+                    ledger=ledger,
+                    **opciones,
+                )
+            if completo:
+                cerrar_archivo_ledger(motor, f, huella)
+        except KeyboardInterrupt:
+            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+            break
+        except Exception as e:
+            print(f"  [error] {f.name}: {type(e).__name__}: {e}. Continúo con el siguiente…")
+            sesion.reiniciar()
+    sesion.cerrar()
+    motor.dispose()
+
+    print("[OK] Carga completada.")
+
+if __name__ == "__main__":
+    os.environ["PYTHONUNBUFFERED"] = "1"
+    principal()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Comparación de throughput de la inserción de hechos: execute_values vs COPY (texto/binario).
+
+Usa una tabla scratch con el mismo esquema e índices que mef.fact_gasto_mensual (sin FKs),
+la llena con un batch consolidado sintético y mide filas/s por modo. La tabla se borra al final.
+
+Uso:
+  python etl/comparar_carga_fact.py
+  python etl/comparar_carga_fact.py --filas 500000 --repeticiones 3
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from cargar_postgres import (
+    FKS_FACT, METRICAS_FACT, FILAS_SUBLOTE_POR_DEFECTO,
+    nuevo_motor, insertar_sublotes_fact, insertar_copy_fact,
+)
+
+TABLA_SCRATCH = "mef.bench_fact_gasto_mensual"
+
+# Genera un batch consolidado: combinaciones de FKs únicas y montos con 2 decimales.
+def batch_sintetico(filas: int, semilla: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({c: rng.integers(1, 5_000, size=filas, dtype="int64") for c in FKS_FACT})
+    df["tiempo_id"] = np.arange(filas, dtype="int64")  # garantiza grano único
+    for c in METRICAS_FACT:
+        df[c] = np.round(rng.uniform(0, 1e7, size=filas), 2)
+    return df
+
+def principal():
+    parser = argparse.ArgumentParser(description="Compara execute_values vs COPY para fact_gasto_mensual.")
+    parser.add_argument("--filas", type=int, default=250_000, help="Filas del batch consolidado (default 250k)")
+    parser.add_argument("--subbatch", type=int, default=FILAS_SUBLOTE_POR_DEFECTO, help="Filas por sublote")
+    parser.add_argument("--repeticiones", type=int, default=2, help="Corridas por modo (se reporta la mejor)")
+    args = parser.parse_args()
+
+    df = batch_sintetico(args.filas)
+    motor = nuevo_motor()
+    with motor.begin() as con:
+        con.execute(text(f"DROP TABLE IF EXISTS {TABLA_SCRATCH};"))
+        con.execute(text(f"CREATE TABLE {TABLA_SCRATCH} (LIKE mef.fact_gasto_mensual INCLUDING ALL);"))
+
+    modos = {
+        "values": lambda: insertar_sublotes_fact(motor, df, args.subbatch, tabla=TABLA_SCRATCH),
+        "copy-text": lambda: insertar_copy_fact(motor, df, args.subbatch, "text", tabla=TABLA_SCRATCH),
+        "copy-binary": lambda: insertar_copy_fact(motor, df, args.subbatch, "binary", tabla=TABLA_SCRATCH),
+    }
+    try:
+        resultados = {}
+        for nombre, fn in modos.items():
+            mejor = None
+            for _ in range(args.repeticiones):
+                with motor.begin() as con:
+                    con.execute(text(f"TRUNCATE {TABLA_SCRATCH};"))
+                t0 = time.perf_counter()
+                fn()
+                dt = time.perf_counter() - t0
+                mejor = dt if mejor is None else min(mejor, dt)
+            resultados[nombre] = mejor
+            print(f"[bench] {nombre:<12} {mejor:8.2f} s  {args.filas / mejor:>12,.0f} filas/s")
+
+        base = resultados["values"]
+        print("[resumen] speedup vs values: " + " | ".join(
+            f"{k}={base / v:.1f}x" for k, v in resultados.items() if k != "values"))
+    finally:
+        with motor.begin() as con:
+            con.execute(text(f"DROP TABLE IF EXISTS {TABLA_SCRATCH};"))
+        motor.dispose()
+
+if __name__ == "__main__":
+    principal()
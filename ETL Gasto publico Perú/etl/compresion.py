@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Archivos RAW comprimidos. selenium_download.py guarda los CSV del MEF en data/raw/ como .csv.zst o .csv.gz (o deja
+# el .zip tal como lo entrega el portal) y transformar_mensual.py los lee descomprimiendo al vuelo, sin escribir nunca
+# el CSV descomprimido a disco. zstd y gzip van por los streams de pyarrow (C++, ya es dependencia); zip por zipfile.
+#
+# Uso:
+#   from compresion import abrir_crudo, nombre_csv
+#   nombre_csv("2024-Gasto-Mensual.csv.zst")                    # "2024-Gasto-Mensual.csv"
+#   with abrir_crudo(Path("data/raw/2024-Gasto-Mensual.csv.zst")) as fh:
+#       cabeza = fh.read(1 << 20)
+
+import os
+import zipfile
+from pathlib import Path
+
+import pyarrow as pa
+
+FORMATOS = ["zstd", "gzip", "none"]           # --compress del downloader
+SUFIJO_FORMATO = {"zstd": ".zst", "gzip": ".gz"}
+FORMATO_SUFIJO = {".zst": "zstd", ".gz": "gzip", ".zip": "zip"}
+# CSV / comprimido, medido en un año sintético de 677 MB (zstd 115 MB, gzip 117 MB); solo para estimar tamaños
+RATIO_CSV = 6
+BYTES_COPIA = 8 << 20
+
+# Formato de compresión de un RAW por su extensión (None = CSV plano).
+def compresion_de(ruta: Path) -> str | None:
+    return FORMATO_SUFIJO.get(ruta.suffix.lower())
+
+# Nombre del CSV que trae un RAW: "2024-Gasto-Mensual.csv.zst" -> "2024-Gasto-Mensual.csv",
+# "2020-Gasto.zip" -> "2020-Gasto.csv". None si no es un CSV (plano o comprimido).
+def nombre_csv(nombre: str) -> str | None:
+    base = nombre
+    sufijo = Path(nombre).suffix.lower()
+    if sufijo in FORMATO_SUFIJO:
+        base = nombre[: -len(sufijo)]
+        if sufijo == ".zip" and not base.lower().endswith(".csv"):
+            base += ".csv"
+    return base if base.lower().endswith(".csv") else None
+
+# Nombres bajo los que puede estar guardado un CSV en data/raw/ (plano, comprimido o el zip del portal).
+def variantes_crudo(nombre: str) -> list[str]:
+    return [nombre] + [nombre + s for s in FORMATO_SUFIJO] + [nombre[: -len(".csv")] + ".zip"]
+
+# El CSV de un zip: el único que trae o, si trae varios, el más grande.
+def _miembro_zip(zf: zipfile.ZipFile) -> zipfile.ZipInfo:
+    csvs = [i for i in zf.infolist() if i.filename.lower().endswith(".csv")] or zf.infolist()
+    if not csvs:
+        raise ValueError(f"{zf.filename} está vacío")
+    return max(csvs, key=lambda i: i.file_size)
+
+# Abre un RAW para lectura binaria secuencial. Los comprimidos se descomprimen al vuelo y no admiten seek:
+# quien necesite saltar a un offset (--split) tiene que usar el CSV plano.
+def abrir_crudo(ruta: Path):
+    formato = compresion_de(ruta)
+    if formato == "zip":
+        zf = zipfile.ZipFile(ruta)
+        try:
+            return zf.open(_miembro_zip(zf))
+        finally:
+            zf.close()  # el miembro abierto mantiene el archivo hasta cerrarse
+    if formato:
+        return pa.input_stream(str(ruta), compression=formato)
+    return open(ruta, "rb")
+
+# Bytes del CSV descomprimido. Exacto en zip (directorio central); en gzip sale del ISIZE del final (el tamaño
+# módulo 2^32), con los GB que faltan tomados de la estimación por RATIO_CSV; en zstd es la estimación.
+def tamano_crudo(ruta: Path) -> int:
+    formato = compresion_de(ruta)
+    comprimido = ruta.stat().st_size
+    if formato is None:
+        return comprimido
+    if formato == "zip":
+        with zipfile.ZipFile(ruta) as zf:
+            return _miembro_zip(zf).file_size
+    estimado = comprimido * RATIO_CSV
+    if formato == "gzip" and comprimido >= 4:
+        with open(ruta, "rb") as fh:
+            fh.seek(-4, os.SEEK_END)
+            isize = int.from_bytes(fh.read(4), "little")
+        return isize + max(0, round((estimado - isize) / 2**32)) * 2**32
+    return estimado
+
+# Comprime un CSV a <nombre>.zst / <nombre>.gz en la misma carpeta (vía un temporal) y borra el original.
+# Devuelve la ruta comprimida.
+def comprimir(ruta: Path, formato: str) -> Path:
+    destino = ruta.with_name(ruta.name + SUFIJO_FORMATO[formato])
+    tmp = destino.with_name(destino.name + ".tmp")
+    try:
+        with open(ruta, "rb") as origen, pa.output_stream(str(tmp), compression=formato) as salida:
+            while datos := origen.read(BYTES_COPIA):
+                salida.write(datos)
+        os.replace(tmp, destino)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    ruta.unlink()
+    return destino
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# Contrato de esquema entre transformar_mensual.py (escribe) y cargar_postgres.py (lee).
+# El Parquet normalizado lleva en su metadata key-value la versión del contrato y, por columna,
+# el nombre de origen, el nombre normalizado que usa el loader y el tipo Arrow. Si el contrato
+# está y coincide con el esquema del archivo, el loader solo renombra columnas; si no, vuelve a
+# normalizar cada batch como antes.
+# Cambiar tipos, columnas o la limpieza del transform => subir VERSION_CONTRATO.
+# v2: las columnas de texto de baja cardinalidad (COLS_DICCIONARIO) van como diccionario.
+# Los Parquet por mes del layout hive (transformar_mensual.py --layout hive) llevan además la huella
+# del mes (huellas_mes) en CLAVE_HUELLA_MES, para que cargar_postgres.py --incremental no tenga que leerlos.
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CLAVE_CONTRATO = b"mef.contrato_esquema"
+CLAVE_HUELLA_MES = b"mef.huella_mes"
+VERSION_CONTRATO = 2
+VERSIONES_COMPATIBLES = (1, 2)
+
+# (columna de origen, columna normalizada, tipo Arrow). Texto: recortado, espacios colapsados y
+# "" en vez de nulos. FECHA no la usa el loader (destino None).
+# "dictionary": texto con pocos valores distintos (cientos) frente a decenas de millones de filas;
+# en memoria es categórica de pandas y en Parquet/Arrow un array diccionario. Metas, finalidades,
+# productos/proyectos y actividades (decenas de miles de valores) quedan como string.
+COLUMNAS_CONTRATO = [
+    ("ANO_EJE", "ano_eje", "int32"),
+    ("MES_EJE", "mes_eje", "int32"),
+    ("FECHA", None, "timestamp[ms]"),
+    # nivel
+    ("NIVEL_GOBIERNO", "nivel_gobierno_codigo", "dictionary"),
+    ("NIVEL_GOBIERNO_NOMBRE", "nivel_gobierno_nombre", "dictionary"),
+    # ejecutora
+    ("SEC_EJEC", "sec_ejec", "dictionary"),
+    ("EJECUTORA", "ejecutora_codigo", "dictionary"),
+    ("EJECUTORA_NOMBRE", "ejecutora_nombre", "dictionary"),
+    ("SECTOR", "sector", "dictionary"),
+    ("SECTOR_NOMBRE", "sector_nombre", "dictionary"),
+    ("PLIEGO", "pliego", "dictionary"),
+    ("PLIEGO_NOMBRE", "pliego_nombre", "dictionary"),
+    ("DEPARTAMENTO_EJECUTORA", "dep_ejecutora_codigo", "dictionary"),
+    ("DEPARTAMENTO_EJECUTORA_NOMBRE", "dep_ejecutora_nombre", "dictionary"),
+    ("PROVINCIA_EJECUTORA", "prov_ejecutora_codigo", "dictionary"),
+    ("PROVINCIA_EJECUTORA_NOMBRE", "prov_ejecutora_nombre", "dictionary"),
+    ("DISTRITO_EJECUTORA", "dist_ejecutora_codigo", "dictionary"),
+    ("DISTRITO_EJECUTORA_NOMBRE", "dist_ejecutora_nombre", "dictionary"),
+    # programática
+    ("PROGRAMA_PPTO", "programa_ppto", "dictionary"),
+    ("PROGRAMA_PPTO_NOMBRE", "programa_ppto_nombre", "dictionary"),
+    ("TIPO_ACT_PROY", "tipo_act_proy", "dictionary"),
+    ("TIPO_ACT_PROY_NOMBRE", "tipo_act_proy_nombre", "dictionary"),
+    ("PRODUCTO_PROYECTO", "producto_proyecto", "string"),
+    ("PRODUCTO_PROYECTO_NOMBRE", "producto_proyecto_nombre", "string"),
+    ("ACTIVIDAD_ACCION_OBRA", "actividad_accion_obra", "string"),
+    ("ACTIVIDAD_ACCION_OBRA_NOMBRE", "actividad_accion_obra_nombre", "string"),
+    ("SEC_FUNC", "sec_func", "int64"),
+    # funcional
+    ("FUNCION", "funcion", "dictionary"),
+    ("FUNCION_NOMBRE", "funcion_nombre", "dictionary"),
+    ("DIVISION_FUNCIONAL", "division_funcional", "dictionary"),
+    ("DIVISION_FUNCIONAL_NOMBRE", "division_funcional_nombre", "dictionary"),
+    ("GRUPO_FUNCIONAL", "grupo_funcional", "dictionary"),
+    ("GRUPO_FUNCIONAL_NOMBRE", "grupo_funcional_nombre", "dictionary"),
+    # meta
+    ("META", "meta", "string"),
+    ("FINALIDAD", "finalidad", "string"),
+    ("META_NOMBRE", "meta_nombre", "string"),
+    ("DEPARTAMENTO_META", "dep_meta_codigo", "dictionary"),
+    ("DEPARTAMENTO_META_NOMBRE", "dep_meta_nombre", "dictionary"),
+    ("FINALIDAD_NOMBRE", "finalidad_nombre", "string"),
+    # financiera
+    ("FUENTE_FINANCIAMIENTO", "fuente_financiamiento", "dictionary"),
+    ("FUENTE_FINANCIAMIENTO_NOMBRE", "fuente_financiamiento_nombre", "dictionary"),
+    ("RUBRO", "rubro", "dictionary"),
+    ("RUBRO_NOMBRE", "rubro_nombre", "dictionary"),
+    ("TIPO_RECURSO", "tipo_recurso", "dictionary"),
+    ("TIPO_RECURSO_NOMBRE", "tipo_recurso_nombre", "dictionary"),
+    ("CATEGORIA_GASTO", "categoria_gasto", "dictionary"),
+    ("CATEGORIA_GASTO_NOMBRE", "categoria_gasto_nombre", "dictionary"),
+    # clasificador
+    ("TIPO_TRANSACCION", "tipo_transaccion", "int64"),
+    ("GENERICA", "generica", "dictionary"),
+    ("GENERICA_NOMBRE", "generica_nombre", "dictionary"),
+    ("SUBGENERICA", "subgenerica", "dictionary"),
+    ("SUBGENERICA_NOMBRE", "subgenerica_nombre", "dictionary"),
+    ("SUBGENERICA_DET", "subgenerica_det", "dictionary"),
+    ("SUBGENERICA_DET_NOMBRE", "subgenerica_det_nombre", "dictionary"),
+    ("ESPECIFICA", "especifica", "dictionary"),
+    ("ESPECIFICA_NOMBRE", "especifica_nombre", "dictionary"),
+    ("ESPECIFICA_DET", "especifica_det", "dictionary"),
+    ("ESPECIFICA_DET_NOMBRE", "especifica_det_nombre", "dictionary"),
+    # métricas
+    ("MONTO_PIA", "monto_pia", "float64"),
+    ("MONTO_PIM", "monto_pim", "float64"),
+    ("MONTO_CERTIFICADO", "monto_certificado", "float64"),
+    ("MONTO_COMPROMETIDO_ANUAL", "monto_comprometido_anual", "float64"),
+    ("MONTO_COMPROMETIDO", "monto_comprometido", "float64"),
+    ("MONTO_DEVENGADO", "monto_devengado", "float64"),
+    ("MONTO_GIRADO", "monto_girado", "float64"),
+]
+
+COLS_DICCIONARIO = [o for o, _, t in COLUMNAS_CONTRATO if t == "dictionary"]
+COLS_ORIGEN = [o for o, _, _ in COLUMNAS_CONTRATO]
+
+TIPOS_ARROW = {
+    "dictionary": pa.dictionary(pa.int32(), pa.string()),
+    "int32": pa.int32(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "string": pa.string(),
+    "timestamp[ms]": pa.timestamp("ms"),
+}
+
+# Columnas esperadas para una versión del contrato (la v1 escribía todo el texto como string).
+def columnas_version(version: int) -> list:
+    if version == 1:
+        return [(o, d, "string" if t == "dictionary" else t) for o, d, t in COLUMNAS_CONTRATO]
+    return COLUMNAS_CONTRATO
+
+# Esquema Arrow del Parquet normalizado, con el contrato en la metadata.
+def esquema_contrato() -> pa.Schema:
+    contrato = {
+        "version": VERSION_CONTRATO,
+        "columnas": [{"origen": o, "destino": d, "tipo": t} for o, d, t in COLUMNAS_CONTRATO],
+    }
+    campos = [pa.field(o, TIPOS_ARROW[t]) for o, _, t in COLUMNAS_CONTRATO]
+    return pa.schema(campos, metadata={CLAVE_CONTRATO: json.dumps(contrato).encode("utf-8")})
+
+# Convierte el DataFrame limpio del transform a una tabla Arrow con los tipos del contrato.
+# Falla (ArrowInvalid) si un valor no entra en su tipo, p. ej. un año con decimales.
+def tabla_con_contrato(df: pd.DataFrame) -> pa.Table:
+    esquema = esquema_contrato()
+    return pa.Table.from_pandas(df[esquema.names], schema=esquema, preserve_index=False)
+
+# Valida el contrato del esquema de un Parquet. Devuelve ({origen: destino}, None) con las columnas
+# que usa el loader, o (None, motivo) si no trae contrato, es de otra versión o no coincide.
+def leer_contrato(esquema: pa.Schema) -> tuple:
+    crudo = (esquema.metadata or {}).get(CLAVE_CONTRATO)
+    if crudo is None:
+        return None, "sin contrato"
+    try:
+        contrato = json.loads(crudo)
+    except ValueError:
+        return None, "contrato ilegible"
+    version = contrato.get("version")
+    if version not in VERSIONES_COMPATIBLES:
+        return None, f"contrato v{version} (se espera v{VERSION_CONTRATO})"
+    columnas = [(c["origen"], c["destino"], c["tipo"]) for c in contrato.get("columnas", [])]
+    if columnas != columnas_version(version):
+        return None, "columnas del contrato distintas a las esperadas"
+    for origen, _, tipo in columnas:
+        idx = esquema.get_field_index(origen)
+        validos = [TIPOS_ARROW[tipo]]
+        if tipo == "string":
+            validos.append(TIPOS_ARROW["dictionary"])  # un string leído con read_dictionary
+        if idx < 0 or esquema.field(idx).type not in validos:
+            return None, f"columna {origen} ausente o con tipo distinto a {tipo}"
+    return {o: d for o, d, _ in columnas if d is not None}, None
+
+# Limpia una columna categórica aplicando `limpiar` solo a sus categorías (valores distintos) y
+# reasignando los códigos; categorías que quedan iguales tras limpiar se unifican. Los nulos
+# (código -1) se conservan.
+def limpiar_categorias(s: pd.Series, limpiar) -> pd.Series:
+    categorias = pd.Series(s.cat.categories, dtype=object)
+    if categorias.empty:
+        return s
+    limpias = limpiar(categorias).to_numpy(dtype=object)
+    nuevas, inversa = np.unique(limpias, return_inverse=True)
+    codigos = s.cat.codes.to_numpy()
+    codigos = np.where(codigos >= 0, inversa[np.maximum(codigos, 0)], -1)
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=nuevas), index=s.index, name=s.name)
+
+# Huella por mes de DataFrames con COLS_ORIGEN (leídos del Parquet normalizado): {(anio, mes): (filas,
+# checksum)}. El checksum es la suma módulo 2^64 del hash de cada fila (todas las columnas), así que no
+# depende del orden de las filas y detecta cambios de montos aunque el total del mes se compense.
+# Las columnas numéricas se hashean como float64: to_pandas() da float64 a un entero solo en los batches
+# con nulos, y el hash de pandas depende del dtype (la huella cambiaría con el tamaño de batch).
+def huellas_mes(dfs) -> dict:
+    acumulado: dict = {}
+    for df in dfs:
+        numericas = {c: "float64" for c, t in df.dtypes.items()
+                     if pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t)}
+        hashes = pd.util.hash_pandas_object(df.astype(numericas), index=False).to_numpy()
+        anio = pd.to_numeric(df["ANO_EJE"], errors="coerce").to_numpy()
+        mes = pd.to_numeric(df["MES_EJE"], errors="coerce").to_numpy()
+        for a, m in set(zip(anio.tolist(), mes.tolist())):
+            if pd.isna(a) or pd.isna(m):
+                continue
+            mask = (anio == a) & (mes == m)
+            filas, suma = acumulado.get((int(a), int(m)), (0, 0))
+            acumulado[(int(a), int(m))] = (filas + int(mask.sum()),
+                                           (suma + int(hashes[mask].sum(dtype=np.uint64))) % 2**64)
+    return {k: (v[0], f"{v[1]:016x}") for k, v in acumulado.items()}
+
+# Huellas guardadas en la metadata de un Parquet por mes (None si no las trae).
+def leer_huellas_mes(esquema: pa.Schema) -> dict | None:
+    crudo = (esquema.metadata or {}).get(CLAVE_HUELLA_MES)
+    if crudo is None:
+        return None
+    return {(a, m): (filas, huella) for a, m, filas, huella in json.loads(crudo)}
+
+# Metadata de esquema con las huellas de `huellas_mes` agregadas.
+def metadata_con_huellas(esquema: pa.Schema, huellas: dict) -> dict:
+    return {**(esquema.metadata or {}),
+            CLAVE_HUELLA_MES: json.dumps([[a, m, f, h] for (a, m), (f, h) in sorted(huellas.items())]).encode("utf-8")}
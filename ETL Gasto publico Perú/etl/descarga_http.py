@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+# Descarga HTTP de los CSV del MEF sin navegador, con pedidos Range.
+# - Un archivo grande se parte en rangos de bytes que se bajan a la vez (una conexión por rango) sobre un
+#   <destino>.part del tamaño final; el avance de cada rango se guarda en <destino>.part.json.
+# - Un corte no tira lo bajado: el reintento (o la próxima corrida) sigue desde el último byte escrito de cada rango,
+#   siempre que el servidor informe el mismo tamaño y el mismo ETag/Last-Modified (If-Range); si no, empieza de cero.
+# - Cada respuesta se valida mientras llega (206 con el Content-Range pedido, ni un byte de más ni de menos) y al final
+#   el tamaño total; si el servidor publica un checksum (Content-MD5 o Digest/Repr-Digest sha-256) se calcula durante la
+#   descarga (HashEnOrden) y se compara al terminar, sin volver a leer el archivo completo.
+# - Varios archivos a la vez comparten un LimitadorBanda: el tope de bytes/s es del conjunto, no de cada conexión.
+#
+# Uso:
+#   limitador = LimitadorBanda(20 << 20)   # 20 MB/s entre todas las descargas
+#   DescargaHttp(url, Path("data/raw/2024-Gasto-Mensual.csv"), conexiones=4, limitador=limitador).ejecutar()
+
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BYTES_MIN_RANGO      = 32 << 20  # un rango más chico no compensa otra conexión
+BYTES_LECTURA        = 1 << 20   # trozo de la respuesta que se escribe de una vez
+BYTES_GUARDAR_ESTADO = 16 << 20  # cada cuántos bytes de un rango se actualiza el .part.json
+BYTES_HASH           = 8 << 20   # lectura del .part para lo que el hash no recibió en orden
+INTENTOS             = 5         # por rango; cada reintento sigue desde donde quedó
+ESPERA_REINTENTO     = 2         # segundos, se duplica en cada intento
+TIEMPO_ESPERA        = (30, 120) # conexión / lectura (s)
+PATRON_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+class ErrorDescarga(Exception):
+    pass
+
+# El archivo del servidor ya no es el que se empezó a bajar (otro tamaño, ETag o Last-Modified): hay que
+# descartar el .part y empezar de cero.
+class ArchivoCambiado(ErrorDescarga):
+    pass
+
+# Tope de bytes/s compartido por todos los hilos de descarga (cubeta de fichas con ráfaga de 1 s).
+# Cada hilo descuenta lo que va a escribir y duerme lo que le falte; sin tope no hace nada.
+class LimitadorBanda:
+    def __init__(self, bytes_por_seg: int | None = None):
+        self.tasa = bytes_por_seg
+        self.disponible = 0.0
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consumir(self, n: int):
+        if not self.tasa:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            self.disponible = min(self.tasa, self.disponible + (ahora - self.ultimo) * self.tasa) - n
+            self.ultimo = ahora
+            espera = -self.disponible / self.tasa if self.disponible < 0 else 0.0
+        if espera:
+            time.sleep(espera)
+
+# md5/sha-256 del archivo calculado mientras se baja. El hash necesita los bytes en orden: el rango que contiene el
+# frente (primer byte sin hashear) le pasa cada trozo apenas lo escribe; lo que otros rangos escriben más adelante (o lo
+# que quedó de una corrida anterior) se lee del .part, ya en caché, cuando el frente llega ahí. Con un solo rango
+# (archivo chico o servidor sin rangos) nada se relee. `releidos` cuenta los bytes que hubo que leer del disco.
+class HashEnOrden:
+    def __init__(self, algoritmo: str, ruta: Path, partes: list):
+        self.h = hashlib.new(algoritmo)
+        self.ruta = ruta
+        self.limites = [(inicio, fin) for inicio, fin, _ in partes]
+        self.escritos = [inicio + hecho for inicio, _, hecho in partes]  # fin de lo escrito en cada rango
+        self.frente = 0
+        self.k = 0                # rango que contiene el frente
+        self.alcanzando = self.escritos[0] > 0  # alcanzar() lee del disco: los trozos no van directo al hash
+        self.releidos = 0
+        self.lock = threading.Lock()
+
+    # El rango k escribió `trozo` en la posición `pos` del .part.
+    def escrito(self, k: int, pos: int, trozo: bytes):
+        with self.lock:
+            self.escritos[k] = pos + len(trozo)
+            if self.alcanzando or k != self.k or pos != self.frente:
+                return
+            self.h.update(trozo)
+            self.frente += len(trozo)
+            if self.frente != self.limites[k][1]:
+                return
+            self.alcanzando = True
+        self.alcanzar()
+
+    # Sin rangos un reintento vuelve a bajar desde el byte 0: el hash también empieza de nuevo.
+    def reiniciar(self):
+        with self.lock:
+            self.h = hashlib.new(self.h.name)
+            self.frente = self.escritos[0] = 0
+            self.alcanzando = False
+
+    # Lee del .part lo ya escrito delante del frente hasta alcanzar lo que se está bajando; desde ahí ese rango
+    # vuelve a pasar sus trozos directo al hash.
+    def alcanzar(self):
+        with open(self.ruta, "rb") as fh:
+            while True:
+                with self.lock:
+                    fin = self.limites[self.k][1]
+                    if fin is not None and self.frente >= fin and self.k + 1 < len(self.limites):
+                        self.k += 1
+                        continue
+                    hasta = self.escritos[self.k]
+                    if self.frente >= hasta:
+                        self.alcanzando = False
+                        return
+                fh.seek(self.frente)
+                datos = fh.read(min(BYTES_HASH, hasta - self.frente))
+                if not datos:
+                    raise ErrorDescarga(f"{self.ruta.name} es más corto que lo bajado")
+                self.h.update(datos)
+                self.frente += len(datos)
+                self.releidos += len(datos)
+
+# Checksum publicado por el servidor: ("md5" | "sha256", digest en bytes) o None.
+def checksum_publicado(cabeceras) -> tuple | None:
+    if cabeceras.get("Content-MD5"):
+        return "md5", base64.b64decode(cabeceras["Content-MD5"])
+    for clave in ("Repr-Digest", "Digest"):
+        for parte in (cabeceras.get(clave) or "").split(","):
+            algoritmo, _, valor = parte.strip().partition("=")
+            if algoritmo.lower() == "sha-256" and valor:
+                return "sha256", base64.b64decode(valor.strip(":"))
+    return None
+
+# Descarga de un archivo a `destino` con hasta `conexiones` rangos en paralelo (ver el encabezado del módulo).
+# ejecutar() devuelve un resumen: bytes, bytes bajados ahora y los que ya estaban de una corrida anterior, rangos y
+# segundos. Si falla, el .part y su estado quedan para reanudar (salvo que el archivo haya cambiado o no verifique).
+class DescargaHttp:
+    def __init__(self, url: str, destino: Path, conexiones: int = 4, limitador: LimitadorBanda | None = None,
+                 sesion: requests.Session | None = None):
+        self.url = url
+        self.destino = destino
+        self.parcial = destino.with_name(destino.name + ".part")
+        self.ruta_estado = destino.with_name(destino.name + ".part.json")
+        self.conexiones = max(1, conexiones)
+        self.limitador = limitador or LimitadorBanda()
+        self.sesion = sesion
+        self.locales = threading.local()
+        self.lock = threading.Lock()
+        self.estado: dict = {}
+        self.bajados = 0
+        self.hash: HashEnOrden | None = None
+
+    # Una sesión (pool de conexiones) por hilo: requests.Session no garantiza ser segura entre hilos.
+    def _sesion(self) -> requests.Session:
+        if self.sesion is not None:
+            return self.sesion
+        if getattr(self.locales, "sesion", None) is None:
+            self.locales.sesion = requests.Session()
+        return self.locales.sesion
+
+    # Pide el primer byte: un 206 confirma que hay rangos y trae el tamaño en Content-Range; un 200 es un
+    # servidor sin rangos (tamaño de Content-Length, si lo manda).
+    def sondear(self) -> dict:
+        with self._sesion().get(self.url, headers={"Range": "bytes=0-0", "Accept-Encoding": "identity"},
+                                stream=True, timeout=TIEMPO_ESPERA) as r:
+            r.raise_for_status()
+            rangos, tamano = False, None
+            m = PATRON_CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+            if r.status_code == 206 and m and m.group(3) != "*":
+                rangos, tamano = True, int(m.group(3))
+            elif r.headers.get("Content-Length", "").isdigit():
+                tamano = int(r.headers["Content-Length"])
+            checksum = checksum_publicado(r.headers)
+            return {"url": self.url, "tamano": tamano, "rangos": rangos,
+                    "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                    "checksum": [checksum[0], checksum[1].hex()] if checksum else None}
+
+    # Estado guardado de una corrida anterior, si sigue valiendo para lo que el servidor informa ahora.
+    def _estado_previo(self, info: dict) -> dict | None:
+        if not (info["rangos"] and self.parcial.exists() and self.ruta_estado.exists()):
+            return None
+        try:
+            previo = json.loads(self.ruta_estado.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        iguales = all(previo.get(c) == info[c] for c in ("tamano", "etag", "last_modified"))
+        if not iguales or self.parcial.stat().st_size != info["tamano"]:
+            return None
+        return previo
+
+    # Rangos [inicio, fin, hecho] (fin excluido): a lo sumo `conexiones`, de al menos BYTES_MIN_RANGO.
+    def _rangos_nuevos(self, info: dict) -> list:
+        tamano = info["tamano"]
+        if not info["rangos"] or not tamano:
+            return [[0, tamano, 0]]
+        n = max(1, min(self.conexiones, tamano // BYTES_MIN_RANGO))
+        cortes = [tamano * k // n for k in range(n + 1)]
+        return [[cortes[k], cortes[k + 1], 0] for k in range(n)]
+
+    # Escribe el .part.json de forma atómica; se llama con self.lock tomado o sin hilos corriendo.
+    def _guardar_estado(self):
+        tmp = self.ruta_estado.with_name(self.ruta_estado.name + ".tmp")
+        tmp.write_text(json.dumps(self.estado), encoding="utf-8")
+        os.replace(tmp, self.ruta_estado)
+
+    def _avance(self, k: int, hecho: int):
+        with self.lock:
+            self.estado["partes"][k][2] = hecho
+            if self.estado["rangos"]:
+                self._guardar_estado()
+
+    # Baja lo que falta del rango k (con reintentos que siguen desde el último byte escrito).
+    def _bajar_rango(self, k: int):
+        inicio, fin, hecho = self.estado["partes"][k]
+        for intento in range(1, INTENTOS + 1):
+            try:
+                cabeceras = {"Accept-Encoding": "identity"}
+                if self.estado["rangos"]:
+                    cabeceras["Range"] = f"bytes={inicio + hecho}-{fin - 1}"
+                    validador = self.estado["etag"] or self.estado["last_modified"]
+                    if validador:
+                        cabeceras["If-Range"] = validador
+                else:
+                    hecho = 0  # sin rangos solo se puede volver a empezar
+                    if self.hash is not None:
+                        self.hash.reiniciar()
+                with self._sesion().get(self.url, headers=cabeceras, stream=True, timeout=TIEMPO_ESPERA) as r:
+                    r.raise_for_status()
+                    if self.estado["rangos"]:
+                        m = PATRON_CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+                        if r.status_code != 206:
+                            raise ArchivoCambiado(f"el servidor respondió {r.status_code} a un pedido de rango")
+                        if not m or int(m.group(1)) != inicio + hecho or int(m.group(2)) != fin - 1:
+                            raise ErrorDescarga(f"Content-Range inesperado: {r.headers.get('Content-Range')!r}")
+                    with open(self.parcial, "r+b") as fh:
+                        fh.seek(inicio + hecho)
+                        sin_guardar = 0
+                        for trozo in r.iter_content(BYTES_LECTURA):
+                            if fin is not None and inicio + hecho + len(trozo) > fin:
+                                raise ErrorDescarga(f"el rango {inicio}-{fin - 1} trajo bytes de más")
+                            self.limitador.consumir(len(trozo))
+                            fh.write(trozo)
+                            if self.hash is not None:
+                                fh.flush()  # alcanzar() lee el .part con otro descriptor
+                                self.hash.escrito(k, inicio + hecho, trozo)
+                            hecho += len(trozo)
+                            sin_guardar += len(trozo)
+                            with self.lock:
+                                self.bajados += len(trozo)
+                            if sin_guardar >= BYTES_GUARDAR_ESTADO:
+                                fh.flush()
+                                self._avance(k, hecho)
+                                sin_guardar = 0
+                        if fin is None:
+                            fh.truncate()
+                self._avance(k, hecho)
+                if fin is not None and inicio + hecho < fin:
+                    raise ErrorDescarga(f"respuesta corta: faltan {fin - inicio - hecho:,} bytes del rango "
+                                        f"{inicio}-{fin - 1}")
+                return
+            except ArchivoCambiado:
+                raise
+            except (requests.RequestException, ErrorDescarga) as e:
+                self._avance(k, hecho)
+                if intento == INTENTOS:
+                    raise
+                espera = ESPERA_REINTENTO * 2 ** (intento - 1)
+                print(f"  [reintento] {self.destino.name} rango {k}: {type(e).__name__}: {e} "
+                      f"(intento {intento}/{INTENTOS}, sigue en el byte {inicio + hecho:,} en {espera} s)", flush=True)
+                time.sleep(espera)
+
+    def _verificar(self):
+        tamano = self.parcial.stat().st_size
+        if self.estado["tamano"] is not None and tamano != self.estado["tamano"]:
+            raise ErrorDescarga(f"tamaño final {tamano:,} != {self.estado['tamano']:,} informado por el servidor")
+        if self.hash is not None:
+            algoritmo, esperado = self.estado["checksum"]
+            if self.hash.frente != tamano:
+                raise ErrorDescarga(f"{algoritmo} calculado sobre {self.hash.frente:,} de {tamano:,} bytes")
+            if self.hash.h.hexdigest() != esperado:
+                raise ErrorDescarga(f"{algoritmo} no coincide con el publicado por el servidor")
+
+    def ejecutar(self) -> dict:
+        t0 = time.perf_counter()
+        info = self.sondear()
+        previo = self._estado_previo(info)
+        if previo is None:
+            self.estado = {**info, "partes": self._rangos_nuevos(info)}
+            with open(self.parcial, "wb") as fh:
+                if info["rangos"]:
+                    fh.truncate(info["tamano"])
+            if info["rangos"]:
+                self._guardar_estado()
+            else:
+                self.ruta_estado.unlink(missing_ok=True)
+        else:
+            self.estado = {**previo, "url": self.url, "checksum": info["checksum"]}
+        reanudados = sum(h for _, _, h in self.estado["partes"])
+        if reanudados:
+            print(f"  [reanudo] {self.destino.name}: {reanudados / 2**20:,.0f} MB ya bajados", flush=True)
+        pendientes = [k for k, (i, f, h) in enumerate(self.estado["partes"]) if f is None or i + h < f]
+        if self.estado["checksum"]:
+            self.hash = HashEnOrden(self.estado["checksum"][0], self.parcial, self.estado["partes"])
+        try:
+            with ThreadPoolExecutor(max_workers=len(pendientes) + 1) as pool:
+                futuros = [pool.submit(self._bajar_rango, k) for k in pendientes]
+                if self.hash is not None and self.hash.alcanzando:
+                    futuros.append(pool.submit(self.hash.alcanzar))  # lo que ya estaba en el .part
+                for futuro in futuros:
+                    futuro.result()
+        except ArchivoCambiado:
+            self.parcial.unlink(missing_ok=True)
+            self.ruta_estado.unlink(missing_ok=True)
+            raise
+        try:
+            self._verificar()
+        except ErrorDescarga:
+            self.parcial.unlink(missing_ok=True)
+            self.ruta_estado.unlink(missing_ok=True)
+            raise
+        os.replace(self.parcial, self.destino)
+        self.ruta_estado.unlink(missing_ok=True)
+        return {"bytes": self.destino.stat().st_size, "bytes_bajados": self.bajados, "bytes_reanudados": reanudados,
+                "bytes_releidos": self.hash.releidos if self.hash is not None else 0,
+                "rangos": len(self.estado["partes"]), "seg": round(time.perf_counter() - t0, 2)}
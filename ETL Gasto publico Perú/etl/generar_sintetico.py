@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# Generador de CSV sintéticos con la forma de los archivos del MEF (YYYY-Gasto.csv / YYYY-Gasto-Mensual.csv).
+# Sirve para medir transformar_mensual.py y cargar_postgres.py sin descargar varios GB: mismas columnas,
+# códigos + nombres coherentes por dimensión (cardinalidades ajustables), nombres con tildes, comas y
+# espacios sobrantes, montos con nulos y, si se pide, líneas en latin-1 dentro de un archivo UTF-8 y
+# líneas malformadas. Con la misma semilla el archivo sale idéntico byte a byte.
+# Uso:
+#   python .\etl\generar_sintetico.py 2022 --filas 1000000
+#   python .\etl\generar_sintetico.py 2023 2024 --filas 200000 --metas 20000 --salida C:\tmp\raw
+#   python .\etl\generar_sintetico.py 2022 --filas 500000 --filas-latin1 0.001 --filas-malas 0.002
+
+import io
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from contrato_esquema import COLUMNAS_CONTRATO
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parents[1]
+RAW_DIR  = BASE_DIR / "data" / "raw"
+
+# Columnas del CSV del MEF en su orden (las del contrato salvo FECHA, que crea el transform)
+COLUMNAS_CSV = [o for o, _, _ in COLUMNAS_CONTRATO if o != "FECHA"]
+
+# Cardinalidades por defecto (filas distintas de cada catálogo)
+CARDINALIDADES = {
+    "ejecutoras": 2_500,
+    "programaticas": 20_000,
+    "funcionales": 150,
+    "metas": 30_000,
+    "financieras": 40,
+    "clasificadores": 1_500,
+}
+
+PALABRAS = [
+    "EDUCACIÓN", "SALUD", "TRANSPORTE", "SANEAMIENTO", "AGROPECUARIA", "ENERGÍA", "PROTECCIÓN SOCIAL",
+    "ORDEN PÚBLICO Y SEGURIDAD", "CULTURA Y DEPORTE", "VIVIENDA Y DESARROLLO URBANO", "AMBIENTE",
+    "COMUNICACIONES", "PESCA", "TURISMO", "INDUSTRIA", "JUSTICIA", "PREVISIÓN SOCIAL", "DEUDA PÚBLICA",
+    "PLANEAMIENTO, GESTIÓN Y RESERVA DE CONTINGENCIA", "DEFENSA Y SEGURIDAD NACIONAL",
+]
+LUGARES = [
+    "AMAZONAS", "ÁNCASH", "APURÍMAC", "AREQUIPA", "AYACUCHO", "CAJAMARCA", "CALLAO", "CUSCO",
+    "HUANCAVELICA", "HUÁNUCO", "ICA", "JUNÍN", "LA LIBERTAD", "LAMBAYEQUE", "LIMA", "LORETO",
+    "MADRE DE DIOS", "MOQUEGUA", "PASCO", "PIURA", "PUNO", "SAN MARTÍN", "TACNA", "TUMBES", "UCAYALI",
+]
+
+# Función: nombres
+# Qué hace: Devuelve n nombres distintos "<PREFIJO> <PALABRA> - <LUGAR> <i>"; una parte trae espacios sobrantes
+#           (que el transform debe colapsar) y los de índice par llevan coma (el CSV los entrecomilla).
+def nombres(rng: np.random.Generator, prefijo: str, n: int) -> np.ndarray:
+    palabra = rng.integers(0, len(PALABRAS), size=n)
+    lugar = rng.integers(0, len(LUGARES), size=n)
+    sucio = rng.random(n) < 0.1
+    out = np.empty(n, dtype=object)
+    for i in range(n):
+        sep = ", " if i % 2 == 0 else " - "
+        txt = f"{prefijo} {PALABRAS[palabra[i]]}{sep}{LUGARES[lugar[i]]} {i + 1}"
+        out[i] = f"  {txt.replace(' ', '  ', 1)} " if sucio[i] else txt
+    return out
+
+# Función: codigos
+# Qué hace: Códigos de texto con ceros a la izquierda ("0001"), como vienen en los CSV del MEF.
+def codigos(valores: np.ndarray, ancho: int) -> np.ndarray:
+    return np.array([str(v).zfill(ancho) for v in valores], dtype=object)
+
+# Función: jerarquia
+# Qué hace: Asigna a cada una de n filas un padre entre k códigos y devuelve (códigos, nombres) del padre; el
+#           nombre depende solo del código, así la dimensión queda consistente.
+def jerarquia(rng: np.random.Generator, n: int, k: int, prefijo: str, ancho: int) -> tuple:
+    k = max(1, k)
+    catalogo = nombres(rng, prefijo, k)
+    padre = rng.integers(0, k, size=n)
+    return codigos(padre + 1, ancho), catalogo[padre]
+
+# Función: catalogos
+# Qué hace: Arma un DataFrame por grupo de dimensión (columnas del CSV) con la cardinalidad pedida. Cada fila del
+#           CSV toma una fila de cada catálogo.
+def catalogos(rng: np.random.Generator, card: dict) -> dict:
+    cats = {}
+
+    n = card["ejecutoras"]
+    nivel = rng.choice(np.array(["E", "R", "M"], dtype=object), size=n, p=[0.2, 0.1, 0.7])
+    ejec = {
+        "NIVEL_GOBIERNO": nivel,
+        "NIVEL_GOBIERNO_NOMBRE": pd.Series(nivel).map(
+            {"E": "GOBIERNO NACIONAL", "R": "GOBIERNOS REGIONALES", "M": "GOBIERNOS LOCALES"}).to_numpy(),
+        "SEC_EJEC": codigos(300_000 + np.arange(n), 6),
+        "EJECUTORA": codigos(np.arange(n) % 1_000 + 1, 3),
+        "EJECUTORA_NOMBRE": nombres(rng, "MUNICIPALIDAD", n),
+    }
+    ejec["SECTOR"], ejec["SECTOR_NOMBRE"] = jerarquia(rng, n, 40, "SECTOR", 2)
+    ejec["PLIEGO"], ejec["PLIEGO_NOMBRE"] = jerarquia(rng, n, n // 3, "PLIEGO", 6)
+    ejec["DEPARTAMENTO_EJECUTORA"], ejec["DEPARTAMENTO_EJECUTORA_NOMBRE"] = jerarquia(rng, n, 25, "DEPARTAMENTO", 2)
+    ejec["PROVINCIA_EJECUTORA"], ejec["PROVINCIA_EJECUTORA_NOMBRE"] = jerarquia(rng, n, 196, "PROVINCIA", 4)
+    ejec["DISTRITO_EJECUTORA"], ejec["DISTRITO_EJECUTORA_NOMBRE"] = jerarquia(rng, n, 1_874, "DISTRITO", 6)
+    cats["ejec"] = pd.DataFrame(ejec)
+
+    n = card["programaticas"]
+    prog = {}
+    prog["PROGRAMA_PPTO"], prog["PROGRAMA_PPTO_NOMBRE"] = jerarquia(rng, n, 150, "PROGRAMA", 4)
+    prog["TIPO_ACT_PROY"] = rng.choice(np.array(["2", "3"], dtype=object), size=n, p=[0.3, 0.7])
+    prog["TIPO_ACT_PROY_NOMBRE"] = np.where(prog["TIPO_ACT_PROY"] == "2", "PROYECTO", "ACTIVIDAD").astype(object)
+    prog["PRODUCTO_PROYECTO"], prog["PRODUCTO_PROYECTO_NOMBRE"] = jerarquia(rng, n, n // 4, "PRODUCTO", 7)
+    prog["ACTIVIDAD_ACCION_OBRA"], prog["ACTIVIDAD_ACCION_OBRA_NOMBRE"] = jerarquia(rng, n, n // 2, "ACTIVIDAD", 7)
+    prog["SEC_FUNC"] = rng.integers(1, 300, size=n).astype(str).astype(object)
+    cats["prog"] = pd.DataFrame(prog)
+
+    n = card["funcionales"]
+    func = {}
+    func["FUNCION"], func["FUNCION_NOMBRE"] = jerarquia(rng, n, 25, "FUNCIÓN", 2)
+    func["DIVISION_FUNCIONAL"], func["DIVISION_FUNCIONAL_NOMBRE"] = jerarquia(rng, n, max(1, n // 2), "DIVISIÓN", 3)
+    func["GRUPO_FUNCIONAL"] = codigos(np.arange(n) + 1, 4)
+    func["GRUPO_FUNCIONAL_NOMBRE"] = nombres(rng, "GRUPO", n)
+    cats["func"] = pd.DataFrame(func)
+
+    n = card["metas"]
+    meta = {
+        "META": codigos(np.arange(n) % 9_999 + 1, 4),
+        "FINALIDAD": codigos(rng.integers(1, 9_999_999, size=n), 7),
+        "META_NOMBRE": nombres(rng, "META", n),
+    }
+    meta["DEPARTAMENTO_META"], meta["DEPARTAMENTO_META_NOMBRE"] = jerarquia(rng, n, 25, "DEPARTAMENTO", 2)
+    meta["FINALIDAD_NOMBRE"] = nombres(rng, "FINALIDAD", n)
+    cats["meta"] = pd.DataFrame(meta)
+
+    n = card["financieras"]
+    fin = {}
+    fin["FUENTE_FINANCIAMIENTO"], fin["FUENTE_FINANCIAMIENTO_NOMBRE"] = jerarquia(rng, n, 5, "FUENTE", 1)
+    fin["RUBRO"], fin["RUBRO_NOMBRE"] = jerarquia(rng, n, 19, "RUBRO", 2)
+    fin["TIPO_RECURSO"], fin["TIPO_RECURSO_NOMBRE"] = jerarquia(rng, n, 10, "RECURSO", 1)
+    fin["CATEGORIA_GASTO"] = rng.choice(np.array(["5", "6"], dtype=object), size=n)
+    fin["CATEGORIA_GASTO_NOMBRE"] = np.where(fin["CATEGORIA_GASTO"] == "5", "GASTOS CORRIENTES",
+                                             "GASTOS DE CAPITAL").astype(object)
+    cats["fin"] = pd.DataFrame(fin)
+
+    n = card["clasificadores"]
+    clas = {"TIPO_TRANSACCION": rng.integers(1, 3, size=n).astype(str).astype(object)}
+    clas["GENERICA"], clas["GENERICA_NOMBRE"] = jerarquia(rng, n, 7, "GENÉRICA", 1)
+    clas["SUBGENERICA"], clas["SUBGENERICA_NOMBRE"] = jerarquia(rng, n, 30, "SUBGENÉRICA", 1)
+    clas["SUBGENERICA_DET"], clas["SUBGENERICA_DET_NOMBRE"] = jerarquia(rng, n, 90, "SUBGENÉRICA DET", 1)
+    clas["ESPECIFICA"], clas["ESPECIFICA_NOMBRE"] = jerarquia(rng, n, max(1, n // 3), "ESPECÍFICA", 1)
+    clas["ESPECIFICA_DET"] = codigos(np.arange(n) % 99 + 1, 2)
+    clas["ESPECIFICA_DET_NOMBRE"] = nombres(rng, "ESPECÍFICA DET", n)
+    cats["clas"] = pd.DataFrame(clas)
+    return cats
+
+# Función: bloque_filas
+# Qué hace: Genera m filas del CSV: cada grupo de dimensión se elige con sesgo (pocas ejecutoras/metas concentran
+#           muchas filas, como en los datos reales), mes uniforme y montos log-normales con 2 decimales y nulos.
+def bloque_filas(rng: np.random.Generator, cats: dict, anio: int, m: int, sesgo: float, nulos: float) -> pd.DataFrame:
+    partes = [pd.DataFrame({"ANO_EJE": np.full(m, str(anio), dtype=object),
+                            "MES_EJE": rng.integers(1, 13, size=m).astype(str).astype(object)})]
+    for cat in cats.values():
+        idx = np.minimum((len(cat) * rng.random(m) ** sesgo).astype(np.int64), len(cat) - 1)
+        partes.append(cat.iloc[idx].reset_index(drop=True))
+    df = pd.concat(partes, axis=1)
+    for c in [c for c in COLUMNAS_CSV if c.startswith("MONTO_")]:
+        montos = np.round(rng.lognormal(9, 2.5, size=m), 2)
+        valores = np.char.mod("%.2f", montos).astype(object)
+        valores[rng.random(m) < nulos] = ""
+        df[c] = valores
+    return df[COLUMNAS_CSV]
+
+# Función: ensuciar_lineas
+# Qué hace: Codifica las líneas de un bloque CSV. Una fracción va en latin-1 aunque el archivo sea UTF-8 (bytes
+#           inválidos, fuerza el reintento por codificación del transform) y otra sale malformada: con un campo de
+#           más (on_bad_lines="skip" la descarta) o cortada a la mitad. Devuelve (bytes, latin1, malas).
+def ensuciar_lineas(rng: np.random.Generator, texto: str, codificacion: str,
+                    frac_latin1: float, frac_malas: float) -> tuple:
+    if frac_latin1 <= 0 and frac_malas <= 0:
+        return texto.encode(codificacion), 0, 0
+    lineas = texto.splitlines(keepends=True)
+    latin1 = rng.random(len(lineas)) < frac_latin1
+    malas = rng.random(len(lineas)) < frac_malas
+    salida = []
+    for i, linea in enumerate(lineas):
+        if malas[i]:
+            linea = linea.rstrip("\r\n")
+            linea = (linea + ',"EXTRA"\n') if i % 2 == 0 else (linea[: len(linea) // 2].rstrip('"\\') + "\n")
+        salida.append(linea.encode("latin-1", errors="replace") if latin1[i] else linea.encode(codificacion))
+    return b"".join(salida), int(latin1.sum()), int(malas.sum())
+
+# Función: generar_csv
+# Qué hace: Escribe un CSV sintético del año en `destino` por bloques (memoria acotada) y devuelve un resumen
+#           con filas, líneas en latin-1, líneas malas y bytes.
+def generar_csv(destino: Path, anio: int, filas: int, semilla: int = 7, cardinalidades: dict | None = None,
+                sesgo: float = 2.0, nulos: float = 0.01, codificacion: str = "utf-8",
+                frac_latin1: float = 0.0, frac_malas: float = 0.0, filas_bloque: int = 200_000) -> dict:
+    rng = np.random.default_rng(semilla + anio)
+    cats = catalogos(rng, {**CARDINALIDADES, **(cardinalidades or {})})
+    total_latin1 = total_malas = 0
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix(destino.suffix + ".part")
+    cod_datos = "utf-8" if codificacion == "utf-8-sig" else codificacion  # el BOM va solo al inicio del archivo
+    with open(tmp, "wb") as fh:
+        for offset in range(0, filas, filas_bloque):
+            df = bloque_filas(rng, cats, anio, min(filas_bloque, filas - offset), sesgo, nulos)
+            buf = io.StringIO()
+            df.to_csv(buf, index=False, header=(offset == 0), lineterminator="\n")
+            texto = buf.getvalue()
+            if offset == 0:
+                cabecera, _, texto = texto.partition("\n")
+                fh.write((cabecera + "\n").encode(codificacion))
+            datos, n_latin1, n_malas = ensuciar_lineas(rng, texto, cod_datos, frac_latin1, frac_malas)
+            fh.write(datos)
+            total_latin1 += n_latin1
+            total_malas += n_malas
+    tmp.replace(destino)
+    return {"archivo": destino.name, "filas": filas, "latin1": total_latin1, "malas": total_malas,
+            "bytes": destino.stat().st_size}
+
+# Función: nombre_archivo
+# Qué hace: Nombre del CSV como lo publica el MEF: YYYY-Gasto.csv hasta 2023 y YYYY-Gasto-Mensual.csv desde 2024.
+def nombre_archivo(anio: int, formato: str = "auto") -> str:
+    if formato == "mensual" or (formato == "auto" and anio >= 2024):
+        return f"{anio}-Gasto-Mensual.csv"
+    return f"{anio}-Gasto.csv"
+
+# Función: principal
+# Qué hace: CLI del generador: un CSV por año en la carpeta de salida (por defecto data/raw).
+def principal():
+    parser = argparse.ArgumentParser(description="Genera CSV sintéticos con la forma de los del MEF.")
+    parser.add_argument("anios", nargs="+", type=int, help="Años a generar. Ej: 2022 2024")
+    parser.add_argument("--filas", type=int, default=1_000_000, help="Filas por archivo (default 1M)")
+    parser.add_argument("--salida", type=Path, default=RAW_DIR, help="Carpeta destino (default data/raw)")
+    parser.add_argument("--formato", choices=["auto", "gasto", "mensual"], default="auto",
+                        help="Nombre YYYY-Gasto.csv o YYYY-Gasto-Mensual.csv (auto: según el año)")
+    parser.add_argument("--semilla", type=int, default=7, help="Semilla (mismo valor = mismo archivo)")
+    for clave, valor in CARDINALIDADES.items():
+        parser.add_argument(f"--{clave}", type=int, default=valor, help=f"Filas distintas del catálogo (default {valor:,})")
+    parser.add_argument("--sesgo", type=float, default=2.0, help="Concentración de filas en pocos valores (1 = uniforme)")
+    parser.add_argument("--nulos", type=float, default=0.01, help="Fracción de montos vacíos (default 0.01)")
+    parser.add_argument("--encoding", choices=["utf-8", "utf-8-sig", "latin-1"], default="utf-8",
+                        help="Codificación del archivo (default utf-8)")
+    parser.add_argument("--filas-latin1", type=float, default=0.0,
+                        help="Fracción de líneas en latin-1 dentro de un archivo UTF-8 (default 0)")
+    parser.add_argument("--filas-malas", type=float, default=0.0,
+                        help="Fracción de líneas malformadas: campo extra o cortadas (default 0)")
+    args = parser.parse_args()
+
+    cards = {clave: getattr(args, clave) for clave in CARDINALIDADES}
+    for anio in args.anios:
+        destino = args.salida / nombre_archivo(anio, args.formato)
+        r = generar_csv(destino, anio, args.filas, args.semilla, cards, args.sesgo, args.nulos,
+                        args.encoding, args.filas_latin1, args.filas_malas)
+        print(f"[ok] {destino}  filas={r['filas']:,}  latin1={r['latin1']:,}  malas={r['malas']:,}  "
+              f"MB={r['bytes'] / 2**20:,.1f}")
+
+if __name__ == "__main__":
+    sys.exit(principal())
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Kernels de limpieza del transform (transformar_mensual.py).
+# Las columnas de texto del MEF repiten pocos valores millones de veces (FUNCION_NOMBRE, PLIEGO_NOMBRE…) y aun
+# las "anchas" (META_NOMBRE, PRODUCTO_PROYECTO_NOMBRE) tienen decenas de miles de valores frente a millones de filas.
+# Por eso cada columna se factoriza (códigos + valores distintos), se limpian solo los valores distintos y el
+# resultado vuelve a las filas por código. Lo ya limpiado queda en CACHE_LIMPIEZA, que dura todo el proceso:
+# un valor se limpia una vez aunque aparezca en otros bloques, columnas o archivos.
+# Los números se parsean con kernels de Arrow (sin pasar por objetos str de Python) y FECHA sale de aritmética
+# sobre los arrays de año y mes.
+#
+# Uso:
+#   from limpieza import a_numero, limpiar_columna, fecha_desde_anio_mes
+#   df["MONTO_PIM"] = a_numero(df["MONTO_PIM"])
+#   df["META_NOMBRE"] = limpiar_columna(df["META_NOMBRE"])
+#   df["FUNCION_NOMBRE"] = limpiar_columna(df["FUNCION_NOMBRE"], categorica=True)
+#   df["FECHA"] = fecha_desde_anio_mes(df["ANO_EJE"], df["MES_EJE"])
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+MAX_VALORES_CACHE = 2_000_000  # al pasarse se vacía (acota la memoria en años con muchos valores únicos)
+PATRON_NUMERO = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+
+# Texto Arrow -> float64: recorta espacios y deja nulo lo que no es un número (como pd.to_numeric con
+# errors="coerce"; la única diferencia es "inf", que aquí queda nulo).
+def numero_arrow(col):
+    col = pc.utf8_trim_whitespace(col)
+    return pc.cast(pc.if_else(pc.match_substring_regex(col, PATRON_NUMERO), col, pa.scalar(None, pa.string())),
+                   pa.float64())
+
+# Serie -> numérica (float) de forma segura; valores no convertibles pasan a NaN. El texto respaldado por Arrow
+# (el "str" de pandas 3 que entrega read_csv) se convierte con numero_arrow; lo demás con pd.to_numeric.
+def a_numero(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.StringDtype) and s.dtype.storage == "pyarrow":
+        valores = numero_arrow(pa.chunked_array(s.array.__arrow_array__())).to_numpy()
+        return pd.Series(valores, index=s.index, name=s.name)
+    return pd.to_numeric(s, errors="coerce")
+
+# Limpieza de referencia, vectorizada sobre una Serie: vacíos -> "", recorta y colapsa espacios múltiples.
+def limpiar_texto(s: pd.Series) -> pd.Series:
+    s = s.fillna("").astype(str)
+    s = s.str.strip().str.replace(r"\s+", " ", regex=True)
+    return s
+
+# Memo valor crudo -> valor limpio, compartido por todas las columnas de texto (la limpieza no depende de la
+# columna). Guarda los aciertos/fallos para las métricas del transform.
+class CacheLimpieza:
+    def __init__(self, max_valores: int = MAX_VALORES_CACHE):
+        self.max_valores = max_valores
+        self.valores: dict = {}
+        self.aciertos = 0
+        self.limpiados = 0
+
+    # Limpia un array de valores distintos (sin nulos) y devuelve el array limpio en el mismo orden.
+    def limpiar(self, distintos: np.ndarray) -> np.ndarray:
+        valores = self.valores
+        limpios = np.array([valores.get(v) for v in distintos], dtype=object)
+        faltan = np.flatnonzero(pd.isna(limpios))
+        self.aciertos += len(distintos) - len(faltan)
+        if len(faltan):
+            nuevos = limpiar_texto(pd.Series(distintos[faltan], dtype=object)).to_numpy(dtype=object)
+            limpios[faltan] = nuevos
+            if len(valores) + len(faltan) > self.max_valores:
+                valores.clear()
+            valores.update(zip(distintos[faltan], nuevos))
+            self.limpiados += len(faltan)
+        return limpios
+
+CACHE_LIMPIEZA = CacheLimpieza()
+
+# Limpia una columna de texto por valores distintos (igual resultado que limpiar_texto fila a fila). Los nulos
+# quedan como "". Con categorica=True devuelve una categórica con categorías limpias y únicas (para las columnas
+# diccionario del contrato); si no, un array de objetos str.
+def limpiar_columna(s: pd.Series, categorica: bool = False, cache: CacheLimpieza = CACHE_LIMPIEZA) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codigos, distintos = s.cat.codes.to_numpy(), s.cat.categories.to_numpy(dtype=object)
+    else:
+        codigos, distintos = pd.factorize(s, use_na_sentinel=True)
+        distintos = np.asarray(distintos, dtype=object)
+    limpios = np.append(cache.limpiar(distintos), "")  # el código -1 (nulo) cae en el "" del final
+    if not categorica:
+        return pd.Series(limpios[codigos], index=s.index, name=s.name, dtype=object)
+    categorias, inversa = np.unique(limpios, return_inverse=True)
+    return pd.Series(pd.Categorical.from_codes(inversa[codigos], categories=categorias),
+                     index=s.index, name=s.name)
+
+# FECHA = primer día del mes, calculada con aritmética sobre los arrays de año y mes (sin armar texto por fila).
+# Año o mes nulos o fuera de rango (mes 1..12, año 1..9999) dan NaT; los decimales se truncan.
+def fecha_desde_anio_mes(anio_s: pd.Series, mes_s: pd.Series) -> pd.Series:
+    anio = np.trunc(a_numero(anio_s).to_numpy(dtype="float64", na_value=np.nan))
+    mes = np.trunc(a_numero(mes_s).to_numpy(dtype="float64", na_value=np.nan))
+    validos = (anio >= 1) & (anio <= 9999) & (mes >= 1) & (mes <= 12)
+    meses = np.where(validos, (anio - 1970) * 12 + (mes - 1), 0).astype("int64")
+    fechas = meses.astype("datetime64[M]").astype("datetime64[ms]")
+    fechas[~validos] = np.datetime64("NaT")
+    return pd.Series(fechas, index=anio_s.index, name="FECHA")
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Instrumentación de los scripts ETL: tiempo por etapa, filas/s, bytes y RSS pico.
+# Siempre se acumulan totales por etapa en memoria para el resumen final. Con --metrics <archivo>
+# cada etapa, batch y archivo se agrega además como una línea JSON; los procesos worker escriben
+# al mismo archivo porque heredan ETL_METRICAS / ETL_CORRIDA del proceso principal.
+# Con --profile cada archivo se procesa bajo cProfile: se guarda un .prof y se imprime el top.
+#
+# Uso:
+#   from metricas import METRICAS
+#   with METRICAS.etapa("groupby") as m:
+#       ...
+#       m["filas"] = len(df)
+#   for batch in METRICAS.iterar("leer_parquet", batches, lambda b: {"filas": b.num_rows}):
+#       ...
+
+import io
+import os
+import sys
+import json
+import argparse
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+try:
+    import resource  # no existe en Windows
+except ImportError:
+    resource = None
+
+# Valor en KB de una línea de /proc/self/status (None fuera de Linux).
+def _status_kb(clave: str) -> int | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for linea in fh:
+                if linea.startswith(clave + ":"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return None
+
+# RSS actual del proceso en MB (None donde no se puede medir; ru_maxrss solo da el pico).
+def rss_actual_mb() -> float | None:
+    actual = _status_kb("VmRSS")
+    return None if actual is None else round(actual / 1024, 1)
+
+# RSS pico del proceso en MB (None donde no se puede medir). En Linux se usa VmHWM de /proc: ru_maxrss
+# sobrevive a exec y un subproceso heredaría el pico de su padre. ru_maxrss viene en KB en Linux y en
+# bytes en macOS.
+def rss_pico_mb() -> float | None:
+    pico = _status_kb("VmHWM")
+    if pico is not None:
+        return round(pico / 1024, 1)
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# Tamaño en bytes desde la CLI/entorno: "4G", "1500M", "512k" o un número (MB).
+def parsear_tamano(texto: str) -> int:
+    unidades = {"k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+    t = texto.strip().lower().removesuffix("b").removesuffix("i")
+    try:
+        if t and t[-1] in unidades:
+            return int(float(t[:-1]) * unidades[t[-1]])
+        return int(float(t) * 2**20)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamaño inválido: {texto!r} (ej. 4G, 1500M)")
+
+# Memoria física total en bytes (None donde os.sysconf no la informa, p. ej. Windows).
+def memoria_fisica_bytes() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+class Metricas:
+    def __init__(self):
+        self.script = Path(sys.argv[0]).stem or "etl"
+        self.ruta = os.getenv("ETL_METRICAS") or None
+        self.corrida = os.getenv("ETL_CORRIDA") or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.perfil = os.getenv("ETL_PERFIL") == "1"
+        self.totales: Dict[str, list] = {}  # etapa -> [veces, segundos, filas, bytes]
+        self.lock = threading.Lock()
+
+    # Activa el archivo JSON lines y/o el perfilado; se propaga a subprocesos por variables de entorno.
+    def configurar(self, ruta: str | None = None, perfil: bool = False, script: str | None = None):
+        if script:
+            self.script = script
+        if ruta:
+            self.ruta = str(Path(ruta).resolve())
+            Path(self.ruta).parent.mkdir(parents=True, exist_ok=True)
+            os.environ["ETL_METRICAS"] = self.ruta
+        self.perfil = perfil or self.perfil
+        if self.perfil:
+            os.environ["ETL_PERFIL"] = "1"
+        os.environ["ETL_CORRIDA"] = self.corrida
+
+    def registrar(self, tipo: str, **campos):
+        if self.ruta is None:
+            return
+        linea = json.dumps({"ts": round(time.time(), 3), "corrida": self.corrida, "script": self.script,
+                            "pid": os.getpid(), "tipo": tipo, **campos}, ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.ruta, "a", encoding="utf-8") as fh:
+                fh.write(linea + "\n")
+
+    # Mide una etapa. El bloque puede completar "filas"/"bytes" (y otros campos) en el dict que recibe.
+    @contextmanager
+    def etapa(self, nombre: str, **campos):
+        info = dict(campos)
+        t0 = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seg = time.perf_counter() - t0
+            filas = info.get("filas") or 0
+            with self.lock:
+                tot = self.totales.setdefault(nombre, [0, 0.0, 0, 0])
+                tot[0] += 1; tot[1] += seg; tot[2] += filas; tot[3] += info.get("bytes") or 0
+            self.registrar("etapa", etapa=nombre, seg=round(seg, 6), **info)
+
+    # Recorre un iterable midiendo cada next() como la etapa `nombre` (lecturas por chunks/batches).
+    def iterar(self, nombre: str, iterable, medir=None):
+        it = iter(iterable)
+        while True:
+            with self.etapa(nombre) as info:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    info["fin"] = True
+                    return
+                if medir is not None:
+                    info.update(medir(item))
+            yield item
+
+    # Línea por batch/bloque: filas, segundos, filas/s y RSS pico del proceso.
+    def batch(self, filas: int, seg: float, **campos):
+        self.registrar("batch", filas=filas, seg=round(seg, 4),
+                       filas_s=round(filas / seg) if seg > 0 else None, rss_pico_mb=rss_pico_mb(), **campos)
+
+    # Perfila el bloque con cProfile si --profile está activo (si no, no hace nada).
+    @contextmanager
+    def perfilar(self, nombre: str, top: int = 25):
+        if not self.perfil:
+            yield
+            return
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            carpeta = Path(self.ruta).parent if self.ruta else Path.cwd()
+            destino = carpeta / f"perfil_{self.script}_{Path(nombre).stem}_{os.getpid()}.prof"
+            perfil.dump_stats(str(destino))
+            salida = io.StringIO()
+            pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(top)
+            print(f"[perfil] {nombre} -> {destino}")
+            print(salida.getvalue())
+
+    # Totales por etapa de la corrida: del archivo de métricas (incluye workers) o de memoria.
+    def _totales_corrida(self) -> Dict[str, list]:
+        if self.ruta is None or not Path(self.ruta).exists():
+            return self.totales
+        totales: Dict[str, list] = {}
+        with open(self.ruta, encoding="utf-8") as fh:
+            for linea in fh:
+                try:
+                    r = json.loads(linea)
+                except ValueError:
+                    continue
+                if r.get("corrida") != self.corrida or r.get("tipo") != "etapa":
+                    continue
+                tot = totales.setdefault(r["etapa"], [0, 0.0, 0, 0])
+                tot[0] += 1; tot[1] += r.get("seg") or 0; tot[2] += r.get("filas") or 0; tot[3] += r.get("bytes") or 0
+        return totales
+
+    # Resumen de fin de corrida por etapa (las etapas se solapan si hay pipeline/workers).
+    def resumen(self):
+        totales = self._totales_corrida()
+        if not totales:
+            return
+        print(f"[metricas] resumen por etapa (corrida {self.corrida}):")
+        print(f"  {'etapa':<24}{'veces':>8}{'seg':>10}{'filas':>14}{'filas/s':>12}{'MB':>10}")
+        for nombre, (veces, seg, filas, bytes_) in sorted(totales.items(), key=lambda kv: -kv[1][1]):
+            filas_s = f"{filas / seg:,.0f}" if filas and seg > 0 else "-"
+            mb = f"{bytes_ / 2**20:,.1f}" if bytes_ else "-"
+            print(f"  {nombre:<24}{veces:>8,}{seg:>10.2f}{filas:>14,}{filas_s:>12}{mb:>10}")
+        pico = rss_pico_mb()
+        if pico is not None:
+            print(f"  RSS pico (proceso principal): {pico:,.1f} MB")
+        self.registrar("resumen", etapas={k: {"veces": v[0], "seg": round(v[1], 4), "filas": v[2], "bytes": v[3]}
+                                          for k, v in totales.items()}, rss_pico_mb=pico)
+        if self.ruta:
+            print(f"[metricas] detalle en {self.ruta}")
+
+METRICAS = Metricas()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de AgregadorFact (cargar_postgres.py, --consolidate file) sin base de datos.
+
+Cada grano tiene que salir una sola vez aunque llegue en varios batches con dtypes distintos: un batch
+donde algún merge dejó una FK en NaN trae las FKs como float64 y el resto como int64. Revisa la
+agregación en memoria, con volcados a disco entre batches y con muchos granos repartidos en las
+particiones. Imprime [ok]/[error] por caso; sale con 1 si alguno falla.
+
+Uso:
+  python etl/probar_agregacion.py
+"""
+
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from cargar_postgres import AgregadorFact, FKS_FACT, METRICAS_FACT
+
+# Hechos de prueba: `claves` filas de FKs y 1.0 en cada métrica, con las FKs en el dtype pedido.
+def hechos(claves, dtype: str) -> pd.DataFrame:
+    df = pd.DataFrame(np.asarray(claves, dtype="int64"), columns=FKS_FACT).astype(dtype)
+    for c in METRICAS_FACT:
+        df[c] = 1.0
+    return df
+
+# Agrega los batches y devuelve todo lo consolidado (todas las particiones).
+def consolidar(batches, max_filas: int) -> pd.DataFrame:
+    with tempfile.TemporaryDirectory(prefix="mef_agg_prueba_") as tmp:
+        agregador = AgregadorFact(max_filas=max_filas, dir_spill=tmp)
+        try:
+            for df in batches:
+                agregador.agregar(df)
+            agregador.terminar_lectura()
+            partes = [df for _, df in agregador.particiones()]
+        finally:
+            agregador.cerrar()
+    return pd.concat(partes, ignore_index=True)
+
+def principal():
+    grano = [[1, 2, 3, 5, 6, 7, 8, 9]]
+
+    def mismo_grano_int_float():
+        r = consolidar([hechos(grano, "int64"), hechos(grano, "float64")], max_filas=1_000)
+        assert len(r) == 1, f"el grano salió {len(r)} veces"
+        assert (r[METRICAS_FACT] == 2.0).all(axis=None), f"métricas mal sumadas: {r[METRICAS_FACT].iloc[0].tolist()}"
+        return r
+
+    def mismo_grano_con_volcados():
+        r = consolidar([hechos(grano, "float64"), hechos(grano, "int64"), hechos(grano, "float64")], max_filas=0)
+        assert len(r) == 1, f"el grano salió {len(r)} veces"
+        assert (r[METRICAS_FACT] == 3.0).all(axis=None), f"métricas mal sumadas: {r[METRICAS_FACT].iloc[0].tolist()}"
+        return r
+
+    def muchos_granos():
+        rng = np.random.default_rng(7)
+        claves = rng.integers(1, 50, size=(20_000, len(FKS_FACT)))
+        r = consolidar([hechos(claves[:10_000], "int64"), hechos(claves[10_000:], "float64"),
+                        hechos(claves, "float64")], max_filas=5_000)
+        esperadas = len(np.unique(claves, axis=0))
+        assert len(r) == esperadas, f"{len(r):,} filas consolidadas, se esperaban {esperadas:,}"
+        assert not r.duplicated(FKS_FACT).any(), "hay granos repetidos"
+        assert r["monto_pim"].sum() == 2 * len(claves), "se perdieron o duplicaron montos"
+        return r
+
+    casos = [mismo_grano_int_float, mismo_grano_con_volcados, muchos_granos]
+    fallidos = 0
+    for caso in casos:
+        try:
+            r = caso()
+            print(f"[ok] {caso.__name__} ({len(r):,} fila(s) consolidadas)")
+        except Exception as e:
+            fallidos += 1
+            print(f"[error] {caso.__name__}: {type(e).__name__}: {e}")
+    print(f"[resumen] {len(casos) - fallidos}/{len(casos)} casos ok")
+    sys.exit(1 if fallidos else 0)
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de descarga_http.py contra servidor_prueba.py (HTTP local, sin red).
+
+Baja un archivo aleatorio de unos MB (rangos de 1 MB en vez de 32 MB, sin esperas entre reintentos) y revisa:
+cortes a mitad de respuesta con Content-MD5, servidor sin rangos, reanudación de un .part que quedó de una corrida
+cortada, .part de otro tamaño o archivo que creció en el servidor (se empieza de cero), archivo que cambia a mitad de
+descarga (If-Range -> 200) y checksum que no coincide. Imprime [ok]/[error] por caso; sale con 1 si alguno falla.
+
+Uso:
+  python etl/probar_descarga.py
+  python etl/probar_descarga.py --mb 32 --conexiones 8
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import descarga_http
+from descarga_http import DescargaHttp, ErrorDescarga, ArchivoCambiado
+from servidor_prueba import iniciar
+
+# Deja un .part a medias: cada respuesta se corta tras `cortar` bytes y cada rango tiene un solo intento.
+def corrida_cortada(servidor, url: str, destino: Path, cortar: int, conexiones: int):
+    intentos, servidor.cortar_tras = descarga_http.INTENTOS, cortar
+    descarga_http.INTENTOS = 1
+    try:
+        DescargaHttp(url, destino, conexiones).ejecutar()
+        raise AssertionError("la corrida cortada terminó")
+    except ArchivoCambiado:
+        raise
+    except (descarga_http.requests.RequestException, ErrorDescarga):
+        pass
+    finally:
+        descarga_http.INTENTOS, servidor.cortar_tras = intentos, None
+    assert destino.with_name(destino.name + ".part.json").exists(), "no quedó el .part.json"
+
+def principal():
+    parser = argparse.ArgumentParser(description="Prueba descarga_http.py contra un servidor HTTP local.")
+    parser.add_argument("--mb", type=int, default=6, help="Tamaño del archivo servido (default 6 MB)")
+    parser.add_argument("--conexiones", type=int, default=4, help="Rangos en paralelo (default 4)")
+    args = parser.parse_args()
+
+    descarga_http.BYTES_MIN_RANGO = 1 << 20
+    descarga_http.BYTES_LECTURA = 64 << 10
+    descarga_http.ESPERA_REINTENTO = 0
+    tmp = Path(tempfile.mkdtemp(prefix="mef_descarga_"))
+    carpeta, salida = tmp / "srv", tmp / "raw"
+    carpeta.mkdir()
+    salida.mkdir()
+    origen = carpeta / "2024-Gasto-Mensual.csv"
+    origen.write_bytes(os.urandom(args.mb << 20))
+    servidor, base = iniciar(carpeta)
+    url, destino = f"{base}/files/{origen.name}", salida / origen.name
+    parcial = destino.with_name(destino.name + ".part")
+
+    def limpiar():
+        for r in salida.iterdir():
+            r.unlink()
+        servidor.md5, servidor.rangos, servidor.fallas, servidor.al_cortar = None, True, 0, None
+
+    # cada caso devuelve el resumen de la última ejecutar() o lanza AssertionError
+    def cortes_md5():
+        servidor.md5, servidor.fallas = "ok", 3
+        r = DescargaHttp(url, destino, args.conexiones).ejecutar()
+        assert r["rangos"] > 1, f"se esperaban varios rangos: {r}"
+        return r
+
+    def sin_rangos_md5():
+        servidor.md5, servidor.rangos, servidor.fallas = "ok", False, 1
+        r = DescargaHttp(url, destino, args.conexiones).ejecutar()
+        assert r["rangos"] == 1 and r["bytes_releidos"] == 0, f"sin rangos el hash va en línea: {r}"
+        return r
+
+    def reanudacion():
+        servidor.md5 = "ok"
+        corrida_cortada(servidor, url, destino, 300 << 10, args.conexiones)
+        r = DescargaHttp(url, destino, args.conexiones).ejecutar()
+        assert r["bytes_reanudados"] > 0, f"no reanudó: {r}"
+        assert r["bytes_reanudados"] + r["bytes_bajados"] == r["bytes"], f"bytes de más o de menos: {r}"
+        return r
+
+    def part_de_otro_tamano():
+        corrida_cortada(servidor, url, destino, 300 << 10, args.conexiones)
+        with open(parcial, "r+b") as fh:
+            fh.truncate(parcial.stat().st_size // 2)
+        r = DescargaHttp(url, destino, args.conexiones).ejecutar()
+        assert r["bytes_reanudados"] == 0 and r["bytes_bajados"] == r["bytes"], f"debía empezar de cero: {r}"
+        return r
+
+    def archivo_crecio():
+        corrida_cortada(servidor, url, destino, 300 << 10, args.conexiones)
+        with open(origen, "ab") as fh:
+            fh.write(os.urandom(1 << 20))
+        r = DescargaHttp(url, destino, args.conexiones).ejecutar()
+        assert r["bytes_reanudados"] == 0 and r["bytes"] == origen.stat().st_size, f"debía empezar de cero: {r}"
+        return r
+
+    def cambia_a_mitad():
+        def reescribir(ruta):
+            servidor.al_cortar = None
+            ruta.write_bytes(os.urandom(ruta.stat().st_size))  # mismo tamaño, otro ETag
+        servidor.fallas, servidor.al_cortar = 1, reescribir
+        try:
+            DescargaHttp(url, destino, args.conexiones).ejecutar()
+            raise AssertionError("no detectó el cambio (If-Range)")
+        except ArchivoCambiado:
+            pass
+        assert not parcial.exists(), "quedó el .part de un archivo que cambió"
+        return DescargaHttp(url, destino, args.conexiones).ejecutar()
+
+    def md5_malo():
+        servidor.md5 = "malo"
+        try:
+            DescargaHttp(url, destino, args.conexiones).ejecutar()
+            raise AssertionError("aceptó un md5 que no coincide")
+        except ArchivoCambiado:
+            raise
+        except ErrorDescarga:
+            pass
+        assert not parcial.exists() and not destino.exists(), "quedó un archivo que no verifica"
+        return None
+
+    casos = [cortes_md5, sin_rangos_md5, reanudacion, part_de_otro_tamano, archivo_crecio, cambia_a_mitad, md5_malo]
+    fallidos = 0
+    try:
+        for caso in casos:
+            limpiar()
+            try:
+                r = caso()
+                if r is not None:
+                    assert destino.read_bytes() == origen.read_bytes(), "el archivo bajado no es igual al servido"
+                detalle = "" if r is None else (f" ({r['rangos']} rango(s), bajados {r['bytes_bajados']:,}, "
+                                                f"reanudados {r['bytes_reanudados']:,}, releídos {r['bytes_releidos']:,})")
+                print(f"[ok] {caso.__name__}{detalle}")
+            except Exception as e:
+                fallidos += 1
+                print(f"[error] {caso.__name__}: {type(e).__name__}: {e}")
+    finally:
+        servidor.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"[resumen] {len(casos) - fallidos}/{len(casos)} casos ok")
+    sys.exit(1 if fallidos else 0)
+
+if __name__ == "__main__":
+    principal()
@@ -1,302 +1,319 @@
-# -*- coding: utf-8 -*-
-# Descarga CSV del MEF vía Selenium, con verificación de tamaño y manejo de .crdownload.
-# Descargar todo: python .\etl\selenium_download.py
-# Descargar años nuevos : python .\etl\selenium_download.py nuevos
-
-import re
-import sys
-import time
-import argparse
-from pathlib import Path
-from typing import List, Tuple, Optional
-
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-
-URL_DATASET = "https://datosabiertos.mef.gob.pe/dataset/presupuesto-y-ejecucion-de-gasto"
-
-# Carpetas fijas 
-BASE_DIR = Path(__file__).resolve().parents[1]
-RUTA_CHROMEDRIVER = r"Ruta del driver de Chrome"
-CARPETA_RAW = BASE_DIR / "data" / "raw"
-CARPETA_RAW.mkdir(parents=True, exist_ok=True)
-
-# Patrones aceptados
-ANIOS_ANTIGUOS = {str(y) for y in range(2017, 2024)}   # 2017..2023
-ANIOS_NUEVOS   = {"2024", "2025"}                       # 2024..2025
-
-# Tiempos
-TIEMPO_MAX_PAGINA   = 240
-TIEMPO_MAX_ARCHIVO  = 60 * 60       # 60 min
-VENTANA_ESTABLE     = 12
-PAUSA_ENTRE_ARCH    = 3
-INTENTOS_POR_ARCH   = 3
-
-# ---------- CLI / Filtros ----------
-
-def parsear_cli() -> tuple[Optional[int], Optional[int], str]:
-    """
-    Acepta formas flexibles:
-      - python etl/selenium_download.py
-      - python etl/selenium_download.py 2018
-      - python etl/selenium_download.py 2018 2020
-      - python etl/selenium_download.py nuevos
-      - python etl/selenium_download.py 2018 nuevos
-      - python etl/selenium_download.py 2024 2025 nuevos
-    """
-    parser = argparse.ArgumentParser(
-        description="Descarga CSV del MEF. Filtra por año y modo (nuevos/antiguos/todos)."
-    )
-    parser.add_argument("pos1", nargs="?", help="Año mínimo (YYYY) o modo (nuevos/antiguos/todos)")
-    parser.add_argument("pos2", nargs="?", help="Año máximo (YYYY) o modo (nuevos/antiguos/todos)")
-    parser.add_argument("--hasta", type=int, default=None, help="Año máximo (YYYY)")
-    args = parser.parse_args()
-
-    anio_desde: Optional[int] = None
-    anio_hasta: Optional[int] = args.hasta
-    modo = "todos"
-
-    # Interpretación flexible de pos1 / pos2
-    for tok in (args.pos1, args.pos2):
-        if tok is None:
-            continue
-        low = tok.lower()
-        if low in {"nuevos", "antiguos", "todos"}:
-            modo = low
-        elif tok.isdigit() and len(tok) == 4:
-            val = int(tok)
-            if anio_desde is None:
-                anio_desde = val
-            elif anio_hasta is None:
-                anio_hasta = val
-
-    # Normalizar (si solo dan desde y no hasta)
-    if anio_hasta is not None and anio_desde is not None and anio_hasta < anio_desde:
-        anio_desde, anio_hasta = anio_hasta, anio_desde
-
-    return anio_desde, anio_hasta, modo
-
-
-def extraer_anio(nombre: str) -> Optional[int]:
-    m = re.search(r"(20\d{2})", nombre)
-    return int(m.group(1)) if m else None
-
-
-def tipo_dataset(nombre: str) -> str:
-    n = nombre.lower()
-    if n.endswith("-gasto-mensual.csv"):
-        return "nuevos"
-    if n.endswith("-gasto.csv"):
-        return "antiguos"
-    return "otro"
-
-
-def filtrar_enlaces(enlaces: List[Tuple[str, str]],
-                    anio_desde: Optional[int],
-                    anio_hasta: Optional[int],
-                    modo: str) -> List[Tuple[str, str]]:
-    filtrados: List[Tuple[str, str]] = []
-    for nombre, url in enlaces:
-        anio = extraer_anio(nombre)
-        if anio is None:
-            continue
-        if anio_desde is not None and anio < anio_desde:
-            continue
-        if anio_hasta is not None and anio > anio_hasta:
-            continue
-        if modo in {"nuevos", "antiguos"} and tipo_dataset(nombre) != modo:
-            continue
-        filtrados.append((nombre, url))
-    # Orden por año y luego nombre
-    filtrados.sort(key=lambda x: (extraer_anio(x[0]) or 9999, x[0].lower()))
-    return filtrados
-
-# --- utilidades ---
-
-def nombre_seguro(nombre: str) -> str:
-    return re.sub(r"[^\w\-.]", "_", nombre)
-
-def aceptar_nombre(nombre: str) -> bool:
-    n = nombre.lower().strip()
-    if not n.endswith(".csv"):
-        return False
-    if "diario" in n:
-        return False
-    m_ant = re.match(r"^(20\d{2})-gasto\.csv$", n)
-    if m_ant and m_ant.group(1) in ANIOS_ANTIGUOS:
-        return True
-    m_nue = re.match(r"^(20\d{2})-gasto-mensual\.csv$", n)
-    if m_nue and m_nue.group(1) in ANIOS_NUEVOS:
-        return True
-    return False
-
-def tam_esperado(url: str) -> Optional[int]:
-    try:
-        r = requests.head(url, allow_redirects=True, timeout=60)
-        r.raise_for_status()
-        cl = r.headers.get("Content-Length")
-        return int(cl) if cl and cl.isdigit() else None
-    except Exception:
-        return None
-
-def configurar_driver() -> webdriver.Chrome:
-    prefs = {
-        "download.default_directory": str(CARPETA_RAW),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True,
-        "safebrowsing.disable_download_protection": True,
-    }
-    opciones = webdriver.ChromeOptions()
-    opciones.add_experimental_option("prefs", prefs)
-    opciones.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
-    opciones.add_argument("--log-level=3")
-    opciones.add_argument("--disable-notifications")
-    opciones.add_argument("--start-maximized")
-
-    servicio = ChromeService(RUTA_CHROMEDRIVER)
-    driver = webdriver.Chrome(service=servicio, options=opciones)
-    driver.set_page_load_timeout(TIEMPO_MAX_PAGINA)
-    return driver
-
-def recolectar_enlaces_csv(driver: webdriver.Chrome) -> List[Tuple[str, str]]:
-    driver.get(URL_DATASET)
-    time.sleep(5)
-    anchors = driver.find_elements(By.CSS_SELECTOR, "a[href]")
-    out: List[Tuple[str, str]] = []
-    for a in anchors:
-        href = a.get_attribute("href") or ""
-        txt  = (a.text or "").strip()
-        if not href:
-            continue
-        nombre = txt if txt.lower().endswith(".csv") else href.split("/")[-1]
-        if nombre.lower().endswith(".csv") and aceptar_nombre(nombre):
-            out.append((nombre, href))
-    # dedup
-    seen, final = set(), []
-    for nombre, url in out:
-        key = (nombre.lower(), url)
-        if key not in seen:
-            seen.add(key); final.append((nombre, url))
-    final.sort(key=lambda x: (int(re.search(r"(20\d{2})", x[0]).group(1)) if re.search(r"(20\d{2})", x[0]) else 9999, x[0].lower()))
-    return final
-
-def listar_archivos(dirp: Path) -> dict[str, tuple[int, float]]:
-    snap = {}
-    for p in dirp.iterdir():
-        if p.is_file():
-            try:
-                st = p.stat()
-                snap[p.name] = (st.st_size, st.st_mtime)
-            except Exception:
-                pass
-    return snap
-
-def hay_descargas_en_progreso(dirp: Path) -> bool:
-    return any(p.suffix == ".crdownload" for p in dirp.iterdir() if p.is_file())
-
-def archivo_reciente(antes: dict, despues: dict) -> Optional[Path]:
-    nuevos = [n for n in despues.keys() if n not in antes]
-    if nuevos:
-        newest = max(nuevos, key=lambda n: despues[n][1])
-        return CARPETA_RAW / newest
-    if despues:
-        newest = max(despues.keys(), key=lambda n: despues[n][1])
-        return CARPETA_RAW / newest
-    return None
-
-def esperar_estable_o_fin(ruta_obj: Path, tiempo_max: int) -> bool:
-    inicio = time.time()
-    ult_tam = -1
-    ult_cambio = time.time()
-    while time.time() - inicio <= tiempo_max:
-        if hay_descargas_en_progreso(CARPETA_RAW):
-            time.sleep(1); continue
-        if ruta_obj.exists():
-            try:
-                tam = ruta_obj.stat().st_size
-            except Exception:
-                tam = -1
-            if tam != ult_tam:
-                ult_tam = tam
-                ult_cambio = time.time()
-            else:
-                if time.time() - ult_cambio >= VENTANA_ESTABLE:
-                    return True
-        time.sleep(1)
-    return False
-
-def descargar_uno(driver: webdriver.Chrome, nombre: str, url: str) -> Path:
-    print(f"[descargando] {nombre}")
-    esperado = tam_esperado(url)
-    if esperado:
-        print(f"  - tamaño esperado: {esperado/1e9:.2f} GB")
-    else:
-        print("  - tamaño esperado: desconocido")
-
-    antes = listar_archivos(CARPETA_RAW)
-    driver.get(url)
-
-    inicio = time.time()
-    while time.time() - inicio <= TIEMPO_MAX_ARCHIVO:
-        despues = listar_archivos(CARPETA_RAW)
-        cand = archivo_reciente(antes, despues)
-        if cand and esperar_estable_o_fin(cand, tiempo_max=60):
-            print(f"  - tamaño final: {cand.stat().st_size/1e9:.2f} GB")
-            return cand
-        time.sleep(1)
-    raise TimeoutError("Timeout esperando descarga")
-
-def main():
-    # --- Filtros desde CLI ---
-    anio_desde, anio_hasta, modo = parsear_cli()
-
-    driver = configurar_driver()
-    try:
-        enlaces = recolectar_enlaces_csv(driver)
-        enlaces = filtrar_enlaces(enlaces, anio_desde, anio_hasta, modo)
-
-        if not enlaces:
-            print("[error] No encontré CSV válidos con los filtros dados"); return
-
-        print(f"[info] {len(enlaces)} archivos candidatos (modo={modo}, desde={anio_desde}, hasta={anio_hasta})")
-        for nombre, url in enlaces:
-            destino = CARPETA_RAW / nombre_seguro(nombre)
-            if destino.exists():
-                print(f"[skip] {destino.name} ya existe"); continue
-
-            ok = False
-            for intento in range(1, INTENTOS_POR_ARCH + 1):
-                try:
-                    tmp = descargar_uno(driver, nombre, url)
-                    if tmp.name != destino.name and not destino.exists():
-                        tmp.rename(destino)
-                        print(f"[renombrado] {tmp.name} -> {destino.name}")
-                    # validar tamaño
-                    esperado = tam_esperado(url)
-                    if esperado and destino.exists():
-                        real = destino.stat().st_size
-                        if abs(real - esperado) > max(esperado * 0.005, 10_000_000):
-                            print(f"[warn] Tamaño no coincide (real {real/1e9:.2f} GB vs esp {esperado/1e9:.2f} GB). Reintento…")
-                            destino.unlink(missing_ok=True)
-                            time.sleep(3)
-                            continue
-                    ok = True
-                    break
-                except Exception as e:
-                    print(f"[warn] intento {intento} falló: {e}")
-                    time.sleep(5)
-
-            if not ok:
-                print(f"[error] no pude bajar {nombre} tras {INTENTOS_POR_ARCH} intentos")
-            time.sleep(PAUSA_ENTRE_ARCH)
-
-        print("[ok] Descargas completas.")
-    finally:
-        print("[info] Dejando Chrome abierto (no se cerrará automáticamente).")
-
-if __name__ == "__main__":
-    main()
-
+# -*- coding: utf-8 -*-
+# Descarga CSV del MEF por HTTP (descarga_http.py): rangos de bytes en paralelo, reanudación tras un corte y
+# verificación de tamaño/checksum mientras baja; varios años a la vez bajo un tope de ancho de banda. Los enlaces se
+# leen del HTML del dataset; Selenium (Chrome) solo se usa si la página no los trae sin JavaScript.
+# Cada CSV se guarda comprimido en data/raw/ (.csv.zst por defecto; un .zip del portal se deja tal cual) y
+# transformar_mensual.py lo lee descomprimiendo al vuelo, así el RAW se puede conservar.
+# Descargar todo: python .\etl\selenium_download.py
+# Descargar años nuevos : python .\etl\selenium_download.py nuevos
+# Con métricas (JSON lines): python .\etl\selenium_download.py nuevos --metrics logs\metricas.jsonl
+# Sin comprimir / con gzip: python .\etl\selenium_download.py --compress none | --compress gzip
+# 3 años a la vez, 4 conexiones por archivo, 20 MB/s en total: python .\etl\selenium_download.py --parallel 3 --connections 4 --max-bandwidth 20M
+# Contra otro servidor (p. ej. uno local de prueba): python .\etl\selenium_download.py --dataset-url http://localhost:8000/dataset
+
+import os
+import re
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Tuple, Optional
+from urllib.parse import urljoin, urlsplit, unquote
+
+import requests
+
+from compresion import comprimir, nombre_csv, variantes_crudo, FORMATOS
+from descarga_http import DescargaHttp, LimitadorBanda, ErrorDescarga, TIEMPO_ESPERA
+from metricas import METRICAS, parsear_tamano
+
+URL_DATASET = "https://datosabiertos.mef.gob.pe/dataset/presupuesto-y-ejecucion-de-gasto"
+
+# Carpetas fijas (ETL_DATA_DIR reemplaza la carpeta data/, como en transformar_mensual.py)
+BASE_DIR = Path(__file__).resolve().parents[1]
+RUTA_CHROMEDRIVER = r"Ruta del driver de Chrome"
+CARPETA_RAW = Path(os.getenv("ETL_DATA_DIR") or BASE_DIR / "data") / "raw"
+CARPETA_RAW.mkdir(parents=True, exist_ok=True)
+
+# Patrones aceptados
+ANIOS_ANTIGUOS = {str(y) for y in range(2017, 2024)}   # 2017..2023
+ANIOS_NUEVOS   = {"2024", "2025"}                       # 2024..2025
+
+# Tiempos y concurrencia
+TIEMPO_MAX_PAGINA   = 240
+INTENTOS_POR_ARCH   = 3             # cada intento sigue desde lo ya bajado
+CONEXIONES_POR_ARCH = 4
+ARCHIVOS_EN_PARALELO = 2
+
+# ---------- CLI / Filtros ----------
+
+def parsear_cli() -> tuple[Optional[int], Optional[int], str, argparse.Namespace]:
+    """
+    Acepta formas flexibles:
+      - python etl/selenium_download.py
+      - python etl/selenium_download.py 2018
+      - python etl/selenium_download.py 2018 2020
+      - python etl/selenium_download.py nuevos
+      - python etl/selenium_download.py 2018 nuevos
+      - python etl/selenium_download.py 2024 2025 nuevos
+    """
+    parser = argparse.ArgumentParser(
+        description="Descarga CSV del MEF. Filtra por año y modo (nuevos/antiguos/todos)."
+    )
+    parser.add_argument("pos1", nargs="?", help="Año mínimo (YYYY) o modo (nuevos/antiguos/todos)")
+    parser.add_argument("pos2", nargs="?", help="Año máximo (YYYY) o modo (nuevos/antiguos/todos)")
+    parser.add_argument("--hasta", type=int, default=None, help="Año máximo (YYYY)")
+    parser.add_argument("--metrics", default=None, metavar="ARCHIVO",
+                        help="Agrega métricas por descarga (JSON lines) a ARCHIVO")
+    parser.add_argument("--compress", choices=FORMATOS, default="zstd",
+                        help="Cómo guardar cada CSV descargado: zstd (por defecto), gzip o none (CSV plano). "
+                             "Un .zip del portal se guarda tal cual.")
+    parser.add_argument("--parallel", type=int, default=ARCHIVOS_EN_PARALELO, metavar="N",
+                        help=f"Archivos que bajan a la vez (por defecto {ARCHIVOS_EN_PARALELO}).")
+    parser.add_argument("--connections", type=int, default=CONEXIONES_POR_ARCH, metavar="N",
+                        help=f"Rangos de bytes en paralelo por archivo (por defecto {CONEXIONES_POR_ARCH}); "
+                             "los archivos chicos usan menos.")
+    parser.add_argument("--max-bandwidth", type=parsear_tamano, default=None, metavar="TAMAÑO",
+                        help="Tope de bytes por segundo entre todas las descargas (ej. 20M; sin unidad = MB). "
+                             "Por defecto sin tope.")
+    parser.add_argument("--dataset-url", default=URL_DATASET, metavar="URL",
+                        help="Página del dataset de donde se leen los enlaces (por defecto la del MEF).")
+    args = parser.parse_args()
+    METRICAS.configurar(args.metrics, script="selenium_download")
+
+    anio_desde: Optional[int] = None
+    anio_hasta: Optional[int] = args.hasta
+    modo = "todos"
+
+    # Interpretación flexible de pos1 / pos2
+    for tok in (args.pos1, args.pos2):
+        if tok is None:
+            continue
+        low = tok.lower()
+        if low in {"nuevos", "antiguos", "todos"}:
+            modo = low
+        elif tok.isdigit() and len(tok) == 4:
+            val = int(tok)
+            if anio_desde is None:
+                anio_desde = val
+            elif anio_hasta is None:
+                anio_hasta = val
+
+    # Normalizar (si solo dan desde y no hasta)
+    if anio_hasta is not None and anio_desde is not None and anio_hasta < anio_desde:
+        anio_desde, anio_hasta = anio_hasta, anio_desde
+
+    return anio_desde, anio_hasta, modo, args
+
+
+def extraer_anio(nombre: str) -> Optional[int]:
+    m = re.search(r"(20\d{2})", nombre)
+    return int(m.group(1)) if m else None
+
+
+def tipo_dataset(nombre: str) -> str:
+    n = (nombre_csv(nombre) or nombre).lower()
+    if n.endswith("-gasto-mensual.csv"):
+        return "nuevos"
+    if n.endswith("-gasto.csv"):
+        return "antiguos"
+    return "otro"
+
+
+def filtrar_enlaces(enlaces: List[Tuple[str, str]],
+                    anio_desde: Optional[int],
+                    anio_hasta: Optional[int],
+                    modo: str) -> List[Tuple[str, str]]:
+    filtrados: List[Tuple[str, str]] = []
+    for nombre, url in enlaces:
+        anio = extraer_anio(nombre)
+        if anio is None:
+            continue
+        if anio_desde is not None and anio < anio_desde:
+            continue
+        if anio_hasta is not None and anio > anio_hasta:
+            continue
+        if modo in {"nuevos", "antiguos"} and tipo_dataset(nombre) != modo:
+            continue
+        filtrados.append((nombre, url))
+    # Orden por año y luego nombre
+    filtrados.sort(key=lambda x: (extraer_anio(x[0]) or 9999, x[0].lower()))
+    return filtrados
+
+# --- utilidades ---
+
+def nombre_seguro(nombre: str) -> str:
+    return re.sub(r"[^\w\-.]", "_", nombre)
+
+def aceptar_nombre(nombre: str) -> bool:
+    n = (nombre_csv(nombre.strip()) or "").lower()  # el CSV, o el que trae un .zip
+    if not n:
+        return False
+    if "diario" in n:
+        return False
+    m_ant = re.match(r"^(20\d{2})-gasto\.csv$", n)
+    if m_ant and m_ant.group(1) in ANIOS_ANTIGUOS:
+        return True
+    m_nue = re.match(r"^(20\d{2})-gasto-mensual\.csv$", n)
+    if m_nue and m_nue.group(1) in ANIOS_NUEVOS:
+        return True
+    return False
+
+# Chrome solo para leer la página del dataset cuando los enlaces se arman con JavaScript; selenium se
+# importa recién acá para que la descarga HTTP no lo necesite.
+def configurar_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    opciones = webdriver.ChromeOptions()
+    opciones.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
+    opciones.add_argument("--log-level=3")
+    opciones.add_argument("--disable-notifications")
+    opciones.add_argument("--start-maximized")
+
+    servicio = ChromeService(RUTA_CHROMEDRIVER)
+    driver = webdriver.Chrome(service=servicio, options=opciones)
+    driver.set_page_load_timeout(TIEMPO_MAX_PAGINA)
+    return driver
+
+# Anclas (href absoluto, texto) de un HTML, sin dependencias externas.
+class ExtractorEnlaces(HTMLParser):
+    def __init__(self, base: str):
+        super().__init__()
+        self.base = base
+        self.anclas: List[Tuple[str, str]] = []
+        self._href: Optional[str] = None
+        self._texto: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._href, self._texto = dict(attrs).get("href"), []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._texto.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href is not None:
+            self.anclas.append((urljoin(self.base, self._href), "".join(self._texto).strip()))
+            self._href = None
+
+def recolectar_enlaces_http(url_dataset: str) -> List[Tuple[str, str]]:
+    r = requests.get(url_dataset, timeout=TIEMPO_ESPERA)
+    r.raise_for_status()
+    extractor = ExtractorEnlaces(r.url)
+    extractor.feed(r.text)
+    return filtrar_anclas(extractor.anclas)
+
+def recolectar_enlaces_csv(driver, url_dataset: str = URL_DATASET) -> List[Tuple[str, str]]:
+    from selenium.webdriver.common.by import By
+
+    driver.get(url_dataset)
+    time.sleep(5)
+    anchors = driver.find_elements(By.CSS_SELECTOR, "a[href]")
+    return filtrar_anclas([(a.get_attribute("href") or "", (a.text or "").strip()) for a in anchors])
+
+# (nombre, url) de los CSV aceptados entre las anclas (href, texto) de la página, sin repetidos y por año.
+def filtrar_anclas(anclas: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    out: List[Tuple[str, str]] = []
+    for href, txt in anclas:
+        if not href:
+            continue
+        nombre = txt if nombre_csv(txt) else unquote(urlsplit(href).path.split("/")[-1])
+        if aceptar_nombre(nombre):
+            out.append((nombre, href))
+    # dedup
+    seen, final = set(), []
+    for nombre, url in out:
+        key = (nombre.lower(), url)
+        if key not in seen:
+            seen.add(key); final.append((nombre, url))
+    final.sort(key=lambda x: (int(re.search(r"(20\d{2})", x[0]).group(1)) if re.search(r"(20\d{2})", x[0]) else 9999, x[0].lower()))
+    return final
+
+# Baja un archivo con DescargaHttp (hasta INTENTOS_POR_ARCH veces, cada una reanudando) y lo comprime.
+# Devuelve un resumen para el [resumen] final; los errores no se propagan.
+def descargar_archivo(nombre: str, url: str, args, limitador: LimitadorBanda) -> dict:
+    destino = CARPETA_RAW / nombre_seguro(nombre)
+    res = {"archivo": destino.name, "guardado": None, "error": None}
+    for intento in range(1, INTENTOS_POR_ARCH + 1):
+        try:
+            print(f"[descargando] {nombre} (intento {intento})", flush=True)
+            with METRICAS.etapa("descarga", archivo=nombre, intento=intento) as m:
+                resumen = DescargaHttp(url, destino, args.connections, limitador).ejecutar()
+                m.update(bytes=resumen["bytes_bajados"], bytes_reanudados=resumen["bytes_reanudados"],
+                         bytes_releidos=resumen["bytes_releidos"], rangos=resumen["rangos"])
+            print(f"  [ok] {destino.name}: {resumen['bytes'] / 1e9:.2f} GB en {resumen['seg']:.1f} s, "
+                  f"{resumen['rangos']} rango(s) ({resumen['bytes_bajados'] / 2**20 / max(resumen['seg'], 1e-3):,.1f} "
+                  f"MB/s)", flush=True)
+            break
+        except (requests.RequestException, ErrorDescarga, OSError) as e:
+            print(f"[warn] {nombre}: intento {intento} falló: {type(e).__name__}: {e}", flush=True)
+            res["error"] = f"{type(e).__name__}: {e}"
+    else:
+        return res
+
+    res["error"] = None
+    guardado = destino
+    if args.compress != "none" and destino.suffix.lower() == ".csv":
+        with METRICAS.etapa("comprimir", archivo=destino.name, formato=args.compress) as m:
+            m["bytes"] = destino.stat().st_size
+            guardado = comprimir(destino, args.compress)
+            m["bytes_comprimido"] = guardado.stat().st_size
+        print(f"  [comprimido] {guardado.name}: {m['bytes'] / 1e9:.2f} GB -> {m['bytes_comprimido'] / 1e9:.2f} GB",
+              flush=True)
+    res["guardado"] = guardado.name
+    return res
+
+def main():
+    # --- Filtros desde CLI ---
+    anio_desde, anio_hasta, modo, args = parsear_cli()
+
+    enlaces = recolectar_enlaces_http(args.dataset_url)
+    if not enlaces:
+        print("[info] La página no trae enlaces a CSV en el HTML; la leo con Chrome.")
+        driver = configurar_driver()
+        try:
+            enlaces = recolectar_enlaces_csv(driver, args.dataset_url)
+        finally:
+            driver.quit()
+    enlaces = filtrar_enlaces(enlaces, anio_desde, anio_hasta, modo)
+
+    if not enlaces:
+        print("[error] No encontré CSV válidos con los filtros dados"); return
+
+    print(f"[info] {len(enlaces)} archivos candidatos (modo={modo}, desde={anio_desde}, hasta={anio_hasta})")
+    pendientes = []
+    for nombre, url in enlaces:
+        destino = CARPETA_RAW / nombre_seguro(nombre)
+        existentes = [CARPETA_RAW / v for v in variantes_crudo(nombre_csv(destino.name))
+                      if (CARPETA_RAW / v).exists()]
+        if existentes:
+            print(f"[skip] {existentes[0].name} ya existe"); continue
+        pendientes.append((nombre, url))
+
+    tope = f"{args.max_bandwidth / 2**20:,.1f} MB/s" if args.max_bandwidth else "sin tope"
+    print(f"[info] {len(pendientes)} a descargar: {args.parallel} a la vez, {args.connections} conexión(es) por "
+          f"archivo, {tope}")
+    limitador = LimitadorBanda(args.max_bandwidth)
+    resultados = []
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        futuros = [pool.submit(descargar_archivo, nombre, url, args, limitador) for nombre, url in pendientes]
+        for futuro in as_completed(futuros):
+            resultados.append(futuro.result())
+
+    errores = [r for r in resultados if r["error"]]
+    for r in errores:
+        parcial = CARPETA_RAW / (r["archivo"] + ".part")
+        sigue = f"; lo bajado queda en {parcial.name} para la próxima corrida" if parcial.exists() else ""
+        print(f"[error] no pude bajar {r['archivo']} tras {INTENTOS_POR_ARCH} intentos ({r['error']}){sigue}")
+    if not errores:
+        print("[ok] Descargas completas.")
+    METRICAS.resumen()
+    if errores:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Servidor HTTP local que hace de portal del MEF para probar descarga_http.py y selenium_download.py sin red.
+# Sirve los archivos de una carpeta en /files/<nombre> con Range, If-Range y ETag (tamaño + mtime, como un servidor
+# estático), y en /dataset una página con los enlaces (lo que lee selenium_download.py --dataset-url). Opciones para
+# reproducir fallas: cortar la conexión a mitad de una respuesta, no aceptar rangos, publicar Content-MD5 (correcto o
+# no) y cortar todas las respuestas después de N bytes (una corrida que no termina y deja el .part).
+# Uso:
+#   python .\etl\servidor_prueba.py C:\tmp\srv --puerto 8765 --md5 --fallas 3
+#   python .\etl\selenium_download.py 2021 --dataset-url http://127.0.0.1:8765/dataset
+# Desde Python (ver probar_descarga.py): servidor, url = iniciar(carpeta); ...; servidor.shutdown()
+
+import sys
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+BYTES_ENVIO = 256 << 10
+
+# Estado compartido por los pedidos; las opciones se pueden cambiar entre descargas.
+class ServidorPrueba(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, carpeta: Path, puerto: int = 0, md5: str | None = None, rangos: bool = True,
+                 fallas: int = 0, cortar_tras: int | None = None):
+        super().__init__(("127.0.0.1", puerto), ManejadorPrueba)
+        self.carpeta = carpeta
+        self.md5 = md5                  # None | "ok" | "malo"
+        self.rangos = rangos
+        self.fallas = fallas            # respuestas de más de 1 MB que se cortan a la mitad
+        self.cortar_tras = cortar_tras  # toda respuesta se corta después de estos bytes
+        self.al_cortar = None           # fn(ruta) tras cada corte, p. ej. para cambiar el archivo a mitad de descarga
+        self.pedidos: list = []         # (archivo, Range, If-Range coincide)
+        self.lock = threading.Lock()
+
+    # El cliente que deja de leer (p. ej. al descartar un 200 inesperado) no es un error del servidor.
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class ManejadorPrueba(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, estado: int, cabeceras: dict, cuerpo: bytes = b""):
+        self.send_response(estado)
+        for clave, valor in cabeceras.items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == "/dataset":
+            enlaces = "".join(f"<div><a href='/files/{r.name}'>{r.name}</a></div>"
+                              for r in sorted(srv.carpeta.iterdir()) if r.is_file())
+            cuerpo = f"<html><body><a href='/'>Inicio</a>{enlaces}</body></html>".encode("utf-8")
+            self._enviar(200, {"Content-Type": "text/html; charset=utf-8", "Content-Length": str(len(cuerpo))}, cuerpo)
+            return
+        ruta = srv.carpeta / self.path.rsplit("/", 1)[-1]
+        if not self.path.startswith("/files/") or not ruta.is_file():
+            self._enviar(404, {"Content-Length": "0"})
+            return
+
+        st = ruta.stat()
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        pedido, if_range = self.headers.get("Range"), self.headers.get("If-Range")
+        inicio, fin, parcial = 0, st.st_size - 1, False
+        # If-Range distinto (el archivo cambió): se responde el archivo entero con 200
+        if pedido and srv.rangos and if_range in (None, etag):
+            a, _, b = pedido.removeprefix("bytes=").partition("-")
+            inicio, fin, parcial = int(a), min(int(b), st.st_size - 1) if b else st.st_size - 1, True
+        with srv.lock:
+            srv.pedidos.append((ruta.name, pedido, if_range in (None, etag)))
+
+        cabeceras = {"Content-Length": str(fin - inicio + 1), "ETag": etag}
+        if srv.rangos:
+            cabeceras["Accept-Ranges"] = "bytes"
+        if parcial:
+            cabeceras["Content-Range"] = f"bytes {inicio}-{fin}/{st.st_size}"
+        if srv.md5:
+            h = hashlib.md5()
+            with open(ruta, "rb") as fh:
+                while datos := fh.read(8 << 20):
+                    h.update(datos)
+            digest = h.digest() if srv.md5 == "ok" else hashlib.md5(b"otro archivo").digest()
+            cabeceras["Content-MD5"] = base64.b64encode(digest).decode()
+        self._enviar(206 if parcial else 200, cabeceras)
+
+        n = fin - inicio + 1
+        cortar = srv.cortar_tras
+        with srv.lock:
+            if srv.fallas > 0 and n > (1 << 20):
+                srv.fallas -= 1
+                cortar = n // 2 if cortar is None else min(cortar, n // 2)
+        with open(ruta, "rb") as fh:
+            fh.seek(inicio)
+            enviados = 0
+            while enviados < n:
+                trozo = fh.read(min(BYTES_ENVIO, n - enviados))
+                if cortar is not None and enviados + len(trozo) > cortar:
+                    self.wfile.write(trozo[:cortar - enviados])
+                    self.wfile.flush()
+                    if srv.al_cortar is not None:
+                        srv.al_cortar(ruta)  # antes del corte: el reintento ya ve el cambio
+                    self.close_connection = True
+                    self.connection.shutdown(2)  # corte a mitad de la respuesta, como una red que se cae
+                    return
+                self.wfile.write(trozo)
+                enviados += len(trozo)
+
+# Levanta el servidor en un hilo de fondo; devuelve (servidor, url base).
+def iniciar(carpeta: Path, **opciones) -> tuple:
+    servidor = ServidorPrueba(Path(carpeta), **opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, servidor.url
+
+def principal():
+    parser = argparse.ArgumentParser(description="Servidor HTTP local con Range/If-Range para probar las descargas.")
+    parser.add_argument("carpeta", type=Path, help="Carpeta con los archivos a servir")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--md5", choices=["ok", "malo"], nargs="?", const="ok", default=None,
+                        help="Publicar Content-MD5 (malo: uno que no coincide)")
+    parser.add_argument("--sin-rangos", action="store_true", help="Ignorar Range y responder siempre 200")
+    parser.add_argument("--fallas", type=int, default=0, help="Respuestas que se cortan a la mitad")
+    parser.add_argument("--cortar-tras", type=int, default=None, help="Cortar toda respuesta tras N bytes")
+    args = parser.parse_args()
+
+    servidor = ServidorPrueba(args.carpeta, args.puerto, args.md5, not args.sin_rangos, args.fallas, args.cortar_tras)
+    print(f"[info] sirviendo {args.carpeta} en {servidor.url}/dataset")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    principal()
@@ -1,248 +1,1017 @@
-# -*- coding: utf-8 -*-
-# TRANSFORMACIÓN (T de ETL): normaliza CSV del MEF (gasto mensual) y exporta Parquet.
-# - Salta archivos ya procesados.
-# Uso:
-#   python .\etl\transformar_mensual.py                  # procesa todos
-#   python .\etl\transformar_mensual.py 2020 2021        # procesa años específicos
-#   python .\etl\transformar_mensual.py --overwrite      # rehace todos
-#   python .\etl\transformar_mensual.py 2020 --overwrite # rehace solo 2020
-
-import re
-import sys
-import argparse
-from pathlib import Path
-import pandas as pd
-import traceback
-
-# --- Paths ---
-BASE_DIR = Path(__file__).resolve().parents[1]
-RAW_DIR  = BASE_DIR / "data" / "raw"
-OUT_DIR  = BASE_DIR / "data" / "processed"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
-
-print(f"[info] RAW_DIR: {RAW_DIR.resolve()}")
-print(f"[info] OUT_DIR: {OUT_DIR.resolve()}")
-
-# --- Patrones de archivo ---
-PATRON_OLD = re.compile(r"^(20\d{2})-Gasto\.csv$", re.IGNORECASE)         # 2017..2023
-PATRON_NEW = re.compile(r"^(20\d{2})-Gasto-Mensual\.csv$", re.IGNORECASE) # 2024..2025
-IGNORAR    = re.compile(r"Diario", re.IGNORECASE)
-
-# --- Columnas de interés ---
-COLS_CLAVE = [
-    # tiempo
-    "ANO_EJE","MES_EJE",
-    # nivel de gobierno
-    "NIVEL_GOBIERNO","NIVEL_GOBIERNO_NOMBRE",
-    # ejecutora
-    "SEC_EJEC","EJECUTORA","EJECUTORA_NOMBRE",
-    "SECTOR","SECTOR_NOMBRE","PLIEGO","PLIEGO_NOMBRE",
-    "DEPARTAMENTO_EJECUTORA","DEPARTAMENTO_EJECUTORA_NOMBRE",
-    "PROVINCIA_EJECUTORA","PROVINCIA_EJECUTORA_NOMBRE",
-    "DISTRITO_EJECUTORA","DISTRITO_EJECUTORA_NOMBRE",
-    # programática
-    "PROGRAMA_PPTO","PROGRAMA_PPTO_NOMBRE",
-    "TIPO_ACT_PROY","TIPO_ACT_PROY_NOMBRE",
-    "PRODUCTO_PROYECTO","PRODUCTO_PROYECTO_NOMBRE",
-    "ACTIVIDAD_ACCION_OBRA","ACTIVIDAD_ACCION_OBRA_NOMBRE",
-    "SEC_FUNC",
-    # funcional
-    "FUNCION","FUNCION_NOMBRE",
-    "DIVISION_FUNCIONAL","DIVISION_FUNCIONAL_NOMBRE",
-    "GRUPO_FUNCIONAL","GRUPO_FUNCIONAL_NOMBRE",
-    # meta
-    "META","FINALIDAD","META_NOMBRE","DEPARTAMENTO_META","DEPARTAMENTO_META_NOMBRE","FINALIDAD_NOMBRE",
-    # financiera
-    "FUENTE_FINANCIAMIENTO","FUENTE_FINANCIAMIENTO_NOMBRE",
-    "RUBRO","RUBRO_NOMBRE","TIPO_RECURSO","TIPO_RECURSO_NOMBRE",
-    "CATEGORIA_GASTO","CATEGORIA_GASTO_NOMBRE",
-    # clasificador gasto
-    "TIPO_TRANSACCION",
-    "GENERICA","GENERICA_NOMBRE",
-    "SUBGENERICA","SUBGENERICA_NOMBRE",
-    "SUBGENERICA_DET","SUBGENERICA_DET_NOMBRE",
-    "ESPECIFICA","ESPECIFICA_NOMBRE",
-    "ESPECIFICA_DET","ESPECIFICA_DET_NOMBRE",
-    # métricas
-    "MONTO_PIA","MONTO_PIM","MONTO_CERTIFICADO","MONTO_COMPROMETIDO_ANUAL",
-    "MONTO_COMPROMETIDO","MONTO_DEVENGADO","MONTO_GIRADO"
-]
-
-COLS_NUM = [
-    "ANO_EJE","MES_EJE","SEC_FUNC","TIPO_TRANSACCION",
-    "MONTO_PIA","MONTO_PIM","MONTO_CERTIFICADO","MONTO_COMPROMETIDO_ANUAL",
-    "MONTO_COMPROMETIDO","MONTO_DEVENGADO","MONTO_GIRADO"
-]
-
-# --- Helpers ---
-
-# Función: normalizar_columna
-# Qué hace: Recibe el nombre de una columna, elimina espacios y la convierte a MAYÚSCULAS para uniformizar el esquema.
-def normalizar_columna(c: str) -> str:
-    return (c or "").strip().upper()
-
-# Función: a_numero
-# Qué hace: Convierte una Serie a numérica (float) de forma segura; valores no convertibles pasan a NaN.
-def a_numero(s: pd.Series) -> pd.Series:
-    return pd.to_numeric(s, errors="coerce")
-
-# Función: limpiar_texto
-# Qué hace: Limpia texto en una Serie: rellena NaN con "", convierte a str, recorta espacios y colapsa espacios múltiples.
-def limpiar_texto(s: pd.Series) -> pd.Series:
-    s = s.fillna("").astype(str)
-    s = s.str.strip().str.replace(r"\s+", " ", regex=True)
-    return s
-
-# Función: construir_fecha
-# Qué hace: Construye una fecha (YYYY-MM-01) a partir de las columnas ANO_EJE y MES_EJE; devuelve Serie de tipo datetime.
-def construir_fecha(anio_s: pd.Series, mes_s: pd.Series) -> pd.Series:
-    anio = a_numero(anio_s).astype("Int64")
-    mes  = a_numero(mes_s).astype("Int64")
-    vals = [
-        f"{int(a)}-{int(m):02d}-01" if pd.notna(a) and pd.notna(m) else None
-        for a, m in zip(anio, mes)
-    ]
-    return pd.to_datetime(pd.Series(vals), format="%Y-%m-%d", errors="coerce")
-
-# Función: transformar_archivo
-# Qué hace: Lee un CSV mensual (por bloques), selecciona/normaliza columnas, tipa numéricas, crea FECHA y exporta Parquet por año.
-#           Al finalizar correctamente, elimina el CSV original para ahorrar espacio.
-def transformar_archivo(ruta_csv: Path, overwrite: bool = False, tamano_bloque: int = 300_000) -> Path | None:
-    nombre = ruta_csv.name
-    m_old = PATRON_OLD.match(nombre)
-    m_new = PATRON_NEW.match(nombre)
-    if IGNORAR.search(nombre) or not (m_old or m_new):
-        print(f"[skip] {nombre} (no mensual o patrón no coincide)")
-        return None
-
-    anio = int((m_old or m_new).group(1))
-    out_path = OUT_DIR / f"gasto_mensual_normalizado_{anio}.parquet"
-
-    if out_path.exists() and not overwrite:
-        print(f"[skip] {out_path.name} ya existe. Usa --overwrite para rehacerlo.")
-        return out_path
-
-    print(f"[proc] {nombre}  ->  {out_path.name}")
-
-    acumulados = []
-    filas_total = 0
-
-    # Intento por codificaciones + fallback de engine
-    for codificacion in ["utf-8","utf-8-sig","latin-1"]:
-        try:
-            # 1) parser rápido (C)
-            for bloque in pd.read_csv(
-                ruta_csv, sep=",", dtype=str, encoding=codificacion,
-                on_bad_lines="skip", low_memory=False, chunksize=tamano_bloque,
-                quotechar='"', doublequote=True, escapechar='\\'
-            ):
-                bloque.columns = [normalizar_columna(c) for c in bloque.columns]
-                for c in COLS_CLAVE:
-                    if c not in bloque.columns:
-                        bloque[c] = None
-                df = bloque[COLS_CLAVE].copy()
-                for c in COLS_NUM:
-                    df[c] = a_numero(df[c])
-                for c in [c for c in COLS_CLAVE if c not in COLS_NUM]:
-                    df[c] = limpiar_texto(df[c])
-                df["FECHA"] = construir_fecha(df["ANO_EJE"], df["MES_EJE"])
-                df = df[(df["ANO_EJE"] > 0) & (df["MES_EJE"].between(1,12))]
-                acumulados.append(df)
-                filas_total += len(df)
-            break  # leído con esta codificación y engine C
-        except Exception as error1:
-            print(f"[warn] {nombre} falló con {codificacion} y engine C ({type(error1).__name__}). Intento engine='python'…")
-            try:
-                # 2) parser tolerante (python)
-                for bloque in pd.read_csv(
-                    ruta_csv, sep=",", dtype=str, encoding=codificacion,
-                    on_bad_lines="skip", low_memory=False, chunksize=tamano_bloque,
-                    engine="python", quotechar='"', doublequote=True, escapechar='\\'
-                ):
-                    bloque.columns = [normalizar_columna(c) for c in bloque.columns]
-                    for c in COLS_CLAVE:
-                        if c not in bloque.columns:
-                            bloque[c] = None
-                    df = bloque[COLS_CLAVE].copy()
-                    for c in COLS_NUM:
-                        df[c] = a_numero(df[c])
-                    for c in [c for c in COLS_CLAVE if c not in COLS_NUM]:
-                        df[c] = limpiar_texto(df[c])
-                    df["FECHA"] = construir_fecha(df["ANO_EJE"], df["MES_EJE"])
-                    df = df[(df["ANO_EJE"] > 0) & (df["MES_EJE"].between(1,12))]
-                    acumulados.append(df)
-                    filas_total += len(df)
-                break  # leído con esta codificación y engine python
-            except Exception as error2:
-                print(f"[warn] {nombre} también falló con engine='python' y {codificacion}: {type(error2).__name__}")
-                print(traceback.format_exc().splitlines()[-1])
-                # pasa a la siguiente codificación
-
-    if filas_total == 0:
-        print(f"[warn] {nombre}: 0 filas válidas tras limpieza.")
-        return None
-
-    df_final = pd.concat(acumulados, ignore_index=True)
-    df_final.to_parquet(out_path, engine="pyarrow", index=False)
-    print(f"[ok] {out_path.name}  filas={len(df_final):,}")
-
-    # --- Limpieza: borrar el CSV original tras convertir a Parquet ---
-    try:
-        ruta_csv.unlink(missing_ok=True)
-        print(f"[limpieza] Eliminado RAW: {ruta_csv.name}")
-    except Exception as e:
-        # No detenemos el flujo si falla el borrado (p.ej., archivo en uso)
-        print(f"[warn] No pude eliminar {ruta_csv.name}: {type(e).__name__}: {e}")
-
-    return out_path
-
-# Función: principal
-# Qué hace: Orquesta el proceso de transformación. Lee argumentos (años/overwrite), filtra archivos objetivo y llama a transformar_archivo.
-def principal():
-    parser = argparse.ArgumentParser(description="Transforma CSV de gasto mensual a Parquet normalizado.")
-    parser.add_argument("anios", nargs="*", type=int, help="Años a procesar (opcional). Ej: 2020 2021")
-    parser.add_argument("--overwrite", action="store_true", help="Reprocesa aunque el parquet exista.")
-    args = parser.parse_args()
-
-    # Construir lista de CSV
-    csvs = sorted([p for p in RAW_DIR.glob("*.csv")])
-    if not csvs:
-        print("[error] No hay CSV en data/raw/")
-        sys.exit(1)
-
-    # Filtrar por años si se enviaron
-    if args.anios:
-        objetivo = set(str(a) for a in args.anios)
-        filtrados = []
-        for p in csvs:
-            m = PATRON_OLD.match(p.name) or PATRON_NEW.match(p.name)
-            if m and m.group(1) in objetivo:
-                filtrados.append(p)
-        csvs = sorted(filtrados)
-        if not csvs:
-            print(f"[error] No encontré CSV para años: {sorted(objetivo)}")
-            sys.exit(1)
-
-    print(f"[info] Procesaré {len(csvs)} archivo(s). Overwrite={args.overwrite}")
-
-    generados = []
-    for p in csvs:
-        try:
-            out = transformar_archivo(p, overwrite=args.overwrite)
-            if out:
-                generados.append(out.name)
-        except KeyboardInterrupt:
-            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
-            break
-        except Exception:
-            print(f"[error] Transformando {p.name}")
-            print(traceback.format_exc())
-
-    print("[resumen] Archivos en processed/:")
-    for n in generados:
-        print(f" - {n}")
-    if not generados:
-        print(" (ninguno)")
-
-if __name__ == "__main__":
-    principal()
+# -*- coding: utf-8 -*-
+# TRANSFORMACIÓN (T de ETL): normaliza CSV del MEF (gasto mensual) y exporta Parquet.
+# - Salta archivos ya procesados.
+# - Lee el RAW plano o comprimido (.csv.zst, .csv.gz, .zip) descomprimiendo al vuelo; el RAW se conserva.
+# Uso:
+#   python .\etl\transformar_mensual.py                  # procesa todos
+#   python .\etl\transformar_mensual.py 2020 2021        # procesa años específicos
+#   python .\etl\transformar_mensual.py --overwrite      # rehace todos
+#   python .\etl\transformar_mensual.py 2020 --overwrite # rehace solo 2020
+#   python .\etl\transformar_mensual.py 2020 --overwrite --metrics logs\metricas.jsonl --profile
+#   python .\etl\transformar_mensual.py 2020 --overwrite --engine arrow   # parser pyarrow.csv (multihilo)
+#   python .\etl\transformar_mensual.py --jobs 3 --memory-budget 12G      # varios años a la vez, con techo de RAM
+#   python .\etl\transformar_mensual.py 2020 --overwrite --split 4         # un año en 4 rangos de bytes en paralelo
+#   python .\etl\transformar_mensual.py 2020 --overwrite --layout hive --bloom-filter  # ano_eje=/mes_eje= ordenado
+#   python .\etl\transformar_mensual.py 2020 --delete-raw                 # borra el RAW al terminar (comportamiento anterior)
+
+import io
+import os
+import re
+import csv
+import sys
+import time
+import codecs
+import shutil
+import inspect
+import argparse
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+import traceback
+
+from contrato_esquema import (
+    esquema_contrato, tabla_con_contrato, huellas_mes, metadata_con_huellas, COLS_DICCIONARIO, COLS_ORIGEN,
+    VERSION_CONTRATO,
+)
+from compresion import abrir_crudo, compresion_de, nombre_csv, tamano_crudo
+from limpieza import a_numero, numero_arrow, limpiar_columna, fecha_desde_anio_mes, CACHE_LIMPIEZA
+from metricas import METRICAS, rss_pico_mb, parsear_tamano, memoria_fisica_bytes
+
+# --- Paths --- (ETL_DATA_DIR reemplaza la carpeta data/, p. ej. en benchmark_etl.py)
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(os.getenv("ETL_DATA_DIR") or BASE_DIR / "data")
+RAW_DIR  = DATA_DIR / "raw"
+OUT_DIR  = DATA_DIR / "processed"
+CUARENTENA_DIR = DATA_DIR / "cuarentena"  # líneas que no se pudieron parsear (una por CSV)
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+print(f"[info] RAW_DIR: {RAW_DIR.resolve()}")
+print(f"[info] OUT_DIR: {OUT_DIR.resolve()}")
+
+# --- Patrones de archivo ---
+PATRON_OLD = re.compile(r"^(20\d{2})-Gasto\.csv$", re.IGNORECASE)         # 2017..2023
+PATRON_NEW = re.compile(r"^(20\d{2})-Gasto-Mensual\.csv$", re.IGNORECASE) # 2024..2025
+IGNORAR    = re.compile(r"Diario", re.IGNORECASE)
+
+# --- Columnas de interés ---
+COLS_CLAVE = [
+    # tiempo
+    "ANO_EJE","MES_EJE",
+    # nivel de gobierno
+    "NIVEL_GOBIERNO","NIVEL_GOBIERNO_NOMBRE",
+    # ejecutora
+    "SEC_EJEC","EJECUTORA","EJECUTORA_NOMBRE",
+    "SECTOR","SECTOR_NOMBRE","PLIEGO","PLIEGO_NOMBRE",
+    "DEPARTAMENTO_EJECUTORA","DEPARTAMENTO_EJECUTORA_NOMBRE",
+    "PROVINCIA_EJECUTORA","PROVINCIA_EJECUTORA_NOMBRE",
+    "DISTRITO_EJECUTORA","DISTRITO_EJECUTORA_NOMBRE",
+    # programática
+    "PROGRAMA_PPTO","PROGRAMA_PPTO_NOMBRE",
+    "TIPO_ACT_PROY","TIPO_ACT_PROY_NOMBRE",
+    "PRODUCTO_PROYECTO","PRODUCTO_PROYECTO_NOMBRE",
+    "ACTIVIDAD_ACCION_OBRA","ACTIVIDAD_ACCION_OBRA_NOMBRE",
+    "SEC_FUNC",
+    # funcional
+    "FUNCION","FUNCION_NOMBRE",
+    "DIVISION_FUNCIONAL","DIVISION_FUNCIONAL_NOMBRE",
+    "GRUPO_FUNCIONAL","GRUPO_FUNCIONAL_NOMBRE",
+    # meta
+    "META","FINALIDAD","META_NOMBRE","DEPARTAMENTO_META","DEPARTAMENTO_META_NOMBRE","FINALIDAD_NOMBRE",
+    # financiera
+    "FUENTE_FINANCIAMIENTO","FUENTE_FINANCIAMIENTO_NOMBRE",
+    "RUBRO","RUBRO_NOMBRE","TIPO_RECURSO","TIPO_RECURSO_NOMBRE",
+    "CATEGORIA_GASTO","CATEGORIA_GASTO_NOMBRE",
+    # clasificador gasto
+    "TIPO_TRANSACCION",
+    "GENERICA","GENERICA_NOMBRE",
+    "SUBGENERICA","SUBGENERICA_NOMBRE",
+    "SUBGENERICA_DET","SUBGENERICA_DET_NOMBRE",
+    "ESPECIFICA","ESPECIFICA_NOMBRE",
+    "ESPECIFICA_DET","ESPECIFICA_DET_NOMBRE",
+    # métricas
+    "MONTO_PIA","MONTO_PIM","MONTO_CERTIFICADO","MONTO_COMPROMETIDO_ANUAL",
+    "MONTO_COMPROMETIDO","MONTO_DEVENGADO","MONTO_GIRADO"
+]
+
+COLS_NUM = [
+    "ANO_EJE","MES_EJE","SEC_FUNC","TIPO_TRANSACCION",
+    "MONTO_PIA","MONTO_PIM","MONTO_CERTIFICADO","MONTO_COMPROMETIDO_ANUAL",
+    "MONTO_COMPROMETIDO","MONTO_DEVENGADO","MONTO_GIRADO"
+]
+
+# --- Sondeo y lectura ---
+ENGINES = ["pandas","arrow"]
+BYTES_BLOQUE_ARROW = 16 << 20  # bytes de CSV por bloque que parsea pyarrow (cada hilo toma un bloque)
+BYTES_SONDEO       = 1 << 20   # inicio del archivo que se mira para codificación y dialecto
+MUESTRAS_SONDEO    = 16        # trozos repartidos por el resto del archivo
+BYTES_MUESTRA      = 64 << 10
+BYTES_FLUJO        = 8 << 20   # bytes que FlujoUtf8 valida/convierte de una vez
+PATRON_LINEA_MALA  = re.compile(r"Skipping line (\d+): expected (\d+) fields, saw (\d+)")
+PATRON_ESCAPE      = re.compile(rb"\\.", re.DOTALL)  # el escapechar de read_csv/pyarrow ("\") con el byte que escapa
+
+# --- Partición de un CSV (--split) ---
+BYTES_MIN_PARTE  = 64 << 20  # un rango más chico no compensa lanzar otro proceso
+BYTES_BUSQUEDA   = 4 << 20   # cuánto se avanza desde cada corte ideal buscando un fin de registro antes de desistir
+
+# --- Layout de salida (--layout) ---
+LAYOUTS = ["file","hive"]
+DATASET_DIR = OUT_DIR / "gasto_mensual_normalizado"  # hive: ano_eje=YYYY/mes_eje=M/part-0.parquet
+FILAS_ROW_GROUP_HIVE = 128 * 1024  # row groups más chicos que los bloques del transform: poda más fina por estadísticas
+# Orden dentro de cada mes: claves naturales de las dimensiones (nivel → ejecutora → programática → funcional → meta),
+# así los valores repetidos quedan juntos, los min/max de cada row group son estrechos y el merge de dimensiones
+# recorre las claves ya agrupadas.
+CLAVES_ORDEN = [
+    "NIVEL_GOBIERNO","SEC_EJEC","EJECUTORA",
+    "PROGRAMA_PPTO","TIPO_ACT_PROY","PRODUCTO_PROYECTO","ACTIVIDAD_ACCION_OBRA","SEC_FUNC",
+    "FUNCION","DIVISION_FUNCIONAL","GRUPO_FUNCIONAL",
+    "META","FINALIDAD","DEPARTAMENTO_META",
+]
+COLS_BLOOM = ["SEC_EJEC","SEC_FUNC","PRODUCTO_PROYECTO","ACTIVIDAD_ACCION_OBRA","META"]  # alta cardinalidad
+FPP_BLOOM  = 0.05
+BLOOM_DISPONIBLE = "bloom_filter_options" in inspect.signature(pq.ParquetWriter).parameters  # pyarrow reciente
+
+# --- Paralelo (--jobs) ---
+TAMANO_BLOQUE = 300_000  # filas por bloque del transform
+PRESUPUESTO_MEMORIA_POR_DEFECTO = os.getenv("MEMORY_BUDGET")  # sin valor = FRACCION_RAM de la memoria física
+FRACCION_RAM = 0.75
+RSS_BASE_PROCESO = 200 << 20  # intérprete + pandas/pyarrow importados
+# RSS pico / bytes de CSV de un bloque, medido sobre un año sintético de 600k filas (pandas ~2.1 GB, arrow ~1.2 GB
+# con bloques de 300k filas); con escritura por bloques el pico depende del bloque, no del año completo.
+FACTOR_PICO_BLOQUE = {"pandas": 6.5, "arrow": 4.0}
+
+# --- Helpers ---
+
+# Función: normalizar_columna
+# Qué hace: Recibe el nombre de una columna, elimina espacios y la convierte a MAYÚSCULAS para uniformizar el esquema.
+def normalizar_columna(c: str) -> str:
+    return (c or "").strip().upper()
+
+# Función: normalizar_bloque
+# Qué hace: Normaliza un bloque leído del CSV: columnas en MAYÚSCULAS, faltantes en None, numéricas tipadas, texto
+#           limpio, FECHA y filtro de año/mes válidos. Registra la etapa "limpiar" y la línea del bloque en las métricas.
+#           El texto se limpia por valores distintos con el cache de limpieza.py (COLS_DICCIONARIO quedan categóricas)
+#           y FECHA sale de la aritmética sobre año y mes.
+def normalizar_bloque(bloque: pd.DataFrame, nombre: str) -> pd.DataFrame:
+    t0 = time.perf_counter()
+    with METRICAS.etapa("limpiar", filas=len(bloque)):
+        bloque.columns = [normalizar_columna(c) for c in bloque.columns]
+        for c in COLS_CLAVE:
+            if c not in bloque.columns:
+                bloque[c] = None
+        df = bloque[COLS_CLAVE].copy()
+        for c in COLS_NUM:
+            df[c] = a_numero(df[c])
+        for c in [c for c in COLS_CLAVE if c not in COLS_NUM]:
+            df[c] = limpiar_columna(df[c], categorica=c in COLS_DICCIONARIO)
+        df["FECHA"] = fecha_desde_anio_mes(df["ANO_EJE"], df["MES_EJE"])
+        df = df[(df["ANO_EJE"] > 0) & (df["MES_EJE"].between(1,12))]
+    METRICAS.batch(len(bloque), time.perf_counter() - t0, archivo=nombre, validas=len(df))
+    return df
+
+# Función: sondear_csv
+# Qué hace: Elige codificación y dialecto una sola vez mirando el inicio del archivo y MUESTRAS_SONDEO trozos repartidos
+#           por el resto (no lo recorre entero). BOM => utf-8-sig; líneas no ASCII que solo son latin-1 => latin-1; si no,
+#           utf-8 (las pocas líneas latin-1 de un archivo UTF-8 las arregla FlujoUtf8). El separador y la comilla salen de
+#           csv.Sniffer sobre las primeras líneas (por defecto "," y '"'). Devuelve también el encabezado.
+#           En un RAW comprimido solo se mira el inicio: saltar a las muestras obligaría a descomprimir todo el archivo.
+def sondear_csv(ruta_csv: Path) -> dict:
+    tamano = ruta_csv.stat().st_size
+    with abrir_crudo(ruta_csv) as fh:
+        cabeza = fh.read(BYTES_SONDEO)
+        muestras = [cabeza[: cabeza.rfind(b"\n") + 1] if len(cabeza) == BYTES_SONDEO else cabeza]
+        if tamano > 2 * BYTES_SONDEO and compresion_de(ruta_csv) is None:
+            for k in range(1, MUESTRAS_SONDEO + 1):
+                fh.seek(tamano * k // (MUESTRAS_SONDEO + 1))
+                trozo = fh.read(BYTES_MUESTRA)
+                muestras.append(trozo[trozo.find(b"\n") + 1 : trozo.rfind(b"\n") + 1])
+    utf8, no_utf8 = 0, 0
+    for linea in b"".join(muestras).split(b"\n"):
+        if linea.isascii():
+            continue
+        try:
+            linea.decode("utf-8")
+            utf8 += 1
+        except UnicodeDecodeError:
+            no_utf8 += 1
+    if cabeza.startswith(codecs.BOM_UTF8):
+        codificacion = "utf-8-sig"
+    else:
+        codificacion = "latin-1" if no_utf8 and not utf8 else "utf-8"
+
+    lineas = muestras[0].decode(codificacion, errors="replace").splitlines()[:20]
+    delimitador, comilla = ",", '"'
+    try:
+        dialecto = csv.Sniffer().sniff("\n".join(lineas), delimiters=",;|\t")
+        delimitador, comilla = dialecto.delimiter, dialecto.quotechar if dialecto.quotechar in "\"'" else '"'
+    except csv.Error:
+        pass
+    encabezado = next(csv.reader(lineas[:1], delimiter=delimitador, quotechar=comilla), [])
+    if len(encabezado) < 2:  # el sniffer se equivocó: se vuelve al dialecto del MEF
+        delimitador, comilla = ",", '"'
+        encabezado = next(csv.reader(lineas[:1]), [])
+    return {"codificacion": codificacion, "delimitador": delimitador, "comilla": comilla,
+            "encabezado": [c.lstrip("\ufeff") for c in encabezado]}
+
+# Clase: Cuarentena
+# Qué hace: Junta lo que no se pudo parsear de un CSV en CUARENTENA_DIR/<nombre del CSV> (línea, motivo, texto) y cuenta por
+#           motivo. También cuenta lo que se arregló sin descartar (líneas recodificadas desde latin-1, líneas cortas
+#           completadas con nulos). El archivo solo se crea si hay líneas; cerrar() imprime y registra los conteos.
+class Cuarentena:
+    def __init__(self, ruta: Path):
+        self.ruta = ruta
+        self.conteos: dict = {}
+        self.lineas = 0
+        self.fh = None
+        self.lock = threading.Lock()
+        ruta.unlink(missing_ok=True)  # la de una corrida anterior
+
+    def _escritor(self):
+        if self.fh is None:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self.fh = open(self.ruta, "w", encoding="utf-8", newline="")
+            self.escritor = csv.writer(self.fh)
+            self.escritor.writerow(["linea", "motivo", "texto"])
+        return self.escritor
+
+    def contar(self, motivo: str, n: int = 1):
+        with self.lock:
+            self.conteos[motivo] = self.conteos.get(motivo, 0) + n
+
+    def agregar(self, linea, motivo: str, texto: str = ""):
+        with self.lock:
+            self._escritor().writerow([linea if linea is not None else "", motivo, texto])
+            self.lineas += 1
+            self.conteos[motivo] = self.conteos.get(motivo, 0) + 1
+
+    # Suma la cuarentena de un rango (--split): copia sus líneas corriendo el número de línea en `desplazamiento`
+    # (registros de los rangos anteriores), agrega sus conteos y borra su archivo.
+    def absorber(self, ruta: Path, conteos: dict, lineas: int, desplazamiento: int):
+        with self.lock:
+            if lineas:
+                with open(ruta, encoding="utf-8", newline="") as fh:
+                    filas = csv.reader(fh)
+                    next(filas, None)
+                    self._escritor().writerows(
+                        [str(int(f[0]) + desplazamiento) if f[0].isdigit() else f[0], *f[1:]] for f in filas)
+                self.lineas += lineas
+            for motivo, n in conteos.items():
+                self.conteos[motivo] = self.conteos.get(motivo, 0) + n
+        ruta.unlink(missing_ok=True)
+
+    def cerrar(self, nombre: str, informar: bool = True):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+        if not informar:
+            return
+        if self.conteos:
+            detalle = ", ".join(f"{m}: {n:,}" for m, n in sorted(self.conteos.items()))
+            destino = f" -> {self.ruta}" if self.lineas else ""
+            print(f"[cuarentena] {nombre}: {self.lineas:,} línea(s) descartadas{destino}  ({detalle})")
+        METRICAS.registrar("cuarentena", archivo=nombre, lineas=self.lineas, conteos=self.conteos)
+
+# Clase: FlujoUtf8
+# Qué hace: Archivo binario de solo lectura que entrega el CSV como UTF-8 válido sin el BOM, para que ningún parser falle
+#           por la codificación a mitad de archivo. Lee BYTES_FLUJO por vez cortando en fin de línea; en archivos latin-1
+#           transcodifica el trozo y en UTF-8 solo lo valida: las líneas que no son UTF-8 se recodifican desde latin-1
+#           (quedan contadas en la cuarentena, no se descartan).
+#           Con inicio/fin entrega solo ese rango de bytes precedido por `cabecera` (la línea de encabezado), para que
+#           cada rango de --split se lea como un CSV completo. Los RAW comprimidos se descomprimen al vuelo (abrir_crudo),
+#           así todos los engines los leen sin cambios; no admiten rangos.
+class FlujoUtf8(io.RawIOBase):
+    def __init__(self, ruta_csv: Path, codificacion: str, cuarentena: Cuarentena, inicio: int = 0,
+                 fin: int | None = None, cabecera: bytes = b""):
+        self.fh = abrir_crudo(ruta_csv)
+        self.latin1 = codificacion == "latin-1"
+        self.cuarentena = cuarentena
+        self.resto = b""
+        self.salida = memoryview(b"")
+        self.restantes = None if fin is None else fin - inicio
+        if inicio:
+            self.fh.seek(inicio)
+            self.salida = memoryview(self._convertir(cabecera))
+        elif codificacion == "utf-8-sig":
+            bom = self.fh.read(len(codecs.BOM_UTF8))
+            if bom != codecs.BOM_UTF8:  # sin seek (stream comprimido): lo leído vuelve al frente
+                self.resto = bom
+
+    def readable(self) -> bool:
+        return True
+
+    def _convertir(self, datos: bytes) -> bytes:
+        if self.latin1:
+            return datos.decode("latin-1").encode("utf-8")
+        try:
+            datos.decode("utf-8")
+            return datos
+        except UnicodeDecodeError:
+            pass
+        lineas = datos.split(b"\n")
+        for k, linea in enumerate(lineas):
+            try:
+                linea.decode("utf-8")
+            except UnicodeDecodeError:
+                lineas[k] = linea.decode("latin-1").encode("utf-8")
+                self.cuarentena.contar("recodificada desde latin-1")
+        return b"\n".join(lineas)
+
+    def readinto(self, destino) -> int:
+        while not self.salida:
+            bloque = self.fh.read(BYTES_FLUJO if self.restantes is None else min(BYTES_FLUJO, self.restantes))
+            if self.restantes is not None:
+                self.restantes -= len(bloque)
+            if not bloque:
+                if not self.resto:
+                    return 0
+                self.salida, self.resto = memoryview(self._convertir(self.resto)), b""
+                break
+            bloque = self.resto + bloque
+            corte = bloque.rfind(b"\n") + 1
+            if corte == 0:
+                self.resto = bloque
+                continue
+            self.salida, self.resto = memoryview(self._convertir(bloque[:corte])), bloque[corte:]
+        n = min(len(destino), len(self.salida))
+        destino[:n] = self.salida[:n]
+        self.salida = self.salida[n:]
+        return n
+
+    def close(self):
+        self.fh.close()
+        super().close()
+
+# Función: leer_bloques_pandas
+# Qué hace: Lee el CSV (ya UTF-8, ver FlujoUtf8) con pandas.read_csv por bloques de tamano_bloque filas, todo como texto.
+#           Las líneas con campos de más se saltan y pasan a la cuarentena con su número de línea (read_csv con engine C
+#           solo informa número y motivo); las cortas las completa read_csv con nulos.
+def leer_bloques_pandas(flujo, formato: dict, tamano_bloque: int, cuarentena: Cuarentena):
+    def a_cuarentena(avisos):
+        for aviso in avisos:
+            if not issubclass(aviso.category, pd.errors.ParserWarning):
+                warnings.showwarning(aviso.message, aviso.category, aviso.filename, aviso.lineno)
+                continue
+            for linea, esperados, vistos in PATRON_LINEA_MALA.findall(str(aviso.message)):
+                cuarentena.agregar(int(linea), f"{vistos} campos (se esperaban {esperados})")
+        avisos.clear()
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        for bloque in pd.read_csv(
+            flujo, sep=formato["delimitador"], dtype=str, encoding="utf-8",
+            on_bad_lines="warn", low_memory=False, chunksize=tamano_bloque,
+            quotechar=formato["comilla"], doublequote=True, escapechar='\\'
+        ):
+            a_cuarentena(avisos)
+            yield bloque
+        a_cuarentena(avisos)
+
+# Función: leer_bloques_arrow
+# Qué hace: Lee el CSV (ya UTF-8, ver FlujoUtf8) con pyarrow.csv.open_csv (streaming y multihilo) y entrega DataFrames de
+#           ~tamano_bloque filas con COLS_NUM ya numéricas, COLS_DICCIONARIO como categóricas y el resto como texto, sin un
+#           objeto str por celda. Usa las mismas comillas/escape que read_csv: las líneas con campos de más pasan a la
+#           cuarentena con su texto y las cortas (que read_csv completa con nulos) salen completadas en un último bloque.
+#           Los números se convierten con numero_arrow, así un valor mal escrito queda nulo en vez de cortar la lectura.
+#           El resto de la normalización la hace normalizar_bloque igual que con pandas.
+def leer_bloques_arrow(flujo, formato: dict, tamano_bloque: int, cuarentena: Cuarentena):
+    encabezado = formato["encabezado"]
+    tipos, numericas = {}, []
+    for c in encabezado:
+        n = normalizar_columna(c)
+        if n in COLS_NUM:
+            tipos[c] = pa.string()
+            numericas.append(c)
+        elif n in COLS_DICCIONARIO:
+            tipos[c] = pa.dictionary(pa.int32(), pa.string())
+        elif n in COLS_CLAVE:
+            tipos[c] = pa.string()
+    cortas = []
+    def fila_invalida(fila):
+        if fila.actual_columns < fila.expected_columns:
+            cortas.append(fila.text)
+            cuarentena.contar("completada con nulos")
+        else:
+            cuarentena.agregar(fila.number, f"{fila.actual_columns} campos (se esperaban {fila.expected_columns})",
+                               fila.text)
+        return "skip"
+    lector = pv.open_csv(
+        flujo,
+        read_options=pv.ReadOptions(block_size=BYTES_BLOQUE_ARROW, use_threads=True),
+        parse_options=pv.ParseOptions(delimiter=formato["delimitador"], quote_char=formato["comilla"],
+                                      double_quote=True, escape_char="\\",
+                                      newlines_in_values=True, invalid_row_handler=fila_invalida),
+        convert_options=pv.ConvertOptions(column_types=tipos, include_columns=list(tipos), strings_can_be_null=True),
+    )
+    def a_pandas(lotes):
+        tabla = pa.Table.from_batches(lotes)
+        for c in numericas:
+            tabla = tabla.set_column(tabla.schema.get_field_index(c), c, numero_arrow(tabla[c]))
+        return tabla.to_pandas()
+    pendientes, filas = [], 0
+    for lote in lector:
+        pendientes.append(lote)
+        filas += lote.num_rows
+        if filas >= tamano_bloque:
+            yield a_pandas(pendientes)
+            pendientes, filas = [], 0
+    if pendientes:
+        yield a_pandas(pendientes)
+    if cortas:
+        filas_cortas = csv.reader(cortas, delimiter=formato["delimitador"], quotechar=formato["comilla"],
+                                  doublequote=True, escapechar="\\")
+        yield pd.DataFrame([f + [None] * (len(encabezado) - len(f)) for f in filas_cortas], columns=encabezado)
+
+# Función: escribir_bloques
+# Qué hace: Normaliza cada bloque leído y lo escribe en `destino` como un row group con el esquema fijo del contrato
+#           (ParquetWriter), sin juntar el año en memoria. Devuelve las filas válidas escritas.
+def escribir_bloques(bloques, destino: Path, nombre: str) -> int:
+    filas = 0
+    with pq.ParquetWriter(destino, esquema_contrato()) as escritor:
+        for bloque in bloques:
+            df = normalizar_bloque(bloque, nombre)
+            if df.empty:
+                continue
+            with METRICAS.etapa("escribir_parquet", filas=len(df)):
+                tabla = tabla_con_contrato(df)
+                escritor.write_table(tabla, row_group_size=len(tabla))
+            filas += len(df)
+    return filas
+
+# Clase: EstadoComillas
+# Qué hace: Sigue si un punto del CSV cae dentro de un campo entre comillas, leyendo los bytes en orden. Cuenta la paridad
+#           de la comilla (la comilla doblada "" vale dos y no cambia nada) y descarta antes los pares escape + byte, igual
+#           que el escapechar "\\" de los parsers; un escape al final de un trozo queda pendiente para el siguiente.
+#           Funciona sobre los bytes crudos porque comilla, escape y fin de línea son ASCII en utf-8 y en latin-1.
+class EstadoComillas:
+    def __init__(self, comilla: str):
+        self.comilla = comilla.encode("ascii")
+        self.dentro = False
+        self.escape = False
+
+    def avanzar(self, datos: bytes):
+        if not datos:
+            return
+        if self.escape:
+            datos, self.escape = datos[1:], False
+        if b"\\" in datos:
+            datos = PATRON_ESCAPE.sub(b"", datos)
+            if datos.endswith(b"\\"):
+                datos, self.escape = datos[:-1], True
+        if datos.count(self.comilla) % 2:
+            self.dentro = not self.dentro
+
+    @property
+    def fin_de_registro(self) -> bool:
+        return not self.dentro and not self.escape
+
+# Función: cortes_csv
+# Qué hace: Parte un CSV en hasta `partes` rangos de bytes (inicio, fin) que empiezan y terminan en límite
+#           de registro. Recorre el archivo una vez con EstadoComillas (solo cuenta bytes, no parsea) y desde cada corte
+#           ideal avanza hasta el primer salto de línea fuera de comillas cuyo registro siguiente tiene tantos campos como
+#           el encabezado. Un salto dentro de un campo entre comillas nunca es corte; si no aparece uno en BYTES_BUSQUEDA,
+#           ese corte se omite (quedan menos rangos). Devuelve también la línea de encabezado cruda (sin BOM), que cada
+#           rango antepone a sus datos.
+def cortes_csv(ruta_csv: Path, partes: int, formato: dict) -> tuple[bytes, list]:
+    tamano = ruta_csv.stat().st_size
+    with open(ruta_csv, "rb") as fh:
+        cabeza = fh.read(BYTES_SONDEO)
+        inicio_datos = cabeza.find(b"\n") + 1
+        cabecera = cabeza[:inicio_datos].removeprefix(codecs.BOM_UTF8)
+        if inicio_datos == 0 or partes < 2:
+            return cabecera, [(0, tamano)]
+
+        def campos(linea: bytes) -> int:
+            texto = linea.decode("latin-1").rstrip("\r\n")
+            return len(next(csv.reader([texto], delimiter=formato["delimitador"], quotechar=formato["comilla"],
+                                       doublequote=True, escapechar="\\"), []))
+
+        esperados = len(formato["encabezado"])
+        estado = EstadoComillas(formato["comilla"])
+        rangos, inicio, pos = [], 0, inicio_datos
+        fh.seek(pos)
+        for k in range(1, partes):
+            objetivo = inicio_datos + (tamano - inicio_datos) * k // partes
+            while pos < objetivo:
+                datos = fh.read(min(BYTES_FLUJO, objetivo - pos))
+                if not datos:
+                    break
+                estado.avanzar(datos)
+                pos += len(datos)
+            corte, limite = None, pos + BYTES_BUSQUEDA
+            while corte is None and pos < limite:
+                datos = fh.read(BYTES_MUESTRA)
+                if not datos:
+                    break
+                desde = 0
+                while True:
+                    salto = datos.find(b"\n", desde)
+                    if salto < 0:
+                        estado.avanzar(datos[desde:])
+                        break
+                    estado.avanzar(datos[desde:salto])
+                    siguiente = datos.find(b"\n", salto + 1)
+                    while siguiente < 0 and estado.fin_de_registro:  # el registro siguiente sigue en el próximo trozo
+                        extra = fh.read(BYTES_MUESTRA)
+                        if not extra:
+                            siguiente = len(datos)
+                            break
+                        datos += extra
+                        siguiente = datos.find(b"\n", salto + 1)
+                    if estado.fin_de_registro and campos(datos[salto + 1:siguiente]) == esperados:
+                        corte = pos + salto + 1
+                        break
+                    estado.avanzar(b"\n")
+                    desde = salto + 1
+                if corte is None:
+                    pos += len(datos)
+            if corte is None or corte >= tamano:
+                break  # estado de comillas incierto: el resto queda en un solo rango
+            rangos.append((inicio, corte))
+            inicio = corte
+            fh.seek(corte)
+            pos, estado.dentro, estado.escape = corte, False, False
+        rangos.append((inicio, tamano))
+    return cabecera, rangos
+
+# Función: partes_efectivas
+# Qué hace: Cuántos rangos usar para un CSV con --split N: a lo sumo uno por cada BYTES_MIN_PARTE del archivo. Un RAW
+#           comprimido va siempre en un rango (sus offsets no se pueden alcanzar sin descomprimir lo anterior).
+def partes_efectivas(ruta_csv: Path, partes: int) -> int:
+    if compresion_de(ruta_csv):
+        return 1
+    return max(1, min(partes, ruta_csv.stat().st_size // BYTES_MIN_PARTE))
+
+# Función: transformar_rango
+# Qué hace: Worker de --split: lee un rango de bytes del CSV (con el encabezado delante), lo normaliza con el engine pedido
+#           y lo escribe en su propio Parquet `destino`. Su cuarentena va a un archivo aparte que después absorbe la del
+#           CSV. Devuelve filas escritas, registros leídos (incluidos los descartados, para numerar la cuarentena del
+#           rango siguiente), conteos de cuarentena y uso del cache de limpieza (para el resumen del proceso principal).
+def transformar_rango(ruta_csv: Path, formato: dict, rango: tuple, cabecera: bytes, destino: Path, engine: str,
+                      tamano_bloque: int, ruta_cuarentena: Path) -> dict:
+    inicio, fin = rango
+    limpiados, aciertos = CACHE_LIMPIEZA.limpiados, CACHE_LIMPIEZA.aciertos
+    cuarentena = Cuarentena(ruta_cuarentena)
+    lectores = {"pandas": leer_bloques_pandas, "arrow": leer_bloques_arrow}
+    leidos = 0
+    def contar(bloques):
+        nonlocal leidos
+        for bloque in bloques:
+            leidos += len(bloque)
+            yield bloque
+    try:
+        with io.BufferedReader(FlujoUtf8(ruta_csv, formato["codificacion"], cuarentena, inicio, fin, cabecera),
+                               1 << 20) as flujo:
+            filas = escribir_bloques(METRICAS.iterar(
+                "leer_csv", contar(lectores[engine](flujo, formato, tamano_bloque, cuarentena)),
+                lambda b: {"filas": len(b)}
+            ), destino, ruta_csv.name)
+    finally:
+        cuarentena.cerrar(ruta_csv.name, informar=False)
+    return {"filas": filas, "registros": leidos + cuarentena.lineas, "conteos": cuarentena.conteos,
+            "lineas": cuarentena.lineas,
+            "limpiados": CACHE_LIMPIEZA.limpiados - limpiados, "aciertos": CACHE_LIMPIEZA.aciertos - aciertos}
+
+# Función: unir_partes
+# Qué hace: Copia los row groups de los Parquet de cada rango, en orden, a `destino` con el esquema del contrato (un row
+#           group en memoria por vez). Devuelve las filas escritas.
+def unir_partes(partes: list, destino: Path) -> int:
+    filas = 0
+    with pq.ParquetWriter(destino, esquema_contrato()) as escritor:
+        for parte in partes:
+            archivo = pq.ParquetFile(parte)
+            for i in range(archivo.num_row_groups):
+                tabla = archivo.read_row_group(i)
+                escritor.write_table(tabla, row_group_size=len(tabla))
+                filas += len(tabla)
+            archivo.close()
+    return filas
+
+# Función: transformar_en_rangos
+# Qué hace: Parsea y limpia los rangos de cortes_csv en paralelo (un proceso por rango), junta la cuarentena y los
+#           contadores del cache y une los Parquet parciales en `destino`. Los parciales se borran siempre.
+def transformar_en_rangos(ruta_csv: Path, formato: dict, cabecera: bytes, rangos: list, destino: Path, engine: str,
+                          tamano_bloque: int, cuarentena: Cuarentena) -> int:
+    partes = [destino.with_name(f"{destino.name}.{k}") for k in range(len(rangos))]
+    cuarentenas = [CUARENTENA_DIR / f"{ruta_csv.name}.{k}" for k in range(len(rangos))]
+    try:
+        with ProcessPoolExecutor(max_workers=len(rangos), initializer=iniciar_worker) as pool:
+            try:
+                futuros = [pool.submit(transformar_rango, ruta_csv, formato, rango, cabecera, parte, engine,
+                                       tamano_bloque, ruta_q)
+                           for rango, parte, ruta_q in zip(rangos, partes, cuarentenas)]
+                resultados = [f.result() for f in futuros]
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        registros = 0
+        for r, ruta_q in zip(resultados, cuarentenas):
+            cuarentena.absorber(ruta_q, r["conteos"], r["lineas"], registros)
+            registros += r["registros"]
+            CACHE_LIMPIEZA.limpiados += r["limpiados"]
+            CACHE_LIMPIEZA.aciertos += r["aciertos"]
+        with METRICAS.etapa("unir_partes", archivo=ruta_csv.name, partes=len(partes)) as m:
+            m["filas"] = unir_partes(partes, destino)
+        return m["filas"]
+    finally:
+        for ruta in partes + cuarentenas:
+            ruta.unlink(missing_ok=True)
+
+# Función: ordenar_tabla
+# Qué hace: Ordena una tabla por CLAVES_ORDEN (nulos al final). Las columnas diccionario se comparan como texto porque
+#           sort_indices no ordena diccionarios directamente.
+def ordenar_tabla(tabla: pa.Table) -> pa.Table:
+    claves = pa.table({c: tabla[c].cast(pa.string()) if pa.types.is_dictionary(tabla.schema.field(c).type) else tabla[c]
+                       for c in CLAVES_ORDEN})
+    return tabla.take(pc.sort_indices(claves, sort_keys=[(c, "ascending") for c in CLAVES_ORDEN]))
+
+# Función: particionar_hive
+# Qué hace: Reparte el Parquet de un año (`origen`, el que arma el layout file) en `destino` = .../ano_eje=YYYY con una
+#           carpeta mes_eje=M por mes. Primera pasada: cada row group se separa por MES_EJE y se derrama a un Parquet por
+#           mes (sin juntar el año en memoria). Segunda pasada: cada mes se lee solo, se ordena por CLAVES_ORDEN y se
+#           escribe con row groups de FILAS_ROW_GROUP_HIVE, estadísticas min/max, page index, sorting_columns, bloom
+#           filters opcionales (COLS_BLOOM) y las huellas del mes en la metadata (las que usa --incremental del loader).
+#           Todo se arma en ano_eje=YYYY.tmp y se intercambia al final: un corte nunca deja un año a medias.
+def particionar_hive(origen: Path, destino: Path, bloom: bool = False) -> dict:
+    staging = destino.with_name(destino.name + ".tmp")
+    derrame = staging / "_derrame"
+    shutil.rmtree(staging, ignore_errors=True)
+    derrame.mkdir(parents=True)
+    esquema = esquema_contrato()
+    orden = [pq.SortingColumn(esquema.get_field_index(c)) for c in CLAVES_ORDEN]
+    filas_mes = {}
+    try:
+        escritores = {}
+        try:
+            archivo = pq.ParquetFile(origen)
+            for i in range(archivo.num_row_groups):
+                tabla = archivo.read_row_group(i)
+                meses = tabla["MES_EJE"]
+                for mes in pc.unique(meses).to_pylist():
+                    if mes is None:  # normalizar_bloque ya descarta filas sin MES_EJE; por si acaso
+                        continue
+                    if mes not in escritores:
+                        escritores[mes] = pq.ParquetWriter(derrame / f"{mes}.parquet", esquema)
+                    parte = tabla.filter(pc.equal(meses, mes))
+                    escritores[mes].write_table(parte, row_group_size=len(parte))
+            archivo.close()
+        finally:
+            for escritor in escritores.values():
+                escritor.close()
+
+        for mes in sorted(escritores):
+            with METRICAS.etapa("particion_hive", archivo=destino.name, mes=mes) as m:
+                tabla = ordenar_tabla(pq.read_table(derrame / f"{mes}.parquet", schema=esquema))
+                huellas = huellas_mes(b.to_pandas() for b in tabla.select(COLS_ORIGEN).to_batches())
+                opciones_bloom = None
+                if bloom:
+                    ndv = min(len(tabla), FILAS_ROW_GROUP_HIVE)  # el filtro es por row group
+                    opciones_bloom = {c: {"ndv": ndv, "fpp": FPP_BLOOM} for c in COLS_BLOOM}
+                carpeta = staging / f"mes_eje={mes}"
+                carpeta.mkdir()
+                with pq.ParquetWriter(carpeta / "part-0.parquet",
+                                      esquema.with_metadata(metadata_con_huellas(esquema, huellas)),
+                                      write_statistics=True, write_page_index=True, sorting_columns=orden,
+                                      bloom_filter_options=opciones_bloom) as escritor:
+                    escritor.write_table(tabla, row_group_size=FILAS_ROW_GROUP_HIVE)
+                (derrame / f"{mes}.parquet").unlink()
+                filas_mes[mes] = m["filas"] = len(tabla)
+        derrame.rmdir()
+
+        viejo = destino.with_name(destino.name + ".old")
+        if destino.exists():
+            os.replace(destino, viejo)
+        os.replace(staging, destino)
+        shutil.rmtree(viejo, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return filas_mes
+
+# Función: filas_salida
+# Qué hace: Filas de la salida de un año, sea un archivo Parquet (layout file) o la carpeta ano_eje=YYYY (layout hive),
+#           leyendo solo los footers.
+def filas_salida(ruta: Path) -> int:
+    archivos = sorted(ruta.rglob("*.parquet")) if ruta.is_dir() else [ruta]
+    return sum(pq.read_metadata(a).num_rows for a in archivos)
+
+# Función: transformar_archivo
+# Qué hace: Lee un CSV mensual (por bloques), selecciona/normaliza columnas, tipa numéricas, crea FECHA y exporta Parquet por año
+#           con el contrato de esquema (contrato_esquema.py) en la metadata, para que el loader no re-normalice.
+#           Cada bloque se escribe apenas se limpia en un archivo temporal que se renombra al final: la memoria no crece
+#           con el tamaño del CSV y un corte nunca deja un gasto_mensual_normalizado_YYYY.parquet a medias.
+#           Codificación y dialecto salen de sondear_csv y el archivo se parsea una sola vez con el engine elegido; lo que
+#           no se puede parsear va a la cuarentena (data/cuarentena/) en vez de provocar otra lectura completa.
+#           Con partes > 1 (--split) el CSV se corta en rangos de bytes en límite de registro que se transforman en
+#           paralelo y se unen al final (transformar_en_rangos).
+#           Con layout "hive" el Parquet del año se reparte después en processed/gasto_mensual_normalizado/ano_eje=YYYY/
+#           mes_eje=M/ ordenado y con estadísticas (particionar_hive); la salida del otro layout para ese año se borra,
+#           para que el loader no vea el año dos veces.
+#           El RAW puede venir comprimido (.csv.zst, .csv.gz o el .zip del portal; ver compresion.py) y se conserva:
+#           rehacer un año no obliga a descargarlo otra vez. Con borrar_crudo (--delete-raw) se elimina al terminar.
+def transformar_archivo(ruta_csv: Path, overwrite: bool = False, tamano_bloque: int = TAMANO_BLOQUE,
+                        engine: str = "pandas", partes: int = 1, layout: str = "file",
+                        bloom: bool = False, borrar_crudo: bool = False) -> Path | None:
+    nombre = ruta_csv.name
+    base = nombre_csv(nombre) or nombre
+    m_old = PATRON_OLD.match(base)
+    m_new = PATRON_NEW.match(base)
+    if IGNORAR.search(nombre) or not (m_old or m_new):
+        print(f"[skip] {nombre} (no mensual o patrón no coincide)")
+        return None
+
+    anio = int((m_old or m_new).group(1))
+    out_path = OUT_DIR / f"gasto_mensual_normalizado_{anio}.parquet"
+    dir_hive = DATASET_DIR / f"ano_eje={anio}"
+    destino, otro = (dir_hive, out_path) if layout == "hive" else (out_path, dir_hive)
+    destino_txt = destino.relative_to(OUT_DIR).as_posix()
+
+    if destino.exists() and not overwrite:
+        print(f"[skip] {destino_txt} ya existe. Usa --overwrite para rehacerlo.")
+        return destino
+
+    print(f"[proc] {nombre}  ->  {destino_txt}")
+
+    # el glob del loader (*.parquet) no ve el temporal
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+
+    # Codificación y dialecto se eligen una vez; el CSV se recorre una sola vez con el engine pedido
+    with METRICAS.etapa("sondeo") as m:
+        formato = sondear_csv(ruta_csv)
+        m.update(archivo=nombre, codificacion=formato["codificacion"], delimitador=formato["delimitador"])
+    comprimido = compresion_de(ruta_csv)
+    print(f"[sondeo] {nombre}: encoding={formato['codificacion']}  sep={formato['delimitador']!r}  "
+          f"comilla={formato['comilla']!r}  engine={engine}" + (f"  compresión={comprimido}" if comprimido else ""))
+    if comprimido and partes > 1:
+        print(f"[info] {nombre}: --split no aplica a un RAW comprimido; se lee en un solo flujo.")
+    rangos = []
+    if partes_efectivas(ruta_csv, partes) > 1:
+        with METRICAS.etapa("cortes") as m:
+            cabecera, rangos = cortes_csv(ruta_csv, partes_efectivas(ruta_csv, partes), formato)
+            m.update(archivo=nombre, partes=len(rangos))
+        print(f"[split] {nombre}: {len(rangos)} rango(s) de ~{ruta_csv.stat().st_size / len(rangos) / 2**20:,.0f} MB")
+        if len(rangos) < partes_efectivas(ruta_csv, partes):
+            print(f"[warn] {nombre}: sin límite de registro seguro después del byte {rangos[-1][0]:,} (¿comilla suelta?); "
+                  f"el resto va en un solo rango.")
+    cuarentena = Cuarentena(CUARENTENA_DIR / base)
+    lectores = {"pandas": leer_bloques_pandas, "arrow": leer_bloques_arrow}
+    try:
+        if len(rangos) > 1:
+            filas_total = transformar_en_rangos(ruta_csv, formato, cabecera, rangos, tmp_path, engine, tamano_bloque,
+                                                cuarentena)
+        else:
+            with io.BufferedReader(FlujoUtf8(ruta_csv, formato["codificacion"], cuarentena), 1 << 20) as flujo:
+                filas_total = escribir_bloques(METRICAS.iterar(
+                    "leer_csv", lectores[engine](flujo, formato, tamano_bloque, cuarentena),
+                    lambda b: {"filas": len(b)}
+                ), tmp_path, nombre)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        cuarentena.cerrar(nombre)
+
+    if filas_total == 0:
+        tmp_path.unlink(missing_ok=True)
+        print(f"[warn] {nombre}: 0 filas válidas tras limpieza.")
+        return None
+
+    if layout == "hive":
+        try:
+            with METRICAS.etapa("hive", archivo=nombre) as m:
+                meses = particionar_hive(tmp_path, destino, bloom)
+                m.update(meses=len(meses), filas=sum(meses.values()))
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        bloom_txt = f"  bloom={','.join(COLS_BLOOM)}" if bloom else ""
+        print(f"[hive] {destino_txt}: {len(meses)} mes(es), ordenado por {len(CLAVES_ORDEN)} claves, "
+              f"row groups de {FILAS_ROW_GROUP_HIVE:,} filas{bloom_txt}")
+    else:
+        os.replace(tmp_path, out_path)
+    print(f"[ok] {destino_txt}  filas={filas_total:,}  contrato=v{VERSION_CONTRATO}")
+    if otro.exists():
+        if otro.is_dir():
+            shutil.rmtree(otro)
+        else:
+            otro.unlink()
+        print(f"[limpieza] Eliminado {otro.relative_to(OUT_DIR).as_posix()} (layout anterior)")
+
+    # --- Limpieza (solo con --delete-raw): borrar el RAW tras convertir a Parquet ---
+    if borrar_crudo:
+        try:
+            ruta_csv.unlink(missing_ok=True)
+            print(f"[limpieza] Eliminado RAW: {ruta_csv.name}")
+        except Exception as e:
+            # No detenemos el flujo si falla el borrado (p.ej., archivo en uso)
+            print(f"[warn] No pude eliminar {ruta_csv.name}: {type(e).__name__}: {e}")
+
+    return destino
+
+# Función: memoria_estimada
+# Qué hace: Estima el RSS pico (bytes) de transformar un CSV: base del proceso + FACTOR_PICO_BLOQUE × bytes de un bloque.
+#           Los bytes por fila salen del primer MB del archivo; un archivo (o rango) más chico que un bloque cuenta entero.
+#           En un RAW comprimido cuenta el tamaño descomprimido (tamano_crudo).
+#           Con --split cada rango es otro proceso con su propio bloque en memoria. Con layout hive se suma un mes del
+#           año en Arrow más su copia ordenada (~1/6 del CSV).
+def memoria_estimada(ruta_csv: Path, engine: str, tamano_bloque: int = TAMANO_BLOQUE, partes: int = 1,
+                     layout: str = "file") -> int:
+    tamano = tamano_crudo(ruta_csv)
+    with abrir_crudo(ruta_csv) as fh:
+        muestra = fh.read(BYTES_SONDEO)
+    bytes_fila = len(muestra) / max(muestra.count(b"\n"), 1)
+    partes = partes_efectivas(ruta_csv, partes)
+    por_proceso = RSS_BASE_PROCESO + int(FACTOR_PICO_BLOQUE[engine] * min(tamano / partes, tamano_bloque * bytes_fila))
+    hive = tamano // 6 if layout == "hive" else 0
+    return por_proceso * partes + (RSS_BASE_PROCESO if partes > 1 else 0) + hive
+
+# Función: procesar_csv
+# Qué hace: Transforma un CSV (con su etapa "archivo" en las métricas y perfilado opcional) y devuelve un resumen
+#           serializable: salida, filas, segundos, error y RSS pico del proceso. Es la unidad de trabajo de --jobs;
+#           los errores se devuelven en vez de propagarse para juntarlos en el [resumen] final.
+def procesar_csv(ruta_csv: Path, overwrite: bool = False, engine: str = "pandas", partes: int = 1,
+                 layout: str = "file", bloom: bool = False, borrar_crudo: bool = False) -> dict:
+    t0 = time.perf_counter()
+    limpiados, aciertos = CACHE_LIMPIEZA.limpiados, CACHE_LIMPIEZA.aciertos
+    res = {"archivo": ruta_csv.name, "salida": None, "filas": 0, "error": None}
+    try:
+        with METRICAS.etapa("archivo", archivo=ruta_csv.name, bytes=ruta_csv.stat().st_size) as m, \
+                METRICAS.perfilar(ruta_csv.name):
+            out = transformar_archivo(ruta_csv, overwrite=overwrite, engine=engine, partes=partes, layout=layout,
+                                      bloom=bloom, borrar_crudo=borrar_crudo)
+            m["ok"] = out is not None
+            m["filas"] = filas_salida(out) if out else 0
+        res.update(salida=out.relative_to(OUT_DIR).as_posix() if out else None, filas=m["filas"])
+    except Exception as e:
+        print(f"[error] Transformando {ruta_csv.name}")
+        print(traceback.format_exc())
+        res["error"] = f"{type(e).__name__}: {e}"
+    res.update(seg=round(time.perf_counter() - t0, 1), rss_pico_mb=rss_pico_mb(),
+               limpiados=CACHE_LIMPIEZA.limpiados - limpiados, aciertos=CACHE_LIMPIEZA.aciertos - aciertos)
+    return res
+
+# Función: iniciar_worker
+# Qué hace: Deja la salida de cada worker con buffer por línea para que los mensajes de varios años no se mezclen.
+def iniciar_worker():
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Función: transformar_en_paralelo
+# Qué hace: Corre procesar_csv para varios años en un pool de `jobs` procesos. Un archivo se admite solo si la suma de
+#           memoria_estimada de los que están corriendo más la suya cabe en `techo` (bytes); si no hay nada corriendo se
+#           admite igual, para que un año más grande que el techo corra solo en vez de no correr. Los pendientes se
+#           recorren del más grande al más chico: los grandes arrancan primero y los chicos rellenan el hueco.
+def transformar_en_paralelo(csvs: list, jobs: int, techo: int | None, overwrite: bool = False,
+                            engine: str = "pandas", partes: int = 1, layout: str = "file", bloom: bool = False,
+                            borrar_crudo: bool = False) -> list:
+    pendientes = sorted(((p, memoria_estimada(p, engine, partes=partes, layout=layout)) for p in csvs),
+                        key=lambda t: t[1], reverse=True)
+    techo_txt = f"{techo / 2**20:,.0f} MB" if techo else "sin techo"
+    print(f"[info] Paralelo: hasta {jobs} proceso(s), memoria {techo_txt}", flush=True)
+    resultados, en_curso, usado = [], {}, 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=iniciar_worker) as pool:
+        try:
+            while pendientes or en_curso:
+                for trabajo in list(pendientes):
+                    ruta, estimado = trabajo
+                    if len(en_curso) >= jobs:
+                        break
+                    if en_curso and techo and usado + estimado > techo:
+                        continue
+                    pendientes.remove(trabajo)
+                    usado += estimado
+                    print(f"[cola] {ruta.name}: estimado {estimado / 2**20:,.0f} MB  "
+                          f"(en curso {len(en_curso) + 1}, {usado / 2**20:,.0f} MB)", flush=True)
+                    en_curso[pool.submit(procesar_csv, ruta, overwrite, engine, partes, layout, bloom, borrar_crudo)] = trabajo
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for fut in listos:
+                    ruta, estimado = en_curso.pop(fut)
+                    usado -= estimado
+                    try:
+                        resultados.append(fut.result())
+                    except Exception as e:  # el worker murió (p. ej. OOM): no hay resumen del propio archivo
+                        resultados.append({"archivo": ruta.name, "salida": None, "filas": 0,
+                                           "error": f"{type(e).__name__}: {e}"})
+                        if isinstance(e, BrokenProcessPool):
+                            for r, _ in pendientes:
+                                resultados.append({"archivo": r.name, "salida": None, "filas": 0,
+                                                   "error": "no se ejecutó (pool de procesos caído)"})
+                            pendientes = []
+        except KeyboardInterrupt:
+            print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+            pool.shutdown(wait=True, cancel_futures=True)
+    return resultados
+
+# Función: principal
+# Qué hace: Orquesta el proceso de transformación. Lee argumentos (años/overwrite), filtra archivos objetivo y llama a transformar_archivo.
+def principal():
+    parser = argparse.ArgumentParser(description="Transforma CSV de gasto mensual a Parquet normalizado.")
+    parser.add_argument("anios", nargs="*", type=int, help="Años a procesar (opcional). Ej: 2020 2021")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocesa aunque el parquet exista.")
+    parser.add_argument("--engine", choices=ENGINES, default="pandas",
+                        help="Parser del CSV: pandas (read_csv, por defecto) o arrow (pyarrow.csv multihilo con columnas "
+                             "tipadas).")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="Años a transformar a la vez, cada uno en su proceso (por defecto 1).")
+    parser.add_argument("--split", type=int, default=1, metavar="N",
+                        help="Parte cada CSV en hasta N rangos de bytes (en límite de registro) que se parsean y limpian "
+                             f"en paralelo, uno por proceso; como mínimo {BYTES_MIN_PARTE >> 20} MB por rango.")
+    parser.add_argument("--layout", choices=LAYOUTS, default="file",
+                        help="file: un gasto_mensual_normalizado_YYYY.parquet por año (por defecto). hive: "
+                             "gasto_mensual_normalizado/ano_eje=YYYY/mes_eje=M/, cada mes ordenado por las claves de "
+                             "las dimensiones y con estadísticas, para que el loader lea solo los meses que necesita.")
+    parser.add_argument("--bloom-filter", action="store_true",
+                        help=f"Con --layout hive, agrega bloom filters en {', '.join(COLS_BLOOM)}.")
+    parser.add_argument("--delete-raw", action="store_true",
+                        help="Borra el RAW de data/raw/ tras transformarlo bien (por defecto se conserva; comprimido "
+                             "ocupa ~1/6 del CSV).")
+    parser.add_argument("--memory-budget", type=parsear_tamano, default=PRESUPUESTO_MEMORIA_POR_DEFECTO,
+                        metavar="TAMAÑO",
+                        help="Techo de RAM para --jobs (ej. 12G; sin unidad = MB); también MEMORY_BUDGET. Por "
+                             f"defecto {FRACCION_RAM:.0%} de la memoria física.")
+    parser.add_argument("--metrics", default=None, metavar="ARCHIVO",
+                        help="Agrega métricas por etapa y por bloque (JSON lines) a ARCHIVO; también ETL_METRICAS.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila cada archivo con cProfile (.prof + top por tiempo acumulado).")
+    args = parser.parse_args()
+    METRICAS.configurar(args.metrics, args.profile, "transformar_mensual")
+
+    # Construir lista de CSV (planos o comprimidos; si un CSV está de las dos formas se usa el plano, que admite --split)
+    por_csv = {}
+    for p in sorted(RAW_DIR.iterdir()):
+        base = nombre_csv(p.name)
+        if base is None or not p.is_file():
+            continue
+        previo = por_csv.get(base.lower())
+        if previo is not None:
+            elegido = previo if compresion_de(previo) is None else p
+            print(f"[info] {base}: está como {previo.name} y {p.name}; uso {elegido.name}")
+            p = elegido
+        por_csv[base.lower()] = p
+    csvs = sorted(por_csv.values())
+    if not csvs:
+        print("[error] No hay CSV en data/raw/")
+        sys.exit(1)
+
+    # Filtrar por años si se enviaron
+    if args.anios:
+        objetivo = set(str(a) for a in args.anios)
+        filtrados = []
+        for p in csvs:
+            m = PATRON_OLD.match(nombre_csv(p.name)) or PATRON_NEW.match(nombre_csv(p.name))
+            if m and m.group(1) in objetivo:
+                filtrados.append(p)
+        csvs = sorted(filtrados)
+        if not csvs:
+            print(f"[error] No encontré CSV para años: {sorted(objetivo)}")
+            sys.exit(1)
+
+    if args.bloom_filter and args.layout != "hive":
+        parser.error("--bloom-filter requiere --layout hive")
+    if args.bloom_filter and not BLOOM_DISPONIBLE:
+        parser.error(f"--bloom-filter requiere un pyarrow que escriba bloom filters (instalado: {pa.__version__})")
+    print(f"[info] Procesaré {len(csvs)} archivo(s). Overwrite={args.overwrite}  Engine={args.engine}  "
+          f"Layout={args.layout}")
+
+    if args.jobs > 1 and len(csvs) > 1:
+        techo = args.memory_budget
+        if techo is None and memoria_fisica_bytes():
+            techo = int(memoria_fisica_bytes() * FRACCION_RAM)
+        resultados = transformar_en_paralelo(csvs, args.jobs, techo, overwrite=args.overwrite, engine=args.engine,
+                                             partes=args.split, layout=args.layout, bloom=args.bloom_filter,
+                                             borrar_crudo=args.delete_raw)
+    else:
+        resultados = []
+        for p in csvs:
+            try:
+                resultados.append(procesar_csv(p, overwrite=args.overwrite, engine=args.engine, partes=args.split,
+                                               layout=args.layout, bloom=args.bloom_filter,
+                                               borrar_crudo=args.delete_raw))
+            except KeyboardInterrupt:
+                print("\n[abort] Interrumpido por el usuario (Ctrl+C).")
+                break
+
+    limpiados = sum(r.get("limpiados", 0) for r in resultados)
+    aciertos = sum(r.get("aciertos", 0) for r in resultados)
+    if limpiados:
+        print(f"[cache] limpieza de texto: {limpiados:,} valores distintos limpiados, {aciertos:,} reutilizados")
+        METRICAS.registrar("cache_limpieza", limpiados=limpiados, aciertos=aciertos)
+
+    print("[resumen] Archivos en processed/:")
+    generados = [r for r in resultados if r["salida"]]
+    for r in generados:
+        rss = f"  RSS pico {r['rss_pico_mb']:,.0f} MB" if r.get("rss_pico_mb") else ""
+        print(f" - {r['salida']}  filas={r['filas']:,}  {r['seg']:.1f} s{rss}")
+    if not generados:
+        print(" (ninguno)")
+    errores = [r for r in resultados if r["error"]]
+    if errores:
+        print(f"[resumen] {len(errores)} archivo(s) con error:")
+        for r in errores:
+            print(f" - {r['archivo']}: {r['error']}")
+    METRICAS.resumen()
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,96 @@
+-- Claves surrogate por hash (modo --key-mode hash de cargar_postgres.py)
+-- El id de cada dimensión pasa a ser BIGINT = primeros 8 bytes del md5 de su llave natural
+-- normalizada (valores como texto unidos con chr(31), NULL como chr(30)). cargar_postgres.py
+-- calcula el mismo valor en Python (clave_hash), así que los hechos resuelven sus FKs sin
+-- consultar la BD y los workers en paralelo no necesitan coordinarse.
+-- Correr con el loader detenido, después de CreacionDeDataWareHouse.sql (y del particionamiento,
+-- si se usa). Migra los ids SERIAL existentes en dimensiones y fact y falla si hay colisiones.
+-- Las vistas dependen de las columnas de la fact: se borran aquí; al terminar volver a correr
+-- CreacionDeUsuariosyVistas.sql. dim_tiempo no cambia (se precarga y su id es el mismo siempre).
+SET search_path TO mef, public;
+
+-- Primer paso
+-- hash de la llave natural (debe coincidir con clave_hash de cargar_postgres.py)
+CREATE OR REPLACE FUNCTION clave_hash(valores TEXT[]) RETURNS BIGINT AS $$
+  SELECT ('x' || substr(md5(array_to_string(valores, chr(31), chr(30))), 1, 16))::bit(64)::bigint
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Segundo paso
+-- migración de ids SERIAL -> hash (una sola reescritura de la fact)
+DO $$
+DECLARE
+  d          RECORD;
+  c          RECORD;
+  expr       TEXT;
+  repetidos  BIGINT;
+  sets       TEXT[] := '{}';
+  froms      TEXT[] := '{}';
+  conds      TEXT[] := '{}';
+BEGIN
+  IF (SELECT data_type FROM information_schema.columns
+      WHERE table_schema = 'mef' AND table_name = 'dim_ejecutora' AND column_name = 'ejecutora_id') = 'bigint' THEN
+    RAISE NOTICE 'las dimensiones ya usan claves hash';
+    RETURN;
+  END IF;
+
+  DROP VIEW IF EXISTS mef.vw_gasto_agregado_anual, mef.vw_gasto_agregado_mensual, mef.vw_gasto_mensual;
+
+  -- FKs de la fact hacia las dimensiones (se recrean al final)
+  FOR c IN SELECT conname FROM pg_constraint
+           WHERE conrelid = 'mef.fact_gasto_mensual'::regclass AND contype = 'f'
+             AND confrelid <> 'mef.dim_tiempo'::regclass LOOP
+    EXECUTE format('ALTER TABLE mef.fact_gasto_mensual DROP CONSTRAINT %I', c.conname);
+  END LOOP;
+
+  FOR d IN SELECT * FROM (VALUES
+      ('dim_nivel_gobierno',     'nivel_gobierno_id', ARRAY['nivel_gobierno_codigo']),
+      ('dim_ejecutora',          'ejecutora_id',      ARRAY['sec_ejec','ejecutora_codigo']),
+      ('dim_programatica',       'programatica_id',   ARRAY['programa_ppto','tipo_act_proy','producto_proyecto',
+                                                          'actividad_accion_obra','sec_func']),
+      ('dim_funcional',          'funcional_id',      ARRAY['funcion','division_funcional','grupo_funcional']),
+      ('dim_meta',               'meta_id',           ARRAY['meta','finalidad','dep_meta_codigo']),
+      ('dim_financiera',         'financiera_id',     ARRAY['fuente_financiamiento','rubro','tipo_recurso',
+                                                          'categoria_gasto']),
+      ('dim_clasificador_gasto', 'clasif_gasto_id',   ARRAY['tipo_transaccion','generica','subgenerica',
+                                                          'subgenerica_det','especifica','especifica_det'])
+    ) AS v(tabla, id, llaves) LOOP
+    expr := format('mef.clave_hash(ARRAY[%s])',
+                   (SELECT string_agg(format('%I::text', k), ', ') FROM unnest(d.llaves) AS k));
+
+    EXECUTE format('CREATE TEMP TABLE %I ON COMMIT DROP AS SELECT %I AS viejo, %s AS nuevo FROM mef.%I',
+                   'mapa_' || d.id, d.id, expr, d.tabla);
+    EXECUTE format('SELECT count(*) - count(DISTINCT nuevo) FROM %I', 'mapa_' || d.id) INTO repetidos;
+    IF repetidos > 0 THEN
+      RAISE EXCEPTION 'colisión de clave hash en %: % id(s) repetidos', d.tabla, repetidos;
+    END IF;
+
+    EXECUTE format('ALTER TABLE mef.%I ALTER COLUMN %I DROP DEFAULT, ALTER COLUMN %I TYPE BIGINT',
+                   d.tabla, d.id, d.id);
+    EXECUTE format('UPDATE mef.%I t SET %I = %s', d.tabla, d.id, expr);
+    EXECUTE format('DROP SEQUENCE IF EXISTS mef.%I', d.tabla || '_' || d.id || '_seq');
+
+    sets  := sets  || format('%I = %I.nuevo', d.id, 'mapa_' || d.id);
+    froms := froms || format('%I', 'mapa_' || d.id);
+    conds := conds || format('f.%I = %I.viejo', d.id, 'mapa_' || d.id);
+  END LOOP;
+
+  ALTER TABLE mef.fact_gasto_mensual
+    ALTER COLUMN nivel_gobierno_id TYPE BIGINT,
+    ALTER COLUMN ejecutora_id      TYPE BIGINT,
+    ALTER COLUMN programatica_id   TYPE BIGINT,
+    ALTER COLUMN funcional_id      TYPE BIGINT,
+    ALTER COLUMN meta_id           TYPE BIGINT,
+    ALTER COLUMN financiera_id     TYPE BIGINT,
+    ALTER COLUMN clasif_gasto_id   TYPE BIGINT;
+  EXECUTE format('UPDATE mef.fact_gasto_mensual f SET %s FROM %s WHERE %s',
+                 array_to_string(sets, ', '), array_to_string(froms, ', '), array_to_string(conds, ' AND '));
+
+  ALTER TABLE mef.fact_gasto_mensual
+    ADD FOREIGN KEY (nivel_gobierno_id) REFERENCES mef.dim_nivel_gobierno(nivel_gobierno_id),
+    ADD FOREIGN KEY (ejecutora_id)      REFERENCES mef.dim_ejecutora(ejecutora_id),
+    ADD FOREIGN KEY (programatica_id)   REFERENCES mef.dim_programatica(programatica_id),
+    ADD FOREIGN KEY (funcional_id)      REFERENCES mef.dim_funcional(funcional_id),
+    ADD FOREIGN KEY (meta_id)           REFERENCES mef.dim_meta(meta_id),
+    ADD FOREIGN KEY (financiera_id)     REFERENCES mef.dim_financiera(financiera_id),
+    ADD FOREIGN KEY (clasif_gasto_id)   REFERENCES mef.dim_clasificador_gasto(clasif_gasto_id);
+END $$;
@@ -0,0 +1,119 @@
+-- Normalización de sec_func en dim_programatica (opcional)
+-- Los Parquet sin contrato de esquema traen SEC_FUNC como float64 y cargar_postgres.py guarda la
+-- llave como "5.0"; los que traen contrato la tienen int64 y, antes de a_codigo_entero, quedaba "5".
+-- La misma programática terminaba en dos filas con ids distintos y sus hechos repartidos entre las dos.
+-- El loader ya escribe siempre "5.0" (solo avisa si quedan filas "N"); este script las une a la forma
+-- histórica:
+--   - si la llave canónica no existe: con ids SERIAL se corrige el texto en la misma fila (los hechos
+--     no se tocan); con ids hash (MigracionClavesHash.sql) se crea la fila canónica con su id;
+--   - los hechos de cada fila vieja pasan a la canónica (si el grano ya estaba, se suman las métricas
+--     como en --on-conflict sum) y la fila vieja se borra.
+-- Correr con el loader detenido. Es idempotente: sin filas "N" no hace nada.
+SET search_path TO mef, public;
+
+DO $$
+DECLARE
+  hash       BOOLEAN;
+  n_viejas   BIGINT;
+  n_en_lugar BIGINT := 0;
+  n_sumados  BIGINT;
+  n_movidos  BIGINT;
+  n_borradas BIGINT;
+BEGIN
+  SELECT count(*) INTO n_viejas FROM mef.dim_programatica WHERE sec_func ~ '^-?[0-9]+$';
+  IF n_viejas = 0 THEN
+    RAISE NOTICE 'dim_programatica ya tiene sec_func en la forma "N.0"';
+    RETURN;
+  END IF;
+  hash := (SELECT data_type FROM information_schema.columns
+           WHERE table_schema = 'mef' AND table_name = 'dim_programatica'
+             AND column_name = 'programatica_id') = 'bigint';
+
+  -- Primer paso
+  -- filas viejas con su llave canónica; las comparaciones de llaves usan coalesce(…, chr(30)) para
+  -- que NULL = NULL y el join sea por hash (IS NOT DISTINCT FROM no lo es)
+  CREATE TEMP TABLE viejas ON COMMIT DROP AS
+  SELECT p.*, p.sec_func || '.0' AS canonico
+  FROM mef.dim_programatica p
+  WHERE p.sec_func ~ '^-?[0-9]+$';
+
+  -- Segundo paso
+  -- ids SERIAL sin fila canónica: se corrige el texto en el lugar
+  IF NOT hash THEN
+    UPDATE mef.dim_programatica p SET sec_func = v.canonico
+    FROM viejas v
+    WHERE p.programatica_id = v.programatica_id
+      AND NOT EXISTS (
+        SELECT 1 FROM mef.dim_programatica c
+        WHERE coalesce(c.programa_ppto, chr(30))         = coalesce(v.programa_ppto, chr(30))
+          AND coalesce(c.tipo_act_proy, chr(30))         = coalesce(v.tipo_act_proy, chr(30))
+          AND coalesce(c.producto_proyecto, chr(30))     = coalesce(v.producto_proyecto, chr(30))
+          AND coalesce(c.actividad_accion_obra, chr(30)) = coalesce(v.actividad_accion_obra, chr(30))
+          AND c.sec_func = v.canonico);
+    GET DIAGNOSTICS n_en_lugar = ROW_COUNT;
+    DELETE FROM viejas v USING mef.dim_programatica p
+    WHERE p.programatica_id = v.programatica_id AND p.sec_func = v.canonico;
+  ELSE
+    -- ids hash: la llave canónica tiene otro id; se crea su fila si falta
+    INSERT INTO mef.dim_programatica (programatica_id, programa_ppto, programa_ppto_nombre, tipo_act_proy,
+                                      tipo_act_proy_nombre, producto_proyecto, producto_proyecto_nombre,
+                                      actividad_accion_obra, actividad_accion_obra_nombre, sec_func)
+    SELECT mef.clave_hash(ARRAY[v.programa_ppto, v.tipo_act_proy, v.producto_proyecto,
+                                v.actividad_accion_obra, v.canonico]),
+           v.programa_ppto, v.programa_ppto_nombre, v.tipo_act_proy, v.tipo_act_proy_nombre,
+           v.producto_proyecto, v.producto_proyecto_nombre, v.actividad_accion_obra,
+           v.actividad_accion_obra_nombre, v.canonico
+    FROM viejas v
+    ON CONFLICT DO NOTHING;
+  END IF;
+
+  -- Tercer paso
+  -- fila vieja -> fila canónica
+  CREATE TEMP TABLE mapa ON COMMIT DROP AS
+  SELECT v.programatica_id AS viejo, c.programatica_id AS nuevo
+  FROM viejas v
+  JOIN mef.dim_programatica c
+    ON coalesce(c.programa_ppto, chr(30))         = coalesce(v.programa_ppto, chr(30))
+   AND coalesce(c.tipo_act_proy, chr(30))         = coalesce(v.tipo_act_proy, chr(30))
+   AND coalesce(c.producto_proyecto, chr(30))     = coalesce(v.producto_proyecto, chr(30))
+   AND coalesce(c.actividad_accion_obra, chr(30)) = coalesce(v.actividad_accion_obra, chr(30))
+   AND c.sec_func = v.canonico;
+  CREATE INDEX ON mapa (viejo);
+  ANALYZE mapa;
+
+  -- Cuarto paso
+  -- hechos: un grano que ya existía con la fila canónica suma las métricas del duplicado, que se
+  -- borra; el resto solo cambia de programatica_id
+  UPDATE mef.fact_gasto_mensual f SET
+    monto_pia                = COALESCE(f.monto_pia, 0) + COALESCE(o.monto_pia, 0),
+    monto_pim                = COALESCE(f.monto_pim, 0) + COALESCE(o.monto_pim, 0),
+    monto_certificado        = COALESCE(f.monto_certificado, 0) + COALESCE(o.monto_certificado, 0),
+    monto_comprometido_anual = COALESCE(f.monto_comprometido_anual, 0) + COALESCE(o.monto_comprometido_anual, 0),
+    monto_comprometido       = COALESCE(f.monto_comprometido, 0) + COALESCE(o.monto_comprometido, 0),
+    monto_devengado          = COALESCE(f.monto_devengado, 0) + COALESCE(o.monto_devengado, 0),
+    monto_girado             = COALESCE(f.monto_girado, 0) + COALESCE(o.monto_girado, 0)
+  FROM mef.fact_gasto_mensual o
+  JOIN mapa m ON o.programatica_id = m.viejo
+  WHERE f.programatica_id = m.nuevo
+    AND f.tiempo_id = o.tiempo_id AND f.nivel_gobierno_id = o.nivel_gobierno_id
+    AND f.ejecutora_id = o.ejecutora_id AND f.funcional_id = o.funcional_id AND f.meta_id = o.meta_id
+    AND f.financiera_id = o.financiera_id AND f.clasif_gasto_id = o.clasif_gasto_id;
+  GET DIAGNOSTICS n_sumados = ROW_COUNT;
+
+  DELETE FROM mef.fact_gasto_mensual o
+  USING mapa m, mef.fact_gasto_mensual f
+  WHERE o.programatica_id = m.viejo AND f.programatica_id = m.nuevo
+    AND f.tiempo_id = o.tiempo_id AND f.nivel_gobierno_id = o.nivel_gobierno_id
+    AND f.ejecutora_id = o.ejecutora_id AND f.funcional_id = o.funcional_id AND f.meta_id = o.meta_id
+    AND f.financiera_id = o.financiera_id AND f.clasif_gasto_id = o.clasif_gasto_id;
+
+  UPDATE mef.fact_gasto_mensual f SET programatica_id = m.nuevo
+  FROM mapa m WHERE f.programatica_id = m.viejo;
+  GET DIAGNOSTICS n_movidos = ROW_COUNT;
+
+  DELETE FROM mef.dim_programatica p USING mapa m WHERE p.programatica_id = m.viejo;
+  GET DIAGNOSTICS n_borradas = ROW_COUNT;
+
+  RAISE NOTICE 'sec_func: % fila(s) "N": % corregida(s) en el lugar, % unificada(s); hechos: % movido(s), % sumado(s)',
+               n_viejas, n_en_lugar, n_borradas, n_movidos, n_sumados;
+END $$;
@@ -0,0 +1,101 @@
+-- Particionamiento por año de fact_gasto_mensual (RANGE sobre tiempo_id)
+-- dim_tiempo se llena en orden con generate_series, así que los tiempo_id de un año son
+-- contiguos y la partición del año es FOR VALUES FROM (min tiempo_id) TO (max tiempo_id + 1).
+-- Correr después de CreacionDeDataWareHouse.sql. Si la fact ya tiene datos, se migran.
+-- Al terminar, volver a correr CreacionDeUsuariosyVistas.sql: las vistas siguen apuntando a la
+-- tabla vieja (renombrada a fact_gasto_mensual_heap) hasta que se recrean.
+SET search_path TO mef, public;
+
+-- Primer paso
+-- rango [desde, hasta) de tiempo_id de un año; falla si el año no está o no es contiguo
+CREATE OR REPLACE FUNCTION rango_tiempo_anio(p_anio INT, OUT desde INT, OUT hasta INT) AS $$
+BEGIN
+  SELECT MIN(tiempo_id), MAX(tiempo_id) + 1 INTO desde, hasta
+  FROM mef.dim_tiempo WHERE anio = p_anio;
+  IF desde IS NULL THEN
+    RAISE EXCEPTION 'el año % no está en dim_tiempo', p_anio;
+  END IF;
+  IF EXISTS (SELECT 1 FROM mef.dim_tiempo
+             WHERE tiempo_id >= desde AND tiempo_id < hasta AND anio <> p_anio) THEN
+    RAISE EXCEPTION 'los tiempo_id del año % no son contiguos', p_anio;
+  END IF;
+END $$ LANGUAGE plpgsql STABLE;
+
+-- crea (si falta) la partición de un año y devuelve su nombre
+CREATE OR REPLACE FUNCTION crear_particion_fact(p_anio INT) RETURNS TEXT AS $$
+DECLARE
+  r      RECORD;
+  nombre TEXT := format('fact_gasto_mensual_%s', p_anio);
+BEGIN
+  IF to_regclass(format('mef.%I', nombre)) IS NULL THEN
+    SELECT * INTO r FROM mef.rango_tiempo_anio(p_anio);
+    EXECUTE format('CREATE TABLE mef.%I PARTITION OF mef.fact_gasto_mensual FOR VALUES FROM (%s) TO (%s)',
+                   nombre, r.desde, r.hasta);
+  END IF;
+  RETURN nombre;
+END $$ LANGUAGE plpgsql;
+
+-- Segundo paso
+-- migración de la fact (solo si todavía es una tabla normal)
+DO $$
+DECLARE
+  c    RECORD;
+  anio INT;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'mef.fact_gasto_mensual'::regclass) = 'p' THEN
+    RAISE NOTICE 'fact_gasto_mensual ya está particionada';
+    RETURN;
+  END IF;
+
+  -- la tabla vieja deja libres los nombres de índices y constraints
+  ALTER TABLE mef.fact_gasto_mensual RENAME TO fact_gasto_mensual_heap;
+  FOR c IN SELECT conname FROM pg_constraint
+           WHERE conrelid = 'mef.fact_gasto_mensual_heap'::regclass AND contype IN ('p', 'u') LOOP
+    EXECUTE format('ALTER TABLE mef.fact_gasto_mensual_heap DROP CONSTRAINT %I', c.conname);
+  END LOOP;
+  DROP INDEX IF EXISTS mef.idx_mensual_tiempo, mef.idx_mensual_ejecutora, mef.idx_mensual_programatica,
+                       mef.idx_mensual_funcional, mef.idx_mensual_clasif;
+
+  CREATE TABLE mef.fact_gasto_mensual (
+    fact_id          BIGINT NOT NULL DEFAULT nextval('mef.fact_gasto_mensual_fact_id_seq'),
+
+    tiempo_id        INT NOT NULL REFERENCES mef.dim_tiempo(tiempo_id),
+    nivel_gobierno_id INT NOT NULL REFERENCES mef.dim_nivel_gobierno(nivel_gobierno_id),
+    ejecutora_id     INT NOT NULL REFERENCES mef.dim_ejecutora(ejecutora_id),
+    programatica_id  INT NOT NULL REFERENCES mef.dim_programatica(programatica_id),
+    funcional_id     INT NOT NULL REFERENCES mef.dim_funcional(funcional_id),
+    meta_id          INT NOT NULL REFERENCES mef.dim_meta(meta_id),
+    financiera_id    INT NOT NULL REFERENCES mef.dim_financiera(financiera_id),
+    clasif_gasto_id  INT NOT NULL REFERENCES mef.dim_clasificador_gasto(clasif_gasto_id),
+
+    monto_pia                  NUMERIC,
+    monto_pim                  NUMERIC,
+    monto_certificado          NUMERIC,
+    monto_comprometido_anual   NUMERIC,
+    monto_comprometido         NUMERIC,
+    monto_devengado            NUMERIC,
+    monto_girado               NUMERIC,
+
+    -- la llave de partición (tiempo_id) tiene que estar en la PK y en el UNIQUE del grano
+    CONSTRAINT pk_fact_gasto_mensual PRIMARY KEY (fact_id, tiempo_id),
+    CONSTRAINT ux_fact_gasto_mensual_grano
+      UNIQUE (tiempo_id, nivel_gobierno_id, ejecutora_id, programatica_id,
+              funcional_id, meta_id, financiera_id, clasif_gasto_id)
+  ) PARTITION BY RANGE (tiempo_id);
+  ALTER SEQUENCE mef.fact_gasto_mensual_fact_id_seq OWNED BY mef.fact_gasto_mensual.fact_id;
+
+  CREATE INDEX idx_mensual_tiempo       ON mef.fact_gasto_mensual(tiempo_id);
+  CREATE INDEX idx_mensual_ejecutora    ON mef.fact_gasto_mensual(ejecutora_id);
+  CREATE INDEX idx_mensual_programatica ON mef.fact_gasto_mensual(programatica_id);
+  CREATE INDEX idx_mensual_funcional    ON mef.fact_gasto_mensual(funcional_id);
+  CREATE INDEX idx_mensual_clasif       ON mef.fact_gasto_mensual(clasif_gasto_id);
+
+  FOR anio IN SELECT DISTINCT dt.anio FROM mef.fact_gasto_mensual_heap f
+              JOIN mef.dim_tiempo dt ON dt.tiempo_id = f.tiempo_id ORDER BY 1 LOOP
+    PERFORM mef.crear_particion_fact(anio);
+  END LOOP;
+  INSERT INTO mef.fact_gasto_mensual SELECT * FROM mef.fact_gasto_mensual_heap;
+END $$;
+
+-- Tercer paso (manual, después de verificar conteos y recrear las vistas)
+-- DROP TABLE mef.fact_gasto_mensual_heap CASCADE;